@@ -0,0 +1,258 @@
+"""CodeInsight 性能基准
+
+生成合成语料后分别计时各个阶段，结果写为 JSON，可与基线结果对比。
+
+用法:
+    python -m benchmarks.run_benchmarks --shape many --files 50 --output bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json --threshold 1.25
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import libcst as cst
+
+from codeinsight.analyzer import CodeMetrics
+from codeinsight.checker import check_logic_bugs
+from codeinsight.code_detector import (
+    ASTBasedDuplicateDetector,
+    CodeDuplicateDetector,
+    TokenDuplicateDetector,
+)
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+from codeinsight.refactor import UnusedImportRemover
+
+from .corpus import SHAPES, CorpusGenerator, CorpusSpec
+
+
+def _time(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "runs": runs,
+    }
+
+
+class BenchmarkSuite:
+    """在一份语料上分别计时各分析阶段"""
+
+    def __init__(self, root: Path, repeat: int = 3, dup_window: int = 60):
+        self.root = root
+        self.repeat = repeat
+        self.dup_window = dup_window
+        self.sources: List[Tuple[str, str]] = [
+            (str(p), p.read_text(encoding="utf-8")) for p in sorted(root.rglob("*.py"))
+        ]
+        self.trees = [(cst.parse_module(src), src) for _, src in self.sources]
+
+    def stages(self) -> Dict[str, Tuple[Callable[[], object], int]]:
+        """返回 {阶段名: (计时函数, 处理的条目数)}"""
+        # 代码块检测的开销随行数急剧增长，只取每个文件的前 dup_window 行计时
+        windows = [
+            "\n".join(src.split("\n")[: self.dup_window]) for _, src in self.sources
+        ]
+        unused = [
+            (tree, CodeMetrics().analyze(tree, src)["unused_imports"])
+            for tree, src in self.trees
+        ]
+
+        def parse():
+            for _, src in self.sources:
+                cst.parse_module(src)
+
+        def metrics():
+            for tree, src in self.trees:
+                CodeMetrics().analyze(tree, src)
+
+        def block_duplicates():
+            for window in windows:
+                CodeDuplicateDetector(min_block_size=5).detect(window)
+
+        def token_duplicates():
+            for _, src in self.sources:
+                TokenDuplicateDetector(min_block_size=5).detect(src)
+
+        def function_duplicates():
+            for tree, src in self.trees:
+                ASTBasedDuplicateDetector(min_function_size=5).detect(tree, src)
+
+        def check_bugs():
+            for tree, src in self.trees:
+                check_logic_bugs(tree, source=src)
+
+        def remove_unused_imports():
+            for tree, names in unused:
+                tree.visit(UnusedImportRemover(set(names)))
+
+        def analyze_directory():
+            MultiFileAnalyzer().analyze_directory(str(self.root))
+
+        n = len(self.sources)
+        return {
+            "parse_module": (parse, n),
+            "code_metrics": (metrics, n),
+            "block_duplicates": (block_duplicates, n),
+            "token_duplicates": (token_duplicates, n),
+            "function_duplicates": (function_duplicates, n),
+            "check_logic_bugs": (check_bugs, n),
+            "unused_import_remover": (remove_unused_imports, n),
+            "analyze_directory": (analyze_directory, n),
+        }
+
+    def run(self, only: Optional[List[str]] = None) -> Dict[str, Dict]:
+        results = {}
+        for name, (func, items) in self.stages().items():
+            if only and name not in only:
+                continue
+            results[name] = dict(_time(func, self.repeat), items=items)
+            print(f"  {name:<24} {results[name]['median'] * 1000:10.1f} ms  ({items} 项)")
+        return results
+
+
+def bench_evolution(commits: int, repeat: int) -> Dict:
+    """在临时 git 仓库上计时 EvolutionAnalyzer；缺少 GitPython 或 git 时跳过"""
+    try:
+        import git
+        from codeinsight.evolution import EvolutionAnalyzer
+    except Exception as e:
+        return {"skipped": str(e)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            repo = git.Repo.init(tmp)
+            actor = git.Actor("bench", "bench@example.com")
+            spec = CorpusSpec(shape="many", files=1, functions_per_file=5)
+            target = Path(tmp) / "module.py"
+            for i in range(commits):
+                spec.seed = i
+                source = next(
+                    src
+                    for path, src in CorpusGenerator(spec).generate().items()
+                    if not path.endswith("__init__.py")
+                )
+                target.write_text(source, encoding="utf-8")
+                repo.index.add(["module.py"])
+                repo.index.commit(f"commit {i}", author=actor, committer=actor)
+            analyzer = EvolutionAnalyzer(tmp)
+        except Exception as e:
+            return {"skipped": str(e)}
+        result = _time(
+            lambda: analyzer.analyze_history("module.py", limit=commits), repeat
+        )
+        return dict(result, items=commits)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """返回中位数相对基线变慢超过 threshold 倍的阶段"""
+    regressions = []
+    print("\n📊 与基线对比 (中位数):")
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "median" not in base or "median" not in stage:
+            continue
+        ratio = stage["median"] / base["median"] if base["median"] else float("inf")
+        flag = "❌" if ratio > threshold else "✅"
+        print(f"  {flag} {name:<24} x{ratio:.2f}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CodeInsight 性能基准")
+    parser.add_argument("--shape", choices=SHAPES, default="many", help="语料形态")
+    parser.add_argument("--files", type=int, default=50, help="文件数")
+    parser.add_argument("--functions", type=int, default=10, help="每个文件的函数数")
+    parser.add_argument("--depth", type=int, default=3, help="控制流嵌套深度")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数")
+    parser.add_argument(
+        "--dup-window", type=int, default=60, help="代码块重复检测时每个文件取的行数"
+    )
+    parser.add_argument("--commits", type=int, default=10, help="演化分析的提交数")
+    parser.add_argument("--stage", action="append", help="只运行指定阶段")
+    parser.add_argument("--output", "-o", help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", help="用于对比的基线结果 JSON")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25, help="判定为性能回退的倍数"
+    )
+    args = parser.parse_args(argv)
+
+    spec = CorpusSpec(
+        shape=args.shape,
+        files=args.files,
+        functions_per_file=args.functions,
+        nesting_depth=args.depth,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        written = CorpusGenerator(spec).write(root)
+        total_lines = sum(p.read_text(encoding="utf-8").count("\n") for p in written)
+        print(f"⏱️  语料: {spec.shape}, {len(written)} 个文件, {total_lines} 行")
+        stages = BenchmarkSuite(root, args.repeat, args.dup_window).run(args.stage)
+
+    if not args.stage or "evolution" in args.stage:
+        stages["evolution"] = bench_evolution(args.commits, args.repeat)
+        if "skipped" in stages["evolution"]:
+            print(f"  {'evolution':<24} 跳过: {stages['evolution']['skipped']}")
+        else:
+            print(f"  {'evolution':<24} {stages['evolution']['median'] * 1000:10.1f} ms")
+
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "libcst": _libcst_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "corpus": dict(
+            spec.to_dict(),
+            written_files=len(written),
+            lines=total_lines,
+            dup_window=args.dup_window,
+        ),
+        "stages": stages,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已写入: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("corpus", {}).get("shape") != spec.shape:
+            print("⚠️  基线使用的语料形态不同，对比结果仅供参考")
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ 性能回退: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+def _libcst_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+
+        return version("libcst")
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    main()
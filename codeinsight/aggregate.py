@@ -0,0 +1,233 @@
+"""项目级流式汇总
+
+每个文件分析完成后立即计入计数器与分位数草图，无需保留全部文件结果。
+草图采用 KLL 结构：内存占用与数据量基本无关（约 O(k·log(n/k))），
+并且可以合并，工作进程、分片各自汇总后再合并即可得到全局分位数。
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 报告中输出的分位点
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class KLLSketch:
+    """可合并的 KLL 分位数草图
+
+    第 h 层的每个元素代表 2^h 个原始值。某层装满后排序并隔一取一提升到上一层，
+    取奇数位还是偶数位在各层之间交替（确定性的变体，便于复现）。
+    元素总数不超过 k 时结果是精确的。
+
+    Args:
+        k: 精度参数，秩误差约为 O(1/k)
+    """
+
+    def __init__(self, k: int = 200):
+        self.k = max(8, k)
+        self.count = 0
+        self.levels: List[List[float]] = [[]]
+        self._toggles: List[int] = [0]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _size(self) -> int:
+        return sum(len(level) for level in self.levels)
+
+    def _grow(self) -> None:
+        self.levels.append([])
+        self._toggles.append(0)
+
+    def add(self, value: float) -> None:
+        """加入一个值"""
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self) -> None:
+        for h in range(len(self.levels)):
+            level = self.levels[h]
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.levels):
+                self._grow()
+            level.sort()
+            leftover = [level.pop()] if len(level) % 2 else []
+            offset = self._toggles[h]
+            self._toggles[h] ^= 1
+            self.levels[h + 1].extend(level[offset::2])
+            self.levels[h] = leftover
+            if self._size() < self._max_size():
+                break
+
+    def merge(self, other: "KLLSketch") -> None:
+        """把 other 合并进来（other 不被修改）"""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.count += other.count
+        while self._size() >= self._max_size():
+            before = self._size()
+            self._compress()
+            if self._size() >= before:
+                break
+
+    def quantile(self, q: float) -> Optional[float]:
+        """返回近似的 q 分位数；没有数据时返回 None"""
+        weighted = sorted(
+            (value, 1 << h) for h, level in enumerate(self.levels) for value in level
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "count": self.count, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(data["k"])
+        sketch.count = data["count"]
+        sketch.levels = [list(level) for level in data["levels"]] or [[]]
+        sketch._toggles = [0] * len(sketch.levels)
+        return sketch
+
+
+def _field(obj: Any, name: str) -> Any:
+    """同时支持 dataclass 对象与从 JSON 读回的字典"""
+    if isinstance(obj, dict):
+        return obj.get(name, 0)
+    return getattr(obj, name, 0)
+
+
+class ProjectAggregator:
+    """流式计算项目级汇总：计数器 + 文件评分、函数复杂度、函数长度的分位数草图
+
+    最佳/最差文件的并列按路径取最小者，与按路径顺序扫描的结果一致，
+    因此汇总与文件到达顺序、合并顺序无关（分位数在草图压缩后为近似值）。
+    """
+
+    METRICS = ("file_score", "function_complexity", "function_length")
+
+    def __init__(self, k: int = 200):
+        self.files = 0
+        self.errors = 0
+        self.score_sum = 0
+        self.total_functions = 0
+        self.total_classes = 0
+        self.total_lines = 0
+        self.best: Optional[Tuple[float, str]] = None
+        self.worst: Optional[Tuple[float, str]] = None
+        self.sketches = {name: KLLSketch(k) for name in self.METRICS}
+
+    def add(self, file: str, result: Dict[str, Any]) -> None:
+        """计入一个文件的分析结果"""
+        if "error" in result:
+            self.errors += 1
+            return
+
+        score = result.get("quality_score", 0)
+        self.files += 1
+        self.score_sum += score
+        self.total_functions += result.get("function_count", 0)
+        self.total_classes += result.get("class_count", 0)
+        self.total_lines += result.get("line_count", 0)
+        self._update_extremes(score, file)
+
+        self.sketches["file_score"].add(score)
+        for func in result.get("functions", []):
+            self.sketches["function_complexity"].add(_field(func, "complexity"))
+            length = _field(func, "line_end") - _field(func, "line_start") + 1
+            self.sketches["function_length"].add(length)
+
+    def _update_extremes(self, score: float, file: str) -> None:
+        if self.worst is None or (score, file) < self.worst:
+            self.worst = (score, file)
+        if self.best is None or (-score, file) < (-self.best[0], self.best[1]):
+            self.best = (score, file)
+
+    def merge(self, other: "ProjectAggregator") -> None:
+        """合并另一个汇总（来自其他工作进程或分片）"""
+        self.files += other.files
+        self.errors += other.errors
+        self.score_sum += other.score_sum
+        self.total_functions += other.total_functions
+        self.total_classes += other.total_classes
+        self.total_lines += other.total_lines
+        for extreme in (other.best, other.worst):
+            if extreme is not None:
+                self._update_extremes(*extreme)
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+
+    def percentiles(
+        self, points: Sequence[float] = PERCENTILES
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        """各指标的分位数，如 {"file_score": {"p50": ..., "p90": ..., "p99": ...}}"""
+        return {
+            name: {f"p{round(q * 100):d}": sketch.quantile(q) for q in points}
+            for name, sketch in self.sketches.items()
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """项目级汇总指标；没有成功分析的文件时返回空字典"""
+        if self.files == 0:
+            return {}
+        return {
+            "average_quality_score": round(self.score_sum / self.files, 2),
+            "best_file": self.best[1],
+            "best_file_score": self.best[0],
+            "worst_file": self.worst[1],
+            "worst_file_score": self.worst[0],
+            "total_functions": self.total_functions,
+            "total_classes": self.total_classes,
+            "total_lines": self.total_lines,
+            "percentiles": self.percentiles(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """可 JSON 序列化的状态，用于跨进程或跨分片合并"""
+        return {
+            "files": self.files,
+            "errors": self.errors,
+            "score_sum": self.score_sum,
+            "total_functions": self.total_functions,
+            "total_classes": self.total_classes,
+            "total_lines": self.total_lines,
+            "best": list(self.best) if self.best else None,
+            "worst": list(self.worst) if self.worst else None,
+            "sketches": {name: s.to_dict() for name, s in self.sketches.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProjectAggregator":
+        aggregator = cls()
+        for name in (
+            "files",
+            "errors",
+            "score_sum",
+            "total_functions",
+            "total_classes",
+            "total_lines",
+        ):
+            setattr(aggregator, name, data[name])
+        aggregator.best = tuple(data["best"]) if data["best"] else None
+        aggregator.worst = tuple(data["worst"]) if data["worst"] else None
+        aggregator.sketches = {
+            name: KLLSketch.from_dict(s) for name, s in data["sketches"].items()
+        }
+        return aggregator
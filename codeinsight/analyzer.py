@@ -1,6 +1,16 @@
+import hashlib
+import re
 import libcst as cst
-from typing import Dict, Set, List
-from dataclasses import dataclass, field, asdict
+from libcst.metadata import (
+    GlobalScope,
+    MetadataWrapper,
+    PositionProvider,
+    ScopeProvider,
+)
+from libcst.metadata.scope_provider import BuiltinAssignment
+from typing import Dict, Mapping, Set, List, Optional, Tuple, Union
+from dataclasses import dataclass, field, asdict, replace
+from .source_io import count_lines
 
 
 @dataclass
@@ -51,8 +61,40 @@ class ClassMetrics:
         return self.line_end - self.line_start + 1
 
 
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+
+@dataclass
+class StatementMetrics:
+    """单个顶层语句的指标片段，逐项合并即得到模块级结果"""
+
+    complexity: int  # 圈复杂度增量（不含模块基数 1）
+    function_count: int
+    class_count: int
+    max_nesting_depth: int
+    functions_missing_return_annotation: int
+    functions_missing_param_annotation: int
+    total_functions: int
+    annotated_functions: int
+    imports: Set[str]
+    used_names: Set[str]
+    functions: List[FunctionMetrics]
+    classes: List[ClassMetrics]
+    # (导入名, 在本语句内是否已被引用, 是否为模块级绑定)
+    import_bindings: List[Tuple[str, bool, bool]]
+    # 本语句读取、但未在本语句内解析到的名字（可能由其他顶层语句绑定）
+    global_reads: Set[str]
+
+
 class CodeMetrics:
     def __init__(self):
+        self._reset()
+        # 顶层语句源码哈希 -> 指标片段，供 analyze_incremental 复用
+        self._statement_cache: Dict[bytes, StatementMetrics] = {}
+        self.reused_statements = 0
+
+    def _reset(self) -> None:
+        """清空计数器，保证同一实例多次 analyze 时结果不会累加"""
         self.cyclomatic_complexity = 1  # 起始为1
         self.function_count = 0
         self.class_count = 0
@@ -70,18 +112,39 @@ class CodeMetrics:
         self.classes_list: List[ClassMetrics] = []
         self.current_function: FunctionMetrics = None
         self.current_class: ClassMetrics = None
-
-    def analyze(self, tree: cst.Module, source: str = "") -> Dict[str, any]:
-        tree.visit(MetricsVisitor(self))
+        # 最近一次 analyze 判定为未使用的 ImportAlias 节点（同名绑定按节点区分）
+        self.unused_import_aliases: List[cst.ImportAlias] = []
+
+    def analyze(
+        self,
+        tree: cst.Module,
+        source: Union[str, bytes] = "",
+        wrapper: Optional[MetadataWrapper] = None,
+    ) -> Dict[str, any]:
+        """分析模块
+
+        Args:
+            tree: 已解析的模块
+            source: 源代码（文本或原始字节），用于统计行数与注释
+            wrapper: 可选的共享 MetadataWrapper，作用域信息在同一文件的
+                各项检查之间只计算一次
+        """
+        self._reset()
+        if wrapper is None:
+            wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+        positions = wrapper.resolve(PositionProvider)
+        wrapper.module.visit(MetricsVisitor(self, positions))
 
         # 计算代码统计
         if source:
-            lines = source.split("\n")
-            self.line_count = len(lines)
-            self.comment_count = sum(
-                1 for line in lines if line.strip().startswith("#")
-            )
+            self._count_lines(source)
+
+        bindings = _import_bindings(wrapper)
+        self.unused_import_aliases = _unused_aliases(bindings)
+        return self._build_result(_unused_names(bindings))
 
+    def _build_result(self, unused_imports: List[str]) -> Dict[str, any]:
+        """由当前计数器与未使用导入生成结果字典"""
         # 计算类型注解覆盖率
         if self.total_functions > 0:
             annotation_coverage = (
@@ -90,8 +153,6 @@ class CodeMetrics:
         else:
             annotation_coverage = 0
 
-        unused_imports = list(self.imports - self.used_names)
-
         # 计算综合评分
         score = self._calculate_score(unused_imports, annotation_coverage)
 
@@ -112,51 +173,329 @@ class CodeMetrics:
             "classes": self.classes_list,
         }
 
+    def analyze_incremental(
+        self, tree: cst.Module, source: Union[str, bytes] = ""
+    ) -> Dict[str, any]:
+        """按顶层语句增量分析，结果与 analyze 相同
+
+        每个顶层语句（函数、类或其他语句）的指标按其源码哈希缓存在实例上，
+        再次分析同一文件时只重新计算内容变化的语句，模块级汇总、导入/引用名
+        与评分由各语句的片段重新合并得到。适合编辑器中对同一文件的反复分析。
+        """
+        self._reset()
+        cache: Dict[bytes, StatementMetrics] = {}
+        parts: List[StatementMetrics] = []
+        # 各语句之前的行数：片段中的行号相对语句自身，合并时加上偏移
+        offsets: List[int] = []
+        line = len(tree.header)
+        self.reused_statements = 0
+        for stmt in tree.body:
+            code = tree.code_for_node(stmt).encode("utf-8", "surrogatepass")
+            key = hashlib.blake2b(code, digest_size=16).digest()
+            part = cache.get(key) or self._statement_cache.get(key)
+            if part is None:
+                part = self._measure_statement(stmt)
+            else:
+                self.reused_statements += 1
+            cache[key] = part
+            parts.append(part)
+            offsets.append(line)
+            line += code.count(b"\n")
+        # 只保留当前版本的语句，缓存大小与文件规模同阶
+        self._statement_cache = cache
+
+        self.cyclomatic_complexity = 1 + sum(p.complexity for p in parts)
+        for name in (
+            "function_count",
+            "class_count",
+            "functions_missing_return_annotation",
+            "functions_missing_param_annotation",
+            "total_functions",
+            "annotated_functions",
+        ):
+            setattr(self, name, sum(getattr(p, name) for p in parts))
+        self.max_nesting_depth = max((p.max_nesting_depth for p in parts), default=0)
+        for part, offset in zip(parts, offsets):
+            self.imports |= part.imports
+            self.used_names |= part.used_names
+            # 缓存的片段可能被复用，平移行号时生成副本
+            self.functions_list.extend(
+                replace(
+                    f, line_start=f.line_start + offset, line_end=f.line_end + offset
+                )
+                for f in part.functions
+            )
+            self.classes_list.extend(
+                replace(
+                    c, line_start=c.line_start + offset, line_end=c.line_end + offset
+                )
+                for c in part.classes
+            )
+
+        # 模块级导入只要被任一顶层语句读取即视为已使用；局部导入在语句内即可判定
+        global_reads = set().union(*(p.global_reads for p in parts))
+        unused_global = [
+            name
+            for part in parts
+            for name, used, is_global in part.import_bindings
+            if is_global and not used and name not in global_reads
+        ]
+        unused_local = [
+            name
+            for part in parts
+            for name, used, is_global in part.import_bindings
+            if not is_global and not used
+        ]
+        unused_imports = list(dict.fromkeys(unused_global + unused_local))
+
+        if source:
+            self._count_lines(source)
+        return self._build_result(unused_imports)
+
+    @staticmethod
+    def _measure_statement(stmt: cst.CSTNode) -> StatementMetrics:
+        """单独分析一个顶层语句"""
+        counter = CodeMetrics.__new__(CodeMetrics)
+        counter._reset()
+        counter.cyclomatic_complexity = 0
+        # 行号相对于只含该语句的模块，由 analyze_incremental 合并时平移
+        wrapper = MetadataWrapper(cst.Module(body=[stmt]), unsafe_skip_copy=True)
+        positions = wrapper.resolve(PositionProvider)
+        stmt.visit(MetricsVisitor(counter, positions))
+
+        bindings = _import_bindings(wrapper)
+        global_reads = set()
+        scopes = wrapper.resolve(ScopeProvider)
+        for scope in dict.fromkeys(s for s in scopes.values() if s is not None):
+            for access in scope.accesses:
+                # 未解析或只解析到内置名：可能引用其他顶层语句绑定的名字
+                if not all(isinstance(r, BuiltinAssignment) for r in access.referents):
+                    continue
+                if isinstance(access.node, cst.Name):
+                    global_reads.add(access.node.value)
+                elif isinstance(access.node, cst.SimpleString):
+                    # 字符串注解中的名字，访问记录只指向字符串节点本身
+                    value = access.node.evaluated_value
+                    if isinstance(value, str):
+                        global_reads.update(_IDENTIFIER.findall(value))
+
+        return StatementMetrics(
+            complexity=counter.cyclomatic_complexity,
+            function_count=counter.function_count,
+            class_count=counter.class_count,
+            max_nesting_depth=counter.max_nesting_depth,
+            functions_missing_return_annotation=counter.functions_missing_return_annotation,
+            functions_missing_param_annotation=counter.functions_missing_param_annotation,
+            total_functions=counter.total_functions,
+            annotated_functions=counter.annotated_functions,
+            imports=counter.imports,
+            used_names=counter.used_names,
+            functions=counter.functions_list,
+            classes=counter.classes_list,
+            import_bindings=[
+                (name, used, is_global)
+                for (_, name), (used, is_global, _) in bindings.items()
+            ],
+            global_reads=global_reads,
+        )
+
+    def apply_import_removal(
+        self,
+        result: Dict[str, any],
+        removed: List[str],
+        source: Union[str, bytes] = "",
+    ) -> Dict[str, any]:
+        """根据 UnusedImportRemover 报告的删除结果增量更新分析结果
+
+        删除未使用导入不会改变复杂度、嵌套与函数/类统计，
+        只需更新未使用导入列表、行数统计和评分，无需重新解析与遍历。
+
+        Args:
+            result: 修复前 analyze 返回的结果
+            removed: UnusedImportRemover.removed
+            source: 修复后的源代码
+        """
+        removed_set = set(removed)
+        updated = dict(result)
+        updated["unused_imports"] = [
+            name for name in result["unused_imports"] if name not in removed_set
+        ]
+        if source:
+            self._count_lines(source)
+            updated["line_count"] = self.line_count
+            updated["comment_count"] = self.comment_count
+        updated["quality_score"] = self._calculate_score(
+            updated["unused_imports"], result["annotation_coverage"]
+        )
+        return updated
+
+    def _count_lines(self, source: Union[str, bytes]) -> None:
+        self.line_count, self.comment_count = count_lines(source)
+
     def _calculate_score(
         self, unused_imports: List[str], annotation_coverage: float
     ) -> int:
         """计算代码质量评分 (0-100)"""
-        score = 100
+        return quality_score(
+            self.cyclomatic_complexity,
+            self.max_nesting_depth,
+            len(unused_imports),
+            annotation_coverage,
+        )
+
+
+def quality_score(
+    cyclomatic_complexity: int,
+    max_nesting_depth: int,
+    unused_count: int,
+    annotation_coverage: float,
+) -> int:
+    """由各项指标计算代码质量评分 (0-100)
+
+    结果中已有这些指标时（如跨文件检查修正了未使用导入），可据此重新计算评分。
+    """
+    score = 100
+
+    # 圈复杂度扣分 (每超过1点扣5分，最多扣30分)
+    if cyclomatic_complexity > 10:
+        complexity_penalty = min((cyclomatic_complexity - 10) * 2, 30)
+        score -= complexity_penalty
+
+    # 嵌套深度扣分 (每超过1层扣3分，最多扣15分)
+    if max_nesting_depth > 4:
+        nesting_penalty = min((max_nesting_depth - 4) * 3, 15)
+        score -= nesting_penalty
 
-        # 圈复杂度扣分 (每超过1点扣5分，最多扣30分)
-        if self.cyclomatic_complexity > 10:
-            complexity_penalty = min((self.cyclomatic_complexity - 10) * 2, 30)
-            score -= complexity_penalty
+    # 未使用导入扣分 (每个扣2分，最多扣10分)
+    score -= import_penalty(unused_count)
 
-        # 嵌套深度扣分 (每超过1层扣3分，最多扣15分)
-        if self.max_nesting_depth > 4:
-            nesting_penalty = min((self.max_nesting_depth - 4) * 3, 15)
-            score -= nesting_penalty
+    # 类型注解扣分 (覆盖率低于50%扣分)
+    if annotation_coverage < 50:
+        annotation_penalty = int((50 - annotation_coverage) * 0.3)
+        score -= annotation_penalty
 
-        # 未使用导入扣分 (每个扣2分，最多扣10分)
-        import_penalty = min(len(unused_imports) * 2, 10)
-        score -= import_penalty
+    return max(0, score)
 
-        # 类型注解扣分 (覆盖率低于50%扣分)
-        if annotation_coverage < 50:
-            annotation_penalty = int((50 - annotation_coverage) * 0.3)
-            score -= annotation_penalty
 
-        return max(0, score)
+def find_unused_imports(wrapper: MetadataWrapper) -> List[str]:
+    """基于作用域分析找出未被引用的导入名
+
+    同名的局部变量不会再掩盖未使用的模块级导入；
+    ``import a.b`` 只要 ``a`` 或 ``a.b`` 任一被引用即视为已使用。
+    """
+    return _unused_names(_import_bindings(wrapper))
+
+
+def find_unused_import_aliases(wrapper: MetadataWrapper) -> List[cst.ImportAlias]:
+    """未使用导入对应的 ImportAlias 节点
+
+    与 find_unused_imports 不同，同名的多个导入绑定（如模块级已使用的
+    ``import os`` 与函数内未使用的 ``import os``）按节点区分，
+    UnusedImportRemover 据此只删除真正未使用的那一个。
+    """
+    return _unused_aliases(_import_bindings(wrapper))
+
+
+def _unused_names(bindings: Dict[tuple, tuple]) -> List[str]:
+    return list(
+        dict.fromkeys(name for (_, name), (used, _, _) in bindings.items() if not used)
+    )
+
+
+def _unused_aliases(bindings: Dict[tuple, tuple]) -> List[cst.ImportAlias]:
+    return [
+        alias
+        for (_, name), (used, _, node) in bindings.items()
+        if not used
+        for alias in node.names
+        if bound_name(alias) == name
+    ]
+
+
+def bound_name(alias: cst.ImportAlias) -> str:
+    """导入别名在当前作用域绑定的名字：``import a.b`` 绑定 ``a``，``as`` 时为别名"""
+    if alias.asname is not None:
+        return alias.asname.name.value
+    node = alias.name
+    while isinstance(node, cst.Attribute):
+        node = node.value
+    return node.value
+
+
+def _import_bindings(wrapper: MetadataWrapper) -> Dict[tuple, tuple]:
+    """{(导入语句 id, 绑定的顶层名): (是否被引用, 是否为模块级绑定, 导入语句节点)}
+
+    保持出现顺序。
+    """
+    scopes = wrapper.resolve(ScopeProvider)
+    bindings: Dict[tuple, tuple] = {}
+    for scope in dict.fromkeys(s for s in scopes.values() if s is not None):
+        is_global = isinstance(scope, GlobalScope)
+        for assignment in scope.assignments:
+            node = getattr(assignment, "node", None)
+            if not isinstance(node, (cst.Import, cst.ImportFrom)):
+                continue
+            if isinstance(node, cst.ImportFrom) and _is_future_import(node):
+                continue
+            key = (id(node), assignment.name.split(".")[0])
+            used = bindings.get(key, (False,))[0]
+            bindings[key] = (used or bool(assignment.references), is_global, node)
+    return bindings
+
+
+def import_penalty(unused_count: int) -> int:
+    """未使用导入的扣分：每个扣2分，最多扣10分"""
+    return min(unused_count * 2, 10)
+
+
+def _is_future_import(node: cst.ImportFrom) -> bool:
+    return isinstance(node.module, cst.Name) and node.module.value == "__future__"
 
 
 class MetricsVisitor(cst.CSTVisitor):
-    def __init__(self, metrics: CodeMetrics):
+    """统计模块指标，并为每个函数/类记录行范围与圈复杂度
+
+    Args:
+        metrics: 累加结果的 CodeMetrics
+        positions: PositionProvider 的解析结果；缺省时行号记为 1
+    """
+
+    def __init__(
+        self,
+        metrics: CodeMetrics,
+        positions: Optional[Mapping[cst.CSTNode, object]] = None,
+    ):
         self.metrics = metrics
-
-    def visit_If(self, node: cst.If) -> bool:
+        self.positions = positions
+        # 正在访问的函数与类（由外到内）；分支计入最内层函数与所有外层类
+        self.function_stack: List[FunctionMetrics] = []
+        self.class_stack: List[ClassMetrics] = []
+        self._class_bodies: List[cst.BaseSuite] = []
+
+    def _span(self, node: cst.CSTNode) -> Tuple[int, int]:
+        if self.positions is None:
+            return 1, 1
+        position = self.positions[node]
+        return position.start.line, position.end.line
+
+    def _branch(self) -> None:
         self.metrics.cyclomatic_complexity += 1
+        if self.function_stack:
+            self.function_stack[-1].complexity += 1
+        for class_metrics in self.class_stack:
+            class_metrics.complexity += 1
         self._enter_block()
+
+    def visit_If(self, node: cst.If) -> bool:
+        self._branch()
         return True
 
     def visit_For(self, node: cst.For) -> bool:
-        self.metrics.cyclomatic_complexity += 1
-        self._enter_block()
+        self._branch()
         return True
 
     def visit_While(self, node: cst.While) -> bool:
-        self.metrics.cyclomatic_complexity += 1
-        self._enter_block()
+        self._branch()
         return True
 
     def visit_Try(self, node: cst.Try) -> bool:
@@ -167,9 +506,7 @@ class MetricsVisitor(cst.CSTVisitor):
         self.metrics.function_count += 1
         self.metrics.total_functions += 1
 
-        # 获取函数位置信息（简化处理）
-        line_start = 1
-        line_end = 1
+        line_start, line_end = self._span(node)
 
         # 检查返回类型注解
         has_return_annotation = node.returns is not None
@@ -193,7 +530,7 @@ class MetricsVisitor(cst.CSTVisitor):
             name=node.name.value,
             line_start=line_start,
             line_end=line_end,
-            complexity=1,  # 会在访问控制流时更新
+            complexity=1,  # 访问函数体内的分支时累加
             params_count=len(params),
             params_without_annotation=missing_params,
             has_return_annotation=has_return_annotation,
@@ -211,6 +548,9 @@ class MetricsVisitor(cst.CSTVisitor):
         # 保存到列表
         self.metrics.functions_list.append(func_metrics)
         self.metrics.current_function = func_metrics
+        if self.class_stack and self._is_method(node):
+            self.class_stack[-1].methods_count += 1
+        self.function_stack.append(func_metrics)
 
         self._enter_block()
         return True
@@ -218,9 +558,7 @@ class MetricsVisitor(cst.CSTVisitor):
     def visit_ClassDef(self, node: cst.ClassDef) -> bool:
         self.metrics.class_count += 1
 
-        # 获取类位置信息（简化处理）
-        line_start = 1
-        line_end = 1
+        line_start, line_end = self._span(node)
 
         # 检查文档字符串
         has_docstring = self._has_docstring(node.body)
@@ -237,6 +575,8 @@ class MetricsVisitor(cst.CSTVisitor):
 
         self.metrics.classes_list.append(class_metrics)
         self.metrics.current_class = class_metrics
+        self.class_stack.append(class_metrics)
+        self._class_bodies.append(node.body)
 
         self._enter_block()
         return True
@@ -292,7 +632,14 @@ class MetricsVisitor(cst.CSTVisitor):
 
     def leave_FunctionDef(self, node: cst.FunctionDef) -> None:
         self.metrics.current_nesting -= 1
-        self.metrics.current_function = None
+        self.function_stack.pop()
+        self.metrics.current_function = (
+            self.function_stack[-1] if self.function_stack else None
+        )
+
+    def _is_method(self, node: cst.FunctionDef) -> bool:
+        """函数是否直接定义在最内层类的类体中"""
+        return any(stmt is node for stmt in self._class_bodies[-1].body)
 
     def _has_docstring(self, body: cst.IndentedBlock) -> bool:
         """检查函数/类是否有docstring"""
@@ -309,4 +656,6 @@ class MetricsVisitor(cst.CSTVisitor):
 
     def leave_ClassDef(self, node: cst.ClassDef) -> None:
         self.metrics.current_nesting -= 1
-        self.metrics.current_class = None
+        self.class_stack.pop()
+        self._class_bodies.pop()
+        self.metrics.current_class = self.class_stack[-1] if self.class_stack else None
@@ -1,30 +1,298 @@
 # codeinsight/checker.py
+import abc
+import inspect
+import re
+import time
 import libcst as cst
-from typing import List
+from collections import defaultdict
+from contextlib import ExitStack
+from libcst.metadata import MetadataWrapper, ScopeProvider
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Type, Union
+
+
+class BugRule(cst.MetadataDependent):
+    """Bug 检测规则基类
+
+    子类通过 node_types 声明自己关心的节点类型，扫描器只会在这些节点上调用 check。
+    需要元数据（如 ScopeProvider）的规则声明 METADATA_DEPENDENCIES，
+    同一文件的元数据由共享的 MetadataWrapper 计算一次后供所有规则使用。
+    """
+
+    name: str = ""
+    node_types: Tuple[Type[cst.CSTNode], ...] = ()
+    # 触发词：源码中不包含任何一个触发词时该规则不可能命中，可直接跳过。
+    # 为空表示规则总是需要运行。
+    trigger_tokens: Tuple[bytes, ...] = ()
+
+    @abc.abstractmethod
+    def check(self, node: cst.CSTNode) -> List[str]:
+        """检查单个节点，返回发现的问题描述"""
+
+
+class TriggerIndex:
+    """多模式触发词扫描器
+
+    所有触发词编译为一个正则交替式，在原始字节上一次扫描找出出现过的触发词
+    （与 Aho–Corasick 一样是单遍多模式匹配，但由 re 的 C 实现完成）。
+    使用零宽前瞻保证重叠出现也能被发现，被包含的短触发词随长触发词一并标记。
+    """
+
+    def __init__(self, tokens: Iterable[bytes]):
+        self.tokens = sorted(set(tokens), key=len, reverse=True)
+        self._implied = {
+            token: {t for t in self.tokens if t in token} for token in self.tokens
+        }
+        self._pattern = (
+            re.compile(b"(?=(" + b"|".join(re.escape(t) for t in self.tokens) + b"))")
+            if self.tokens
+            else None
+        )
+
+    def scan(self, data: bytes) -> Set[bytes]:
+        """返回 data 中出现过的触发词集合"""
+        found: Set[bytes] = set()
+        if self._pattern is None:
+            return found
+        for match in self._pattern.finditer(data):
+            token = match.group(1)
+            if token not in found:
+                found |= self._implied[token]
+                if len(found) == len(self.tokens):
+                    break
+        return found
+
+
+class RuleRegistry:
+    """规则注册表：按节点类型建立分派表，并统计每条规则的耗时"""
 
-class BugPatternScanner(cst.CSTVisitor):
-    """扫描代码中的逻辑风险和潜在 Bug"""
     def __init__(self):
-        self.findings = []
+        self.rules: Dict[str, Type[BugRule]] = {}
+        self.timings: Dict[str, float] = defaultdict(float)
+        self._trigger_indexes: Dict[FrozenSet[str], TriggerIndex] = {}
+
+    def register(self, rule_cls: Type[BugRule]) -> Type[BugRule]:
+        """注册规则类，可作为装饰器使用"""
+        if not rule_cls.name:
+            raise ValueError(f"规则 {rule_cls.__name__} 缺少 name")
+        if inspect.isabstract(rule_cls):
+            raise ValueError(f"规则 {rule_cls.__name__} 未实现 check")
+        if rule_cls.name in self.rules:
+            raise ValueError(f"规则 '{rule_cls.name}' 已注册")
+        self.rules[rule_cls.name] = rule_cls
+        return rule_cls
+
+    def select(
+        self,
+        enabled: Optional[Iterable[str]] = None,
+        disabled: Optional[Iterable[str]] = None,
+    ) -> List[BugRule]:
+        """根据配置选出启用的规则实例
+
+        Args:
+            enabled: 只启用这些规则（None 表示全部）
+            disabled: 需要禁用的规则
+        """
+        names = list(self.rules) if enabled is None else list(enabled)
+        unknown = [n for n in names if n not in self.rules]
+        if unknown:
+            raise ValueError(f"未知规则: {', '.join(unknown)}")
+        skip = set(disabled or ())
+        return [self.rules[n]() for n in names if n not in skip]
+
+    def applicable(
+        self, rules: List[BugRule], source: Union[str, bytes]
+    ) -> List[BugRule]:
+        """根据源码中出现的触发词过滤出可能命中的规则"""
+        key = frozenset(rule.name for rule in rules)
+        index = self._trigger_indexes.get(key)
+        if index is None:
+            index = TriggerIndex(t for rule in rules for t in rule.trigger_tokens)
+            self._trigger_indexes[key] = index
+        data = source.encode("utf-8") if isinstance(source, str) else source
+        hits = index.scan(data)
+        return [
+            rule
+            for rule in rules
+            if not rule.trigger_tokens or hits.intersection(rule.trigger_tokens)
+        ]
+
+    def build_dispatch(
+        self, rules: List[BugRule]
+    ) -> Dict[Type[cst.CSTNode], List[BugRule]]:
+        """构建 节点类型 -> 规则列表 的分派表"""
+        dispatch: Dict[Type[cst.CSTNode], List[BugRule]] = defaultdict(list)
+        for rule in rules:
+            for node_type in rule.node_types:
+                dispatch[node_type].append(rule)
+        return dict(dispatch)
+
+    def record(self, name: str, elapsed: float) -> None:
+        self.timings[name] += elapsed
+
+    def timing_report(self) -> Dict[str, float]:
+        """返回每条规则累计耗时（秒），按耗时降序"""
+        return dict(sorted(self.timings.items(), key=lambda kv: kv[1], reverse=True))
+
+    def reset_timings(self) -> None:
+        self.timings.clear()
+
+
+DEFAULT_REGISTRY = RuleRegistry()
+
+
+@DEFAULT_REGISTRY.register
+class MutableDefaultRule(BugRule):
+    """检测可变默认参数 (如 def func(a=[]))"""
+
+    name = "mutable-default"
+    node_types = (cst.Param,)
+    trigger_tokens = (b"def", b"lambda")
 
-    def visit_Param(self, node: cst.Param) -> None:
-        # 检测可变默认参数 (如 def func(a=[]))
+    def check(self, node: cst.Param) -> List[str]:
         if isinstance(node.default, (cst.List, cst.Dict)):
-            self.findings.append(f"⚠️ 潜在 Bug: 参数 '{node.name.value}' 使用了可变默认对象。")
-
-    def visit_Call(self, node: cst.Call) -> None:
-        # 检测危险函数 eval() 或 exec()
-        if isinstance(node.func, cst.Name) and node.func.value in ['eval', 'exec']:
-            self.findings.append(f"❌ 安全漏洞: 发现 '{node.func.value}' 调用，存在代码注入风险。")
-        
-        # 检测 subprocess 的 shell=True 风险
-        if isinstance(node.func, cst.Attribute) and node.func.attr.value == 'run':
+            return [f"⚠️ 潜在 Bug: 参数 '{node.name.value}' 使用了可变默认对象。"]
+        return []
+
+
+@DEFAULT_REGISTRY.register
+class DangerousCallRule(BugRule):
+    """检测危险函数 eval() 或 exec()"""
+
+    name = "dangerous-call"
+    node_types = (cst.Call,)
+    trigger_tokens = (b"eval", b"exec")
+
+    def check(self, node: cst.Call) -> List[str]:
+        if isinstance(node.func, cst.Name) and node.func.value in ["eval", "exec"]:
+            return [f"❌ 安全漏洞: 发现 '{node.func.value}' 调用，存在代码注入风险。"]
+        return []
+
+
+@DEFAULT_REGISTRY.register
+class ShellTrueRule(BugRule):
+    """检测 subprocess 的 shell=True 风险"""
+
+    name = "subprocess-shell"
+    node_types = (cst.Call,)
+    trigger_tokens = (b"shell",)
+
+    def check(self, node: cst.Call) -> List[str]:
+        if isinstance(node.func, cst.Attribute) and node.func.attr.value == "run":
             for arg in node.args:
-                if arg.keyword and arg.keyword.value == 'shell':
-                    if isinstance(arg.value, cst.Name) and arg.value.value == 'True':
-                        self.findings.append("❌ 安全风险: subprocess 开启了 shell=True。")
-
-def check_logic_bugs(tree: cst.Module) -> List[str]:
-    scanner = BugPatternScanner()
-    tree.visit(scanner)
-    return scanner.findings
\ No newline at end of file
+                if arg.keyword and arg.keyword.value == "shell":
+                    if isinstance(arg.value, cst.Name) and arg.value.value == "True":
+                        return ["❌ 安全风险: subprocess 开启了 shell=True。"]
+        return []
+
+
+@DEFAULT_REGISTRY.register
+class ShadowedImportRule(BugRule):
+    """检测函数内的局部名称遮蔽模块级导入"""
+
+    name = "shadowed-import"
+    node_types = (cst.FunctionDef,)
+    trigger_tokens = (b"import",)
+    METADATA_DEPENDENCIES = (ScopeProvider,)
+
+    def check(self, node: cst.FunctionDef) -> List[str]:
+        # 函数自身的作用域挂在参数节点上，FunctionDef 节点本身属于外层作用域
+        scope = self.get_metadata(ScopeProvider, node.params, None)
+        if scope is None:
+            return []
+        imported = {
+            a.name
+            for a in scope.globals.assignments
+            if isinstance(getattr(a, "node", None), (cst.Import, cst.ImportFrom))
+        }
+        findings = []
+        for local_name in dict.fromkeys(a.name for a in scope.assignments):
+            if local_name in imported:
+                findings.append(
+                    f"⚠️ 变量遮蔽: 函数 '{node.name.value}' 中的局部名称 '{local_name}' 遮蔽了模块级导入。"
+                )
+        return findings
+
+
+class BugPatternScanner(cst.CSTVisitor):
+    """扫描代码中的逻辑风险和潜在 Bug
+
+    每个节点只查一次分派表，只调用声明了该节点类型的规则，
+    因此扫描耗时与节点数相关，而不随规则总数增长。
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[BugRule]] = None,
+        registry: RuleRegistry = DEFAULT_REGISTRY,
+    ):
+        self.findings: List[str] = []
+        self.registry = registry
+        if rules is None:
+            rules = registry.select()
+        self.dispatch = registry.build_dispatch(rules)
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        rules = self.dispatch.get(type(node))
+        if rules:
+            for rule in rules:
+                start = time.perf_counter()
+                self.findings.extend(rule.check(node))
+                self.registry.record(rule.name, time.perf_counter() - start)
+        return True
+
+
+def check_logic_bugs(
+    tree: Union[cst.Module, MetadataWrapper],
+    enabled: Optional[Iterable[str]] = None,
+    disabled: Optional[Iterable[str]] = None,
+    registry: RuleRegistry = DEFAULT_REGISTRY,
+    source: Optional[Union[str, bytes]] = None,
+) -> List[str]:
+    """执行 Bug 扫描
+
+    Args:
+        tree: 已解析的模块，或与其他分析共享的 MetadataWrapper
+        enabled: 只启用这些规则（None 表示全部）
+        disabled: 需要禁用的规则
+        registry: 使用的规则注册表
+        source: 可选的源码，提供时先按触发词过滤规则
+    """
+    rules = registry.select(enabled, disabled)
+    if source is not None:
+        rules = registry.applicable(rules, source)
+    if not rules:
+        return []
+    scanner = BugPatternScanner(rules, registry)
+    needs_metadata = any(rule.get_inherited_dependencies() for rule in rules)
+    if isinstance(tree, MetadataWrapper):
+        wrapper = tree
+    elif needs_metadata:
+        wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+    else:
+        tree.visit(scanner)
+        return scanner.findings
+
+    with ExitStack() as stack:
+        for rule in rules:
+            stack.enter_context(rule.resolve(wrapper))
+        wrapper.module.visit(scanner)
+    return scanner.findings
+
+
+def scan_source(
+    source: Union[str, bytes],
+    enabled: Optional[Iterable[str]] = None,
+    disabled: Optional[Iterable[str]] = None,
+    registry: RuleRegistry = DEFAULT_REGISTRY,
+) -> List[str]:
+    """直接对源码执行 Bug 扫描
+
+    先在原始字节上做触发词预过滤，没有任何规则可能命中时连解析都跳过。
+    """
+    rules = registry.applicable(registry.select(enabled, disabled), source)
+    if not rules:
+        return []
+    tree = cst.parse_module(source)
+    return check_logic_bugs(
+        tree, [rule.name for rule in rules], registry=registry
+    )
@@ -0,0 +1,425 @@
+"""分块报告
+
+几万个文件的目录报告导出为单个 JSON 后动辄数百 MB，打开、传输与比对都不现实。
+分块布局把报告拆成：
+
+    index.json          顶层汇总与按目录的汇总（rollup），以及各目录对应的块
+    chunks/<哈希>.json  各文件的详细结果，每块只含同一目录下至多 chunk_size 个文件
+    viewer.html         静态查看器：先载入 index.json，展开目录时才读取对应的块
+
+块文件以内容哈希命名：重新导出时内容未变的块已经存在，不再写入；
+不再被索引引用的旧块在索引写好后删除。块之间互不依赖，写入在线程池中并行，
+磁盘或网络文件系统的写延迟因此相互重叠（JSON 编码本身仍受 GIL 限制；
+把结果 pickle 到工作进程的开销比编码还高，所以不用进程池）。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .multi_file_analyzer import DataclassEncoder
+
+FORMAT = "codeinsight-chunked"
+VERSION = 1
+INDEX_FILE = "index.json"
+CHUNK_DIR = "chunks"
+VIEWER_FILE = "viewer.html"
+
+
+@dataclass
+class ChunkWriteStats:
+    """一次分块导出的写入统计"""
+
+    chunks: int = 0
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+@dataclass
+class _Rollup:
+    """目录汇总的累加器；只需计数与最差文件，不必像 ProjectAggregator 维护分位数草图"""
+
+    files: int = 0
+    errors: int = 0
+    score_sum: float = 0
+    total_lines: int = 0
+    total_functions: int = 0
+    total_classes: int = 0
+    worst: Optional[Tuple[float, str]] = field(default=None)
+
+    def add(self, file: str, result: Dict[str, Any]) -> None:
+        if "error" in result:
+            self.errors += 1
+            return
+        score = result.get("quality_score", 0)
+        self.files += 1
+        self.score_sum += score
+        self.total_lines += result.get("line_count", 0)
+        self.total_functions += result.get("function_count", 0)
+        self.total_classes += result.get("class_count", 0)
+        if self.worst is None or (score, file) < self.worst:
+            self.worst = (score, file)
+
+    def merge(self, other: "_Rollup") -> None:
+        self.files += other.files
+        self.errors += other.errors
+        self.score_sum += other.score_sum
+        self.total_lines += other.total_lines
+        self.total_functions += other.total_functions
+        self.total_classes += other.total_classes
+        if other.worst is not None and (self.worst is None or other.worst < self.worst):
+            self.worst = other.worst
+
+    def average(self) -> Optional[float]:
+        return round(self.score_sum / self.files, 2) if self.files else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """查看器目录列表需要的少量字段，索引大小随目录数线性增长"""
+        rollup: Dict[str, Any] = {
+            "files": self.files,
+            "errors": self.errors,
+            "total_lines": self.total_lines,
+            "total_functions": self.total_functions,
+            "total_classes": self.total_classes,
+        }
+        if self.worst is not None:
+            rollup["average_quality_score"] = self.average()
+            rollup["worst_file"] = self.worst[1]
+            rollup["worst_file_score"] = self.worst[0]
+        return rollup
+
+
+def _relpath(file: str, base: Path, prefix: str) -> str:
+    # 绝大多数路径以报告目录开头，直接截取前缀，避免逐个构造 Path
+    if file.startswith(prefix):
+        return file[len(prefix) :].replace(os.sep, "/")
+    try:
+        return Path(file).relative_to(base).as_posix()
+    except ValueError:
+        return Path(file).as_posix()
+
+
+def _dirname(rel: str) -> str:
+    return rel.rpartition("/")[0]
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    """先写同目录临时文件再 rename，读者不会看到写了一半的文件"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def plan_chunks(
+    result: Dict[str, Any], chunk_size: int = 500
+) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, Dict[str, Any]]]]:
+    """按目录分组并切块，返回 ({目录: 汇总}, [(目录, {文件: 结果})])
+
+    同一目录的文件按相对路径排序后每 chunk_size 个一块，新增或删除文件
+    只影响所在目录从该位置起的块。目录汇总另含 subtree：整棵子树的文件数与均分。
+    """
+    base = Path(result.get("directory", "."))
+    prefix = "" if str(base) == "." else str(base).rstrip(os.sep) + os.sep
+    by_dir: Dict[str, List[Tuple[str, str]]] = {}
+    for file in result.get("files", {}):
+        rel = _relpath(file, base, prefix)
+        by_dir.setdefault(_dirname(rel), []).append((rel, file))
+
+    files = result.get("files", {})
+    size = max(1, chunk_size)
+    rollups: Dict[str, Dict[str, Any]] = {}
+    subtrees: Dict[str, _Rollup] = {}
+    chunks: List[Tuple[str, Dict[str, Any]]] = []
+    for directory in sorted(by_dir):
+        entries = sorted(by_dir[directory])
+        rollup = _Rollup()
+        for rel, file in entries:
+            rollup.add(rel, files[file])
+        rollups[directory] = rollup.to_dict()
+        for start in range(0, len(entries), size):
+            part = entries[start : start + size]
+            chunks.append((directory, {file: files[file] for _, file in part}))
+
+        # 汇总计入各级上层目录（含根目录 ""）
+        parent: Optional[str] = directory
+        while parent is not None:
+            subtrees.setdefault(parent, _Rollup()).merge(rollup)
+            parent = None if parent == "" else _dirname(parent)
+
+    for directory, subtree in subtrees.items():
+        rollups.setdefault(directory, _Rollup().to_dict())["subtree"] = {
+            "files": subtree.files,
+            "errors": subtree.errors,
+            "average_quality_score": subtree.average(),
+        }
+    return dict(sorted(rollups.items())), chunks
+
+
+def _encode(payload: Dict[str, Any]) -> bytes:
+    text = json.dumps(
+        payload,
+        cls=DataclassEncoder,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return text.encode("utf-8")
+
+
+def _write_chunk(
+    chunk_dir: Path, directory: str, files: Dict[str, Any]
+) -> Tuple[str, bool]:
+    """编码一块并按内容哈希命名写入，返回 (块文件名, 是否新写入)"""
+    data = _encode({"directory": directory, "files": files})
+    name = hashlib.sha256(data).hexdigest()[:24] + ".json"
+    path = chunk_dir / name
+    if path.exists():
+        return name, False
+    _write_file(path, data)
+    return name, True
+
+
+def export_chunked(
+    result: Dict[str, Any],
+    output_dir: Union[str, Path],
+    chunk_size: int = 500,
+    workers: int = 4,
+) -> ChunkWriteStats:
+    """把目录报告导出为分块布局，返回写入统计
+
+    Args:
+        result: analyze_directory 等生成的报告
+        output_dir: 输出目录，不存在时创建；重复导出到同一目录时只写入变化的块
+        chunk_size: 每块最多包含的文件数
+        workers: 并行写入块文件的线程数
+    """
+    output = Path(output_dir)
+    chunk_dir = output / CHUNK_DIR
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    rollups, chunks = plan_chunks(result, chunk_size)
+    stats = ChunkWriteStats(chunks=len(chunks))
+
+    directories = [directory for directory, _ in chunks]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        written = list(
+            pool.map(
+                _write_chunk,
+                [chunk_dir] * len(chunks),
+                directories,
+                [files for _, files in chunks],
+            )
+        )
+
+    referenced = set()
+    for directory, (name, is_new) in zip(directories, written):
+        rollups[directory].setdefault("chunks", []).append(name)
+        referenced.add(name)
+        if is_new:
+            stats.written += 1
+        else:
+            stats.unchanged += 1
+
+    index = {key: value for key, value in result.items() if key != "files"}
+    index.update(
+        {
+            "format": FORMAT,
+            "version": VERSION,
+            "chunk_size": chunk_size,
+            "directories": rollups,
+        }
+    )
+    _write_file(output / INDEX_FILE, _encode(index))
+    viewer = VIEWER_HTML.encode("utf-8")
+    viewer_path = output / VIEWER_FILE
+    if not viewer_path.exists() or viewer_path.read_bytes() != viewer:
+        _write_file(viewer_path, viewer)
+
+    # 索引已指向新块，此时删除旧块不会让读者读到缺块的报告
+    for path in chunk_dir.glob("*.json"):
+        if path.name not in referenced:
+            path.unlink()
+            stats.removed += 1
+    return stats
+
+
+class ChunkedReport:
+    """按需读取分块报告：index 常驻，文件详情按目录载入"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path / INDEX_FILE, "r", encoding="utf-8") as f:
+            self.index: Dict[str, Any] = json.load(f)
+        if self.index.get("format") != FORMAT:
+            raise ValueError(f"{path} 不是分块报告")
+        if self.index.get("version", 0) > VERSION:
+            raise ValueError(f"不支持的分块报告版本: {self.index.get('version')}")
+
+    @property
+    def directories(self) -> Dict[str, Dict[str, Any]]:
+        return self.index["directories"]
+
+    def _read_chunk(self, name: str) -> Dict[str, Any]:
+        with open(self.path / CHUNK_DIR / name, "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+
+    def files_in(self, directory: str) -> Dict[str, Dict[str, Any]]:
+        """某个目录（不含子目录）下各文件的结果"""
+        files: Dict[str, Dict[str, Any]] = {}
+        for name in self.directories.get(directory, {}).get("chunks", []):
+            files.update(self._read_chunk(name))
+        return files
+
+    def iter_files(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """逐块产出全部 (文件, 结果)，同一时刻只持有一块"""
+        for rollup in self.directories.values():
+            for name in rollup.get("chunks", []):
+                yield from self._read_chunk(name).items()
+
+    def to_report(self) -> Dict[str, Any]:
+        """还原为 export_json 格式的完整报告"""
+        report = {
+            key: value
+            for key, value in self.index.items()
+            if key not in ("format", "version", "chunk_size", "directories")
+        }
+        report["files"] = dict(sorted(self.iter_files()))
+        return report
+
+
+def is_chunked_report(path: Union[str, Path]) -> bool:
+    return (Path(path) / INDEX_FILE).is_file()
+
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html lang="zh">
+<head>
+<meta charset="utf-8">
+<title>CodeInsight 报告</title>
+<style>
+body { font: 14px sans-serif; margin: 1.5em; color: #222; }
+table { border-collapse: collapse; width: 100%; margin: .5em 0 1.5em; }
+th, td { border-bottom: 1px solid #ddd; padding: 3px 8px; text-align: left; }
+td.num, th.num { text-align: right; }
+tr.dir { cursor: pointer; }
+tr.dir:hover { background: #f3f6fa; }
+.bad { color: #b00; }
+#pager button { margin-right: .5em; }
+</style>
+</head>
+<body>
+<h1>CodeInsight 报告</h1>
+<div id="summary"></div>
+<p><input id="filter" placeholder="按目录过滤" size="40">
+<span id="pager"></span></p>
+<table>
+<thead><tr><th>目录</th><th class="num">文件</th><th class="num">错误</th>
+<th class="num">平均评分</th><th class="num">子树文件</th><th class="num">子树均分</th>
+<th class="num">行数</th><th>最差文件</th></tr></thead>
+<tbody id="dirs"></tbody>
+</table>
+<h2 id="detail-title"></h2>
+<table>
+<thead><tr><th>文件</th><th class="num">评分</th><th class="num">圈复杂度</th>
+<th class="num">函数</th><th class="num">类</th><th class="num">行数</th>
+<th>未使用导入</th></tr></thead>
+<tbody id="files"></tbody>
+</table>
+<script>
+// 只读取 index.json；点击目录时才载入该目录的块文件。
+// 浏览器通常禁止 file:// 页面读取本地文件，请在报告目录运行 python -m http.server 后访问。
+const PAGE = 200;
+let index = null, names = [], page = 0;
+
+function esc(value) {
+  const div = document.createElement("div");
+  div.textContent = value == null ? "" : String(value);
+  return div.innerHTML;
+}
+
+function cell(value, num) {
+  return "<td" + (num ? ' class="num"' : "") + ">" + esc(value) + "</td>";
+}
+
+function renderSummary() {
+  const s = index.summary || {};
+  document.getElementById("summary").innerHTML =
+    "<p>" + esc(index.directory) + "：文件 " + esc(index.total_files) +
+    "，已分析 " + esc(index.analyzed_files) +
+    (s.average_quality_score != null ? "，平均评分 " + esc(s.average_quality_score) : "") +
+    (s.worst_file ? "，最差文件 " + esc(s.worst_file) + "（" + esc(s.worst_file_score) + "）" : "") +
+    "</p>";
+}
+
+function renderDirs() {
+  const filter = document.getElementById("filter").value;
+  const shown = names.filter(name => name.includes(filter));
+  const pages = Math.max(1, Math.ceil(shown.length / PAGE));
+  page = Math.min(page, pages - 1);
+  const rows = shown.slice(page * PAGE, (page + 1) * PAGE).map(name => {
+    const d = index.directories[name], t = d.subtree || {};
+    return '<tr class="dir" data-dir="' + encodeURIComponent(name) + '">' +
+      cell(name || ".") + cell(d.files, 1) + cell(d.errors, 1) +
+      cell(d.average_quality_score, 1) + cell(t.files, 1) +
+      cell(t.average_quality_score, 1) + cell(d.total_lines, 1) +
+      cell(d.worst_file ? d.worst_file + " (" + d.worst_file_score + ")" : "") + "</tr>";
+  });
+  document.getElementById("dirs").innerHTML = rows.join("");
+  document.getElementById("pager").innerHTML =
+    '<button id="prev">上一页</button>' + (page + 1) + " / " + pages +
+    ' <button id="next">下一页</button>';
+  document.getElementById("prev").onclick = () => { page = Math.max(0, page - 1); renderDirs(); };
+  document.getElementById("next").onclick = () => { page += 1; renderDirs(); };
+}
+
+async function openDir(name) {
+  const chunks = index.directories[name].chunks || [];
+  document.getElementById("detail-title").textContent = (name || ".") + " 载入中…";
+  const parts = await Promise.all(chunks.map(c =>
+    fetch("chunks/" + c).then(r => r.json())));
+  const rows = [];
+  for (const part of parts) {
+    for (const [file, r] of Object.entries(part.files)) {
+      if (r.error) {
+        rows.push("<tr>" + cell(file) + '<td class="bad" colspan="6">' + esc(r.error) + "</td></tr>");
+        continue;
+      }
+      rows.push("<tr>" + cell(file) + cell(r.quality_score, 1) +
+        cell(r.cyclomatic_complexity, 1) + cell(r.function_count, 1) +
+        cell(r.class_count, 1) + cell(r.line_count, 1) +
+        cell((r.unused_imports || []).join(", ")) + "</tr>");
+    }
+  }
+  document.getElementById("detail-title").textContent = (name || ".") + "（" + rows.length + " 个文件）";
+  document.getElementById("files").innerHTML = rows.join("");
+}
+
+document.getElementById("dirs").onclick = event => {
+  const row = event.target.closest("tr.dir");
+  if (row) openDir(decodeURIComponent(row.dataset.dir));
+};
+document.getElementById("filter").oninput = () => { page = 0; renderDirs(); };
+
+fetch("index.json").then(r => r.json()).then(data => {
+  index = data;
+  names = Object.keys(index.directories).sort();
+  renderSummary();
+  renderDirs();
+});
+</script>
+</body>
+</html>
+"""
@@ -1,110 +1,493 @@
 import argparse
+import os
 import sys
 from pathlib import Path
-import libcst as cst
-
-# 核心模块导入
-from codeinsight.refactor import UnusedImportRemover
-from .analyzer import CodeMetrics
-from .cst_printer import print_cst_tree
-from .multi_file_analyzer import MultiFileAnalyzer, ReportExporter
-from .code_detector import (
-    CodeDuplicateDetector,
-    ASTBasedDuplicateDetector,
-    format_duplicate_report,
+
+# 重量级依赖（libcst、GitPython 以及各检测器）全部在子命令内部按需导入，
+# 保证 `codeinsight file.py` 的冷启动时间主要花在解析上而不是导入上。
+
+SUBCOMMANDS = (
+    "analyze",
+    "duplicates",
+    "evolution",
+    "check",
+    "fix",
+    "merge",
+    "query",
+)
+
+# analyze 子命令中只在目录模式下生效的选项：(属性名, 选项名)
+DIRECTORY_ONLY_OPTIONS = (
+    ("index", "--index"),
+    ("chunked_report", "--chunked-report"),
+    ("sqlite", "--sqlite"),
+    ("since", "--since"),
+    ("baseline", "--baseline"),
+    ("shard", "--shard"),
+    ("memory_budget", "--memory-budget"),
+    ("max_files_per_worker", "--max-files-per-worker"),
+    ("max_worker_mb", "--max-worker-mb"),
+    ("time_budget", "--time-budget"),
+    ("summary_only", "--summary-only"),
 )
-from .evolution import EvolutionAnalyzer
-from .checker import check_logic_bugs
 
-def main():
+
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="CodeInsight: 多维度 Python 代码 quality 分析工具"
     )
-    parser.add_argument("file", help="Python 源文件或目录路径")
-    parser.add_argument(
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    # 各子命令共用的参数
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("file", help="Python 源文件或目录路径")
+    common.add_argument(
+        "--directory", "-d", action="store_true", help="分析目录下的所有Python文件"
+    )
+    common.add_argument(
+        "--recursive", "-r", action="store_true", default=True, help="递归分析子目录"
+    )
+    common.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar="N",
+        help="目录模式下的并行工作进程数（默认 CPU 核数）",
+    )
+
+    rules = argparse.ArgumentParser(add_help=False)
+    rules.add_argument(
+        "--disable-rule",
+        action="append",
+        default=[],
+        metavar="RULE",
+        help="禁用指定的 Bug 检测规则（可多次指定）",
+    )
+
+    dup_mode = argparse.ArgumentParser(add_help=False)
+    dup_mode.add_argument(
+        "--duplicate-mode",
+        choices=["block", "function", "token"],
+        default="block",
+        help="重复检测模式: block(代码块)、function(函数) 或 token(记号流，无需解析，"
+        "可归一化标识符与字面量)",
+    )
+
+    dry_run = argparse.ArgumentParser(add_help=False)
+    dry_run.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="只输出 unified diff，不修改文件",
+    )
+
+    index = argparse.ArgumentParser(add_help=False)
+    index.add_argument(
+        "--index",
+        metavar="INDEX_FILE",
+        help="目录模式：持久化的项目符号索引，只为变化的文件更新",
+    )
+
+    analyze = subparsers.add_parser(
+        "analyze",
+        parents=[common, rules, dup_mode, dry_run, index],
+        help="代码质量分析（默认子命令）",
+    )
+    analyze.add_argument(
         "--fix",
         action="store_true",
         help="自动修复可安全修复的问题（目前支持：移除未使用导入）",
     )
-    parser.add_argument("--show-cst", action="store_true", help="显示简化语法树")
-    parser.add_argument(
+    analyze.add_argument("--show-cst", action="store_true", help="显示简化语法树")
+    analyze.add_argument(
+        "--cst-format",
+        choices=("tree", "jsonl", "histogram"),
+        default="tree",
+        help="--show-cst 的输出形式：缩进树、JSON Lines 或节点类型直方图",
+    )
+    analyze.add_argument(
+        "--cst-type",
+        action="append",
+        metavar="TYPE",
+        help="只输出该类型的节点（如 FunctionDef，可重复）",
+    )
+    analyze.add_argument(
+        "--cst-lines",
+        metavar="START-END",
+        type=_parse_line_range,
+        help="只输出与该行号范围相交的节点",
+    )
+    analyze.add_argument(
+        "--cst-depth",
+        type=int,
+        help="最大展开深度（未指定过滤条件的树形输出默认 3，其余默认不限）",
+    )
+    analyze.add_argument(
+        "--cst-output", metavar="FILE", help="把 --show-cst 的输出写入文件"
+    )
+    analyze.add_argument(
         "--show-functions", action="store_true", help="显示详细的函数分析"
     )
-    parser.add_argument("--detect-duplicates", action="store_true", help="检测代码重复")
-    parser.add_argument(
-        "--duplicate-mode",
-        choices=["block", "function"],
-        default="block",
-        help="重复检测模式: block(代码块) 或 function(函数)",
+    analyze.add_argument(
+        "--detect-duplicates", action="store_true", help="检测代码重复"
     )
-    parser.add_argument(
-        "--directory", "-d", action="store_true", help="分析目录下的所有Python文件"
+    analyze.add_argument(
+        "--json",
+        "-j",
+        metavar="OUTPUT_FILE",
+        help="导出为JSON格式（以 .gz 结尾时 gzip 压缩）",
     )
-    parser.add_argument("--json", "-j", metavar="OUTPUT_FILE", help="导出为JSON格式")
-    parser.add_argument(
-        "--recursive", "-r", action="store_true", default=True, help="递归分析子目录"
+    analyze.add_argument(
+        "--compact-json", action="store_true", help="导出紧凑（无缩进）的 JSON"
+    )
+    analyze.add_argument(
+        "--chunked-report",
+        metavar="OUTPUT_DIR",
+        help="目录模式：导出为分块报告（index.json + 按目录切分的块 + viewer.html），"
+        "重复导出时只重写内容变化的块",
+    )
+    analyze.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        metavar="N",
+        help="分块报告中每块最多包含的文件数（默认 500）",
+    )
+    analyze.add_argument(
+        "--sqlite",
+        metavar="DB_FILE",
+        help="目录模式：把文件、函数与类的指标写入 SQLite 库，供 query 子命令查询",
+    )
+    analyze.add_argument(
+        "--evolution", action="store_true", help="分析文件的历史演化趋势"
+    )
+    analyze.add_argument(
+        "--check-bugs", action="store_true", help="执行深度逻辑 Bug 扫描"
+    )
+    analyze.add_argument(
+        "--profile",
+        metavar="TRACE_FILE",
+        help="记录各文件各阶段的墙钟/CPU 时间，写出 Chrome trace JSON",
+    )
+    analyze.add_argument(
+        "--since",
+        metavar="REF",
+        help="目录模式：只分析相对 git 引用 REF 有变化的文件（含重命名）",
+    )
+    analyze.add_argument(
+        "--baseline",
+        metavar="REPORT",
+        help="与 --since 配合：未变化文件的结果取自该基准 JSON 报告（或分块报告目录）",
+    )
+    analyze.add_argument(
+        "--shard",
+        metavar="I/N",
+        type=_parse_shard,
+        help="目录模式：只分析按路径哈希分到第 I 片（共 N 片，I 从 1 开始）的文件",
+    )
+    analyze.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="目录模式：所有工作进程合计的内存预算，超出时暂缓放行新文件",
     )
-    parser.add_argument("--evolution", action="store_true", help="分析文件的历史演化趋势")
-    parser.add_argument("--check-bugs", action="store_true", help="执行深度逻辑 Bug 扫描")
-    
-    args = parser.parse_args()
+    analyze.add_argument(
+        "--max-files-per-worker",
+        type=int,
+        metavar="N",
+        help="目录模式：工作进程分析满 N 个文件后替换为新进程",
+    )
+    analyze.add_argument(
+        "--max-worker-mb",
+        type=float,
+        metavar="MB",
+        help="目录模式：工作进程常驻内存超过该值后替换为新进程",
+    )
+    analyze.add_argument(
+        "--memory-probe",
+        choices=["rss", "tracemalloc"],
+        default="rss",
+        help="单文件峰值内存的测量方式（默认 rss；tracemalloc 更慢，只计 Python 堆）",
+    )
+    analyze.add_argument(
+        "--analysis-profile",
+        choices=["fast", "standard", "deep"],
+        help="分析档位: fast(只算指标，用 ast 快速解析)、standard(加 Bug 扫描)、"
+        "deep(再加重复检测、演化历史与跨文件索引)",
+    )
+    analyze.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="目录模式：整次分析的时间预算，按风险与新近程度优先分析，"
+        "超时未分析的文件会列出",
+    )
+    analyze.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="目录模式：只流式汇总（含分位数），不在内存与报告中保留各文件结果",
+    )
+    analyze.set_defaults(handler=_cmd_analyze)
 
-    filepath = Path(args.file)
+    duplicates = subparsers.add_parser(
+        "duplicates", parents=[common, dup_mode], help="检测代码重复"
+    )
+    duplicates.set_defaults(handler=_cmd_duplicates)
 
-    # 处理目录分析
-    if args.directory or filepath.is_dir():
-        _analyze_directory(filepath, args)
+    evolution = subparsers.add_parser(
+        "evolution", parents=[common], help="分析文件的历史演化趋势"
+    )
+    evolution.add_argument(
+        "--limit", type=int, default=10, help="每个文件分析的历史版本数（默认 10）"
+    )
+    evolution.add_argument(
+        "--trend",
+        action="store_true",
+        help="输出趋势统计：移动平均、评分变点、回归斜率、按作者与按周聚合（需要 numpy）",
+    )
+    evolution.add_argument(
+        "--window", type=int, default=5, help="移动平均窗口（按版本数，默认 5）"
+    )
+    evolution.add_argument(
+        "--export",
+        metavar="FILE",
+        help="导出趋势统计；.csv 导出 --table 指定的表，其余为紧凑 JSON",
+    )
+    evolution.add_argument(
+        "--table",
+        choices=["series", "authors", "weeks"],
+        default="series",
+        help="CSV 导出的表（默认 series）",
+    )
+    evolution.set_defaults(handler=_cmd_evolution)
+
+    check = subparsers.add_parser(
+        "check", parents=[common, rules], help="执行深度逻辑 Bug 扫描"
+    )
+    check.set_defaults(handler=_cmd_check)
+
+    fix = subparsers.add_parser(
+        "fix", parents=[common, dry_run, index], help="移除未使用导入"
+    )
+    fix.set_defaults(handler=_cmd_fix)
+
+    merge = subparsers.add_parser("merge", help="合并各分片导出的 JSON 报告")
+    merge.add_argument(
+        "reports", nargs="+", help="各分片的 JSON 报告（或分块报告目录）"
+    )
+    merge.add_argument(
+        "--json",
+        "-j",
+        metavar="OUTPUT_FILE",
+        help="合并后的报告输出路径（以 .gz 结尾时 gzip 压缩）",
+    )
+    merge.add_argument(
+        "--compact-json", action="store_true", help="导出紧凑（无缩进）的 JSON"
+    )
+    merge.add_argument(
+        "--chunked-report",
+        metavar="OUTPUT_DIR",
+        help="把合并后的报告导出为分块报告目录",
+    )
+    merge.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        metavar="N",
+        help="分块报告中每块最多包含的文件数（默认 500）",
+    )
+    merge.set_defaults(handler=_cmd_merge)
+
+    query = subparsers.add_parser("query", help="查询 --sqlite 导出的指标库")
+    query.add_argument("database", help="SQLite 指标库路径")
+    query.add_argument(
+        "question",
+        nargs="?",
+        default="complex-functions",
+        choices=(
+            "complex-functions",
+            "long-functions",
+            "undocumented-classes",
+            "worst-files",
+        ),
+        help="预置查询（默认 complex-functions）",
+    )
+    query.add_argument("--package", help="只查询该包及其子包，如 codeinsight.sub")
+    query.add_argument(
+        "--limit", type=int, default=100, help="最多返回的行数（默认 100）"
+    )
+    query.add_argument("--sql", help="执行任意只读 SQL（忽略预置查询）")
+    query.set_defaults(handler=_cmd_query)
+
+    return parser
+
+
+def _parse_shard(value: str):
+    """解析 I/N（I 从 1 开始），返回从 0 开始的 (序号, 总数)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为 I/N: {value}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"分片序号超出范围: {value}")
+    return index - 1, count
+
+
+def _parse_line_range(value: str):
+    """解析 START-END 行号范围（闭区间）"""
+    try:
+        start, end = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"行号范围格式应为 START-END: {value}")
+    if start < 1 or end < start:
+        raise argparse.ArgumentTypeError(f"无效的行号范围: {value}")
+    return start, end
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # 兼容旧用法：`codeinsight file.py [--flags]` 等价于 `codeinsight analyze ...`
+    if argv and argv[0] not in SUBCOMMANDS and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "analyze")
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        sys.exit(1)
+    if args.command == "analyze" and not _is_directory_mode(Path(args.file), args):
+        given = [
+            flag
+            for attr, flag in DIRECTORY_ONLY_OPTIONS
+            if getattr(args, attr) is not None and getattr(args, attr) is not False
+        ]
+        if given:
+            parser.error(f"{', '.join(given)} 只能用于目录模式")
+    args.handler(args)
+
+
+def _make_profiler(args):
+    from .profiler import PhaseProfiler
+
+    return PhaseProfiler(enabled=bool(getattr(args, "profile", None)))
+
+
+def _finish_profile(profiler, args) -> None:
+    from .profiler import format_slowest_files
+
+    if not profiler.enabled:
         return
+    slowest = profiler.slowest_files()
+    if slowest:
+        print(format_slowest_files(slowest))
+    profiler.write_chrome_trace(args.profile)
+    print(f"\n✅ 性能追踪已写入: {args.profile}")
+
 
-    # 处理单文件分析
+def _load_module(filepath: Path, profiler=None):
+    """读取并解析单个文件，失败时退出
+
+    文件以字节读入并交给 libcst，按 PEP 263 编码声明解码，非 UTF-8 文件也能分析。
+    """
+    import libcst as cst
+    from .profiler import PhaseProfiler
+    from .source_io import read_source
+
+    profiler = profiler or PhaseProfiler(enabled=False)
     if not filepath.exists() or filepath.suffix != ".py":
         print("错误: 请提供有效的 .py 文件", file=sys.stderr)
         sys.exit(1)
 
-    with open(filepath, "r", encoding="utf-8") as f:
-        source = f.read()
+    with profiler.phase("read", str(filepath)):
+        data = read_source(filepath)
 
     try:
-        tree = cst.parse_module(source)
+        with profiler.phase("parse", str(filepath)):
+            tree = cst.parse_module(data)
+            source = data.decode(tree.encoding)
     except Exception as e:
         print(f"解析失败: {e}", file=sys.stderr)
         sys.exit(1)
+    return source, tree
+
+
+def _is_directory_mode(filepath: Path, args) -> bool:
+    return args.directory or filepath.is_dir()
+
+
+def _cmd_analyze(args) -> None:
+    filepath = Path(args.file)
+
+    # 处理目录分析
+    if _is_directory_mode(filepath, args):
+        _analyze_directory(filepath, args)
+        return
+
+    from libcst.metadata import MetadataWrapper
+    from .analyzer import CodeMetrics
+
+    # 单文件模式下档位折算为对应的开关
+    if args.analysis_profile in ("standard", "deep"):
+        args.check_bugs = True
+    # deep 档位隐式启用的演化分析在无法进行时只警告，不中断其余分析
+    evolution_optional = False
+    if args.analysis_profile == "deep":
+        args.detect_duplicates = True
+        args.duplicate_mode = "token"
+        evolution_optional = not args.evolution
+        args.evolution = True
+
+    profiler = _make_profiler(args)
+    file = str(filepath)
+    source, tree = _load_module(filepath, profiler)
+
+    # 作用域等元数据在 Bug 检查与指标分析之间共享，只计算一次
+    wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+
+    if args.show_cst:
+        with profiler.phase("show_cst", file):
+            _show_cst(tree, args)
 
     # 执行 Bug 检查
     if args.check_bugs:
-        bug_findings = check_logic_bugs(tree)
-        print("\n🐛 深度 Bug 扫描结果:")
-        if not bug_findings:
-            print("   ✅ 未发现常见逻辑缺陷")
-        for bug in bug_findings:
-            print(f"   {bug}")
+        with profiler.phase("check_bugs", file):
+            _print_bug_findings(wrapper, source, args)
 
     # 执行演化分析
     if args.evolution:
-        print("\n⏳ 历史演化轨迹 (过去10个版本):")
-        ea = EvolutionAnalyzer(".")
-        history = ea.analyze_history(str(filepath))
-        for entry in history:
-            print(f"   [{entry['date']}] {entry['commit']} | 评分: {entry['score']} | 复杂度: {entry['complexity']}")
+        with profiler.phase("evolution", file):
+            _print_evolution(filepath, optional=evolution_optional)
 
     # --- 1. 执行分析指标 ---
     metrics = CodeMetrics()
-    result = metrics.analyze(tree, source)
+    with profiler.phase("metrics", file):
+        result = metrics.analyze(tree, source, wrapper)
 
     # --- 2. 自动化修复逻辑 ---
     if args.fix and result["unused_imports"]:
+        from .analyzer import bound_name
+        from .refactor import UnusedImportRemover, atomic_write, protected_imports
+
         print(f"\n🛠️  正在执行自动修复: {filepath.name}")
-        fixer = UnusedImportRemover(set(result["unused_imports"]))
+        # 与 fix 子命令相同：__all__ 中的名字与 import x as x 不删除
+        protected = protected_imports(tree)
+        fixer = UnusedImportRemover(
+            {n for n in result["unused_imports"] if n not in protected},
+            [
+                a
+                for a in metrics.unused_import_aliases
+                if bound_name(a) not in protected
+            ],
+        )
         modified_tree = tree.visit(fixer)
         new_code = modified_tree.code
 
         if new_code != source:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(new_code)
-            print(f"✅ 已自动移除未使用的导入: {', '.join(result['unused_imports'])}")
+            # 按原文件的编码写回
+            atomic_write(filepath, modified_tree.bytes)
+            print(f"✅ 已自动移除未使用的导入: {', '.join(fixer.removed)}")
             source = new_code
             tree = modified_tree
-            result = metrics.analyze(tree, source)
+            result = metrics.apply_import_removal(result, fixer.removed, source)
         else:
             print("💡 未发现可自动修复的变更。")
 
@@ -116,26 +499,508 @@ def main():
     score_emoji = "⭐" if quality_score >= 80 else "👍" if quality_score >= 60 else "⚠️" if quality_score >= 40 else "❌"
     print(f"{score_emoji} 代码质量评分: {quality_score}/100")
 
-    # (中间的统计输出逻辑保持不变...)
-    # ... [篇幅原因，此处省略你代码中已有的 Print 逻辑] ...
-
     # 代码重复检测
     if args.detect_duplicates:
-        print("\n" + "=" * 50)
-        if args.duplicate_mode == "block":
-            detector = CodeDuplicateDetector(min_block_size=5)
-            report = detector.detect(source)
+        with profiler.phase("duplicates", file):
+            _print_duplicates(tree, source, args.duplicate_mode)
+
+    if args.json:
+        from .multi_file_analyzer import ReportExporter
+
+        with profiler.phase("export_json"):
+            ReportExporter.export_json(result, args.json, compact=args.compact_json)
+        print(f"\n✅ 报告已导出到: {args.json}")
+
+    _finish_profile(profiler, args)
+
+
+def _cmd_duplicates(args) -> None:
+    filepath = Path(args.file)
+    if args.duplicate_mode == "token":
+        # 记号流检测不需要语法树，libcst 无法解析的文件也能检测
+        from .source_io import read_source
+
+        if not filepath.is_file():
+            print("错误: 请提供有效的文件", file=sys.stderr)
+            sys.exit(1)
+        _print_duplicates(None, read_source(filepath), "token")
+        return
+    source, tree = _load_module(filepath)
+    _print_duplicates(tree, source, args.duplicate_mode)
+
+
+def _cmd_evolution(args) -> None:
+    filepath = Path(args.file)
+    if not (args.trend or args.export) and filepath.is_file():
+        _print_evolution(filepath, args.limit)
+        return
+    _print_trends(filepath, args)
+
+
+def _cmd_check(args) -> None:
+    filepath = Path(args.file)
+    if _is_directory_mode(filepath, args):
+        _print_directory_bugs(filepath, args)
+        return
+
+    from libcst.metadata import MetadataWrapper
+
+    source, tree = _load_module(filepath)
+    _print_bug_findings(MetadataWrapper(tree, unsafe_skip_copy=True), source, args)
+
+
+def _cmd_fix(args) -> None:
+    filepath = Path(args.file)
+    if _is_directory_mode(filepath, args):
+        _fix_directory(filepath, args)
+        return
+
+    from .refactor import fix_file
+
+    result = fix_file(filepath, dry_run=args.dry_run)
+    if result.error:
+        print(f"修复失败: {result.error}", file=sys.stderr)
+        sys.exit(1)
+    if result.diff:
+        print(result.diff, end="")
+    if result.changed:
+        print(f"✅ 已自动移除未使用的导入: {', '.join(result.removed)}")
+    else:
+        print("💡 未发现可自动修复的变更。")
+
+
+def _cmd_merge(args) -> None:
+    from .multi_file_analyzer import MultiFileAnalyzer, ReportExporter
+
+    reports = [ReportExporter.load_json(path) for path in args.reports]
+    try:
+        result = MultiFileAnalyzer().merge_reports(reports)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    _print_project_summary(result, result["directory"])
+    if args.json:
+        ReportExporter.export_json(result, args.json, compact=args.compact_json)
+        print(f"\n✅ 报告已导出到: {args.json}")
+    if args.chunked_report:
+        stats = ReportExporter.export_chunked(
+            result, args.chunked_report, chunk_size=args.chunk_size
+        )
+        _print_chunk_stats(args.chunked_report, stats)
+
+
+def _cmd_query(args) -> None:
+    from .store import QUERIES, MetricsStore
+
+    if not Path(args.database).is_file():
+        print(f"错误: 找不到指标库 {args.database}", file=sys.stderr)
+        sys.exit(1)
+
+    with MetricsStore(args.database, read_only=True) as store:
+        try:
+            if args.sql:
+                columns, rows = store.query(args.sql)
+            else:
+                columns, rows = QUERIES[args.question](
+                    store, limit=args.limit, package=args.package
+                )
+        except Exception as e:
+            print(f"错误: 查询失败: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def _show_cst(tree, args) -> None:
+    from .cst_printer import cst_histogram, dump_cst_jsonl, print_cst_tree
+
+    filters = {"node_types": args.cst_type, "lines": args.cst_lines}
+    max_depth = args.cst_depth
+    if max_depth is None and args.cst_format == "tree" and not any(filters.values()):
+        max_depth = 3
+
+    out = sys.stdout
+    if args.cst_output:
+        out = open(args.cst_output, "w", encoding="utf-8")
+    try:
+        if args.cst_format == "jsonl":
+            dump_cst_jsonl(tree, out, max_depth=max_depth, **filters)
+        elif args.cst_format == "histogram":
+            histogram = cst_histogram(tree, max_depth=max_depth, **filters)
+            for node_type, count in histogram.most_common():
+                out.write(f"{count:>8}  {node_type}\n")
         else:
-            detector = ASTBasedDuplicateDetector(min_function_size=5)
-            report = detector.detect(tree, source)
-        print(format_duplicate_report(report))
+            print_cst_tree(tree, max_depth=max_depth, file=out, **filters)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def _print_bug_findings(wrapper, source: str, args) -> None:
+    from .checker import check_logic_bugs
+
+    bug_findings = check_logic_bugs(
+        wrapper, disabled=args.disable_rule, source=source
+    )
+    print("\n🐛 深度 Bug 扫描结果:")
+    if not bug_findings:
+        print("   ✅ 未发现常见逻辑缺陷")
+    for bug in bug_findings:
+        print(f"   {bug}")
+
+
+def _print_directory_bugs(dirpath: Path, args) -> None:
+    from .multi_file_analyzer import MultiFileAnalyzer
+
+    findings = MultiFileAnalyzer().scan_bugs(
+        str(dirpath), args.recursive, disabled=args.disable_rule
+    )
+    print("\n🐛 深度 Bug 扫描结果:")
+    if not findings:
+        print("   ✅ 未发现常见逻辑缺陷")
+    for file_path, bugs in findings.items():
+        print(f"   {file_path}")
+        for bug in bugs:
+            print(f"      {bug}")
+
+
+def _open_repo(path: Path, optional: bool = False):
+    """从 path 所在目录定位 git 仓库，返回 (EvolutionAnalyzer, 仓库根目录)
+
+    缺少 GitPython 或 path 不在 git 仓库内时：optional 为 True 只警告并返回 None，
+    否则报错退出。
+    """
+    start = path.resolve()
+    if not start.is_dir():
+        start = start.parent
+    try:
+        from .evolution import EvolutionAnalyzer
+
+        ea = EvolutionAnalyzer(str(start))
+    except ImportError:
+        reason = "未安装 GitPython"
+    except Exception:
+        reason = f"{path} 不在 git 仓库内"
+    else:
+        return ea, Path(ea.repo.working_tree_dir).resolve()
+    if not optional:
+        print(f"错误: 无法进行演化分析: {reason}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\n⚠️ 跳过演化分析: {reason}")
+    return None
+
+
+def _print_evolution(filepath: Path, limit: int = 10, optional: bool = False) -> None:
+    """打印单个文件的演化轨迹；optional 的含义见 _open_repo"""
+    repo = _open_repo(filepath, optional)
+    if repo is None:
+        return
+    ea, root = repo
+
+    # 按仓库根目录的相对路径查询历史，与当前工作目录无关
+    rel = filepath.resolve().relative_to(root)
+    print(f"\n⏳ 历史演化轨迹 (过去{limit}个版本):")
+    history = ea.analyze_history(rel.as_posix(), limit=limit)
+    for entry in history:
+        print(f"   [{entry['date']}] {entry['commit']} | 评分: {entry['score']} | 复杂度: {entry['complexity']}")
+
+
+def _print_trends(path: Path, args) -> None:
+    from .discovery import iter_python_files
+    from .trends import analyze_trends
+
+    ea, root = _open_repo(path)
+    if path.is_dir():
+        files = [
+            f.resolve().relative_to(root).as_posix()
+            for f in iter_python_files(path, args.recursive)
+        ]
+    else:
+        files = [path.resolve().relative_to(root).as_posix()]
+    history = ea.analyze_files(files, limit=args.limit)
+    report = analyze_trends(history, window=args.window)
+
+    print(f"\n📈 演化趋势 ({len(files)} 个文件, {len(history)} 个版本):")
+    print(f"   评分回归斜率: {report.slope_per_week:+.3f} / 周")
+    print(f"   复杂度回归斜率: {report.complexity_slope_per_week:+.3f} / 周")
+    for point in report.change_points:
+        print(
+            f"   变点 [{point['date']}] {point['commit']}: "
+            f"{point['before']:.1f} → {point['after']:.1f}"
+        )
+    authors = report.authors
+    order = sorted(
+        range(len(authors["author"])), key=lambda i: -authors["commits"][i]
+    )
+    for i in order[:10]:
+        print(
+            f"   {authors['author'][i]}: {authors['commits'][i]} 个版本 | "
+            f"平均评分 {authors['mean_score'][i]:.1f} | "
+            f"评分变化 {authors['score_delta'][i]:+.1f}"
+        )
+
+    if args.export:
+        with open(args.export, "w", encoding="utf-8", newline="") as f:
+            if args.export.endswith(".csv"):
+                report.to_csv(f, args.table)
+            else:
+                report.to_json(f)
+        print(f"\n💾 趋势统计已导出至: {args.export}")
+
+
+def _print_duplicates(tree, source, mode: str) -> None:
+    from .code_detector import (
+        CodeDuplicateDetector,
+        ASTBasedDuplicateDetector,
+        TokenDuplicateDetector,
+        format_duplicate_report,
+    )
+
+    print("\n" + "=" * 50)
+    if mode == "block":
+        detector = CodeDuplicateDetector(min_block_size=5)
+        report = detector.detect(source)
+    elif mode == "token":
+        report = TokenDuplicateDetector(min_block_size=5).detect(source)
+    else:
+        detector = ASTBasedDuplicateDetector(min_function_size=5)
+        report = detector.detect(tree, source)
+    print(format_duplicate_report(report))
+
+
+def _load_index(args):
+    """按 --index 加载项目符号索引；未指定时返回 None"""
+    if not args.index:
+        return None
+    from .project_index import ProjectIndex
+
+    return ProjectIndex.load(args.index)
+
+
+def _fix_directory(dirpath: Path, args) -> None:
+    from .refactor import fix_directory, format_fix_summary
+
+    index = _load_index(args)
+    results = fix_directory(
+        dirpath,
+        args.recursive,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        index=index,
+    )
+    if index is not None:
+        index.save(args.index)
+    if args.dry_run:
+        for r in results:
+            if r.diff:
+                print(r.diff, end="")
+    print(format_fix_summary(results))
+
+
+def _print_project_summary(result, dirpath) -> None:
+    summary = result["summary"]
+    print(f"\n📁 项目分析报告: {dirpath}")
+    print("-" * 40)
+    print(f"  文件总数: {result['total_files']}  已分析: {result['analyzed_files']}")
+    if summary:
+        print(f"  平均评分: {summary['average_quality_score']}/100")
+        print(f"  最佳文件: {summary['best_file']} ({summary['best_file_score']})")
+        print(f"  最差文件: {summary['worst_file']} ({summary['worst_file_score']})")
+        print(
+            f"  函数: {summary['total_functions']}  类: {summary['total_classes']}"
+            f"  行数: {summary['total_lines']}"
+        )
+        labels = {
+            "file_score": "文件评分",
+            "function_complexity": "函数复杂度",
+            "function_length": "函数行数",
+        }
+        for name, values in summary.get("percentiles", {}).items():
+            if values["p50"] is None:
+                continue
+            points = "  ".join(f"{p}={v}" for p, v in values.items())
+            print(f"  {labels.get(name, name)}: {points}")
+
+
+def _memory_limits(args):
+    """由命令行参数构造内存调度参数，未指定任何限制时返回 None"""
+    from .memory import MemoryLimits
+
+    if (
+        args.memory_budget is None
+        and args.max_files_per_worker is None
+        and args.max_worker_mb is None
+    ):
+        return None
+    return MemoryLimits(
+        budget_mb=args.memory_budget,
+        max_tasks_per_worker=args.max_files_per_worker,
+        max_worker_mb=args.max_worker_mb,
+        probe=args.memory_probe,
+    )
+
+
+def _print_memory(result) -> None:
+    stats = result["memory"]
+    budget = stats["budget_mb"]
+    print(
+        f"  内存: 预算 {budget if budget is not None else '不限'} MB | "
+        f"最高占用估算 {stats['max_in_use_mb']} MB | "
+        f"单文件峰值 {stats['max_peak_mb']} MB | "
+        f"回收进程 {stats['recycled_workers']} 个"
+    )
+    if stats["crashed_workers"]:
+        print(f"  ⚠️ 异常退出的工作进程: {stats['crashed_workers']} 个")
+    peaks = sorted(
+        (
+            (r["memory"]["delta_mb"], f)
+            for f, r in result.get("files", {}).items()
+            if "memory" in r
+        ),
+        reverse=True,
+    )
+    for delta, file in peaks[:5]:
+        print(f"     +{delta} MB  {file}")
+
+
+def _print_chunk_stats(output_dir: str, stats) -> None:
+    print(
+        f"\n✅ 分块报告已导出到: {output_dir}"
+        f"（{stats.chunks} 块，写入 {stats.written}，未变 {stats.unchanged}，"
+        f"删除 {stats.removed}）"
+    )
+
+
+def _print_profile(result) -> None:
+    files = result.get("files", {})
+    findings = sum(len(r.get("bug_findings", [])) for r in files.values())
+    print(f"  分析档位: {result['profile']}")
+    if result["profile"] != "fast":
+        print(f"  潜在 Bug: {findings} 处")
+    for stage, reason in result.get("skipped_stages", {}).items():
+        print(f"  ⚠️ 跳过阶段 {stage}: {reason}")
+    duplicated = sorted(
+        (
+            (r["duplicates"]["duplicate_percentage"], f)
+            for f, r in files.items()
+            if r.get("duplicates", {}).get("duplicate_lines")
+        ),
+        reverse=True,
+    )
+    for percentage, file in duplicated[:5]:
+        print(f"     重复 {percentage}%  {file}")
+
+
+def _print_time_budget(result) -> None:
+    budget = result["time_budget"]
+    unanalyzed = budget["unanalyzed"]
+    print(
+        f"  时间预算: {budget['seconds']}s | 用时 {budget['elapsed']}s | "
+        f"已分析 {budget['analyzed']} 个文件"
+    )
+    if not unanalyzed:
+        return
+    print(f"  ⏱️ 超出时间预算，未分析 {len(unanalyzed)} 个文件:")
+    for file in unanalyzed[:20]:
+        print(f"     {file}")
+    if len(unanalyzed) > 20:
+        print(f"     ... 另有 {len(unanalyzed) - 20} 个")
+
+
+def _analyze_directory(dirpath: Path, args) -> None:
+    """目录模式：批量修复、Bug 扫描与项目级分析"""
+    from .multi_file_analyzer import MultiFileAnalyzer, ReportExporter
+
+    if not dirpath.is_dir():
+        print(f"错误: {dirpath} 不是有效的目录", file=sys.stderr)
+        sys.exit(1)
+
+    if args.fix:
+        _fix_directory(dirpath, args)
+
+    if args.check_bugs:
+        _print_directory_bugs(dirpath, args)
+
+    if args.since and args.shard:
+        print("错误: --since 与 --shard 不能同时使用", file=sys.stderr)
+        sys.exit(1)
+
+    profiler = _make_profiler(args)
+    analyzer = MultiFileAnalyzer()
+    index = _load_index(args)
+    memory = _memory_limits(args)
+    if args.since:
+        baseline = ReportExporter.load_json(args.baseline) if args.baseline else None
+        try:
+            result = analyzer.analyze_changed(
+                str(dirpath),
+                args.since,
+                baseline,
+                args.recursive,
+                workers=args.workers,
+                profiler=profiler,
+                index=index,
+                memory=memory,
+                analysis_profile=args.analysis_profile,
+                time_budget=args.time_budget,
+            )
+        except ValueError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        result = analyzer.analyze_directory(
+            str(dirpath),
+            args.recursive,
+            workers=args.workers,
+            profiler=profiler,
+            shard=args.shard,
+            summary_only=args.summary_only,
+            index=index,
+            memory=memory,
+            analysis_profile=args.analysis_profile,
+            time_budget=args.time_budget,
+        )
+    if index is not None and not args.shard:
+        index.save(args.index)
+    _print_project_summary(result, dirpath)
+    if args.since:
+        print(
+            f"  相对 {args.since} 变化并重新分析: {len(result['reanalyzed_files'])}"
+        )
+    if args.shard:
+        print(f"  分片: {args.shard[0] + 1}/{args.shard[1]}")
+    for cycle in result.get("import_cycles", []):
+        print(f"  ⚠️ 导入环: {' -> '.join(cycle + cycle[:1])}")
+    if "memory" in result:
+        _print_memory(result)
+    if "profile" in result:
+        _print_profile(result)
+    if "time_budget" in result:
+        _print_time_budget(result)
 
     if args.json:
-        ReportExporter.export_json(result, args.json)
+        with profiler.phase("export_json"):
+            ReportExporter.export_json(result, args.json, compact=args.compact_json)
         print(f"\n✅ 报告已导出到: {args.json}")
 
-# _analyze_directory 函数也按此逻辑保留...
-# TODO: Add explicit error handling for file not found exceptions
+    if args.chunked_report:
+        with profiler.phase("export_chunked"):
+            stats = ReportExporter.export_chunked(
+                result,
+                args.chunked_report,
+                chunk_size=args.chunk_size,
+            )
+        _print_chunk_stats(args.chunked_report, stats)
+
+    if args.sqlite:
+        with profiler.phase("export_sqlite"):
+            count = ReportExporter.export_sqlite(result, args.sqlite)
+        print(f"\n✅ {count} 个文件的指标已写入: {args.sqlite}")
+
+    _finish_profile(profiler, args)
+
+
 if __name__ == "__main__":
-    print("Starting CodeInsight module directly...")
-    # 这里可以调用你的主函数，例如: main()
\ No newline at end of file
+    main()
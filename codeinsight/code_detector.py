@@ -1,8 +1,12 @@
 import libcst as cst
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional, Union
 from dataclasses import dataclass, field
 from collections import defaultdict
 import difflib
+import hashlib
+import io
+import keyword
+import tokenize
 
 
 @dataclass
@@ -93,8 +97,11 @@ class CodeDuplicateDetector:
         in_multiline_comment = False
         for line in lines:
             stripped = line.strip()
-            if '"""' in stripped or "'''" in stripped:
-                in_multiline_comment = not in_multiline_comment
+            quotes = stripped.count('"""') + stripped.count("'''")
+            if quotes:
+                # 单行文档字符串的引号成对出现，不改变多行字符串状态
+                if quotes % 2:
+                    in_multiline_comment = not in_multiline_comment
                 continue
             if in_multiline_comment:
                 continue
@@ -361,6 +368,223 @@ class ASTBasedDuplicateDetector:
         return len(covered_lines)
 
 
+# 不携带代码内容的记号：空白、缩进与注释
+_SKIPPED_TOKENS = {
+    tokenize.COMMENT,
+    tokenize.NL,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENCODING,
+}
+# Python 3.12 起 f-string 被拆成多个记号
+_STRING_TOKENS = {tokenize.STRING} | {
+    getattr(tokenize, name)
+    for name in ("FSTRING_START", "FSTRING_MIDDLE", "FSTRING_END")
+    if hasattr(tokenize, name)
+}
+
+
+@dataclass
+class _Statement:
+    """一个逻辑行（语句）的记号摘要"""
+
+    start_line: int
+    end_line: int
+    raw: int  # 原样记号序列的编号
+    normalized: int  # 标识符与字面量归一化后的记号序列编号
+
+
+class TokenDuplicateDetector:
+    """基于标准库 tokenize 记号流的代码块重复检测器
+
+    不构建语法树：注释、文档字符串（只由字符串构成的语句）与空白按记号精确去除，
+    可选把标识符与字面量归一化，从而发现只改了变量名或常量的复制代码。
+    以逻辑行（语句）为单位，连续 min_block_size 条语句的窗口按哈希分组，
+    命中后向后延伸为最长的重复区间。libcst 无法解析的文件也能检测，
+    记号化中途出错时使用出错前的部分。
+
+    exact 重复对原样一致；similar 只在归一化后一致，
+    相似度为原样一致的语句所占比例。
+    """
+
+    def __init__(
+        self,
+        min_block_size: int = 5,
+        normalize_identifiers: bool = True,
+        normalize_literals: bool = True,
+    ):
+        self.min_block_size = max(1, min_block_size)
+        self.normalize_identifiers = normalize_identifiers
+        self.normalize_literals = normalize_literals
+
+    def detect(self, source: Union[str, bytes]) -> DuplicateReport:
+        """检测代码重复；source 为字节时按 PEP 263 编码声明解码"""
+        text, statements = self._statements(source)
+        lines = text.split("\n")
+        pairs = self._find_duplicates(statements, lines)
+
+        # 重复对的两侧都计入重复行
+        covered = set()
+        for pair in pairs:
+            for block in (pair.block1, pair.block2):
+                covered.update(range(block.start_line, block.end_line + 1))
+        total_lines = len(lines)
+        exact = [p for p in pairs if p.type == "exact"]
+        similar = [p for p in pairs if p.type == "similar"]
+        return DuplicateReport(
+            total_blocks=max(0, len(statements) - self.min_block_size + 1),
+            exact_duplicates=len(exact),
+            similar_duplicates=len(similar),
+            duplicate_pairs=exact + similar,
+            duplicate_lines=len(covered),
+            total_lines=total_lines,
+            duplicate_percentage=(
+                (len(covered) / total_lines * 100) if total_lines > 0 else 0
+            ),
+        )
+
+    @staticmethod
+    def _tokens(source: Union[str, bytes]) -> Tuple[str, List[tokenize.TokenInfo]]:
+        """记号化，返回 (源码文本, 记号列表)；出错时保留已得到的记号"""
+        if isinstance(source, bytes):
+            try:
+                encoding, _ = tokenize.detect_encoding(io.BytesIO(source).readline)
+                text = source.decode(encoding)
+            except (SyntaxError, LookupError, UnicodeDecodeError):
+                text = source.decode("utf-8", errors="replace")
+        else:
+            text = source
+        tokens = []
+        try:
+            for token in tokenize.generate_tokens(io.StringIO(text).readline):
+                tokens.append(token)
+        except (tokenize.TokenError, SyntaxError):
+            pass
+        return text, tokens
+
+    def _statements(self, source: Union[str, bytes]) -> Tuple[str, List[_Statement]]:
+        """把记号流切分为语句，去掉注释、空白与文档字符串"""
+        text, tokens = self._tokens(source)
+        ids: Dict[Tuple[str, ...], int] = {}
+        statements: List[_Statement] = []
+        raw: List[str] = []
+        normalized: List[str] = []
+        start = end = 0
+        only_strings = True
+
+        for token in tokens + [None]:
+            if token is None or token.type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                # 只由字符串构成的语句是文档字符串或等价的注释
+                if raw and not only_strings:
+                    statements.append(
+                        _Statement(
+                            start,
+                            end,
+                            ids.setdefault(tuple(raw), len(ids)),
+                            ids.setdefault(("\0",) + tuple(normalized), len(ids)),
+                        )
+                    )
+                raw, normalized, only_strings = [], [], True
+                continue
+            if token.type in _SKIPPED_TOKENS:
+                continue
+            if not raw:
+                start = token.start[0]
+            end = token.end[0]
+            is_string = token.type in _STRING_TOKENS
+            only_strings = only_strings and is_string
+            raw.append(token.string)
+            normalized.append(self._normalize(token, is_string))
+        return text, statements
+
+    def _normalize(self, token: tokenize.TokenInfo, is_string: bool) -> str:
+        if self.normalize_literals and (is_string or token.type == tokenize.NUMBER):
+            return "$LIT"
+        if (
+            self.normalize_identifiers
+            and token.type == tokenize.NAME
+            and not keyword.iskeyword(token.string)
+        ):
+            return "$ID"
+        return token.string
+
+    def _find_duplicates(
+        self, statements: List[_Statement], lines: List[str]
+    ) -> List[DuplicatePair]:
+        """窗口哈希分组后延伸为最长重复区间，同一偏移上的重叠区间合并"""
+        k = self.min_block_size
+        keys = [s.normalized for s in statements]
+        windows: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+        for i in range(len(keys) - k + 1):
+            windows[tuple(keys[i : i + k])].append(i)
+
+        # 偏移量 -> [(起点, 长度)]；每处重复与该窗口首次出现的位置配对
+        matches: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for positions in windows.values():
+            first = positions[0]
+            for other in positions[1:]:
+                if other < first + k:
+                    continue  # 与首次出现重叠（如连续相同的语句）
+                length = k
+                while (
+                    other + length < len(keys)
+                    and first + length < other
+                    and keys[first + length] == keys[other + length]
+                ):
+                    length += 1
+                matches[other - first].append((first, length))
+
+        pairs = []
+        for offset, spans in matches.items():
+            spans.sort()
+            merged: List[List[int]] = []
+            for begin, length in spans:
+                if merged and begin <= merged[-1][0] + merged[-1][1]:
+                    end = max(merged[-1][0] + merged[-1][1], begin + length)
+                    merged[-1][1] = end - merged[-1][0]
+                else:
+                    merged.append([begin, length])
+            for begin, length in merged:
+                pairs.append(
+                    self._make_pair(statements, lines, begin, begin + offset, length)
+                )
+        pairs.sort(key=lambda p: (p.block1.start_line, p.block2.start_line))
+        return pairs
+
+    @staticmethod
+    def _make_pair(
+        statements: List[_Statement],
+        lines: List[str],
+        first: int,
+        second: int,
+        length: int,
+    ) -> DuplicatePair:
+        same = sum(
+            statements[first + i].raw == statements[second + i].raw
+            for i in range(length)
+        )
+        blocks = []
+        for begin in (first, second):
+            part = statements[begin : begin + length]
+            start_line, end_line = part[0].start_line, part[-1].end_line
+            blocks.append(
+                CodeBlock(
+                    start_line=start_line,
+                    end_line=end_line,
+                    content="\n".join(lines[start_line - 1 : end_line]),
+                    hash_value=hashlib.md5(
+                        repr([s.normalized for s in part]).encode()
+                    ).hexdigest(),
+                )
+            )
+        return DuplicatePair(
+            block1=blocks[0],
+            block2=blocks[1],
+            similarity=same / length,
+            type="exact" if same == length else "similar",
+        )
+
+
 def format_duplicate_report(report: DuplicateReport, max_pairs: int = 10) -> str:
     """格式化重复检测报告"""
     lines = []
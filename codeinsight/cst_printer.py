@@ -1,24 +1,122 @@
+"""CST 结构输出
+
+用显式栈迭代遍历语法树，不受递归深度限制；遍历以生成器产出记录，
+可按节点类型与行号范围过滤，输出为缩进树、JSON Lines 或节点类型直方图。
+"""
+
+import dataclasses
+import json
+import sys
+from collections import Counter
+from typing import (
+    IO,
+    Any,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
 import libcst as cst
+from libcst.metadata import MetadataWrapper, PositionProvider
+
+# 节点类型 -> 字段名；直接按字段取子节点比 CSTNode.children 快数倍
+_FIELDS: Dict[Type[cst.CSTNode], Tuple[str, ...]] = {}
+
 
+def _child_nodes(node: cst.CSTNode) -> List[cst.CSTNode]:
+    """按字段声明顺序返回直接子节点"""
+    names = _FIELDS.get(type(node))
+    if names is None:
+        names = _FIELDS[type(node)] = tuple(
+            f.name for f in dataclasses.fields(node)
+        )
+    children = []
+    for name in names:
+        value = getattr(node, name)
+        if isinstance(value, cst.CSTNode):
+            children.append(value)
+        elif isinstance(value, (list, tuple)):
+            children.extend(item for item in value if isinstance(item, cst.CSTNode))
+    return children
 
-def print_cst_tree(module: cst.Module, max_depth: int = 3):
-    """简化打印 CST 结构，避免过深"""
 
-    def _print_node(node, depth=0):
-        if depth > max_depth:
-            return
-        indent = "  " * depth
-        node_name = type(node).__name__
-        print(f"{indent}{node_name}")
-        for field in node._fields:
-            value = getattr(node, field)
-            if value is None:
+def iter_cst(
+    module: cst.Module,
+    max_depth: Optional[int] = None,
+    node_types: Optional[Collection[str]] = None,
+    lines: Optional[Tuple[int, int]] = None,
+    positions: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """逐个产出 CST 节点记录 {"type", "depth"[, "start_line", "end_line"]}
+
+    Args:
+        module: 已解析的模块
+        max_depth: 最大深度（模块为 0），None 表示不限制
+        node_types: 只产出这些类型名的节点（仍会遍历其余节点的子树）
+        lines: (起始行, 结束行)，闭区间；与之不相交的子树整体跳过
+        positions: 是否附带行号；指定 lines 时总会计算
+    """
+    ranges = None
+    if positions or lines is not None:
+        wrapper = MetadataWrapper(module, unsafe_skip_copy=True)
+        ranges = wrapper.resolve(PositionProvider)
+    wanted = set(node_types) if node_types else None
+
+    stack: List[Tuple[cst.CSTNode, int]] = [(module, 0)]
+    while stack:
+        node, depth = stack.pop()
+        record: Dict[str, Any] = {"type": type(node).__name__, "depth": depth}
+        code_range = ranges.get(node) if ranges is not None else None
+        if code_range is not None:
+            start, end = code_range.start.line, code_range.end.line
+            if lines is not None and (end < lines[0] or start > lines[1]):
                 continue
-            if isinstance(value, (list, tuple)):
-                for item in value:
-                    if isinstance(item, cst.CSTNode):
-                        _print_node(item, depth + 1)
-            elif isinstance(value, cst.CSTNode):
-                _print_node(value, depth + 1)
-
-    _print_node(module)
+            record["start_line"] = start
+            record["end_line"] = end
+
+        if wanted is None or record["type"] in wanted:
+            yield record
+
+        if max_depth is None or depth < max_depth:
+            stack.extend((child, depth + 1) for child in reversed(_child_nodes(node)))
+
+
+def dump_cst_jsonl(module: cst.Module, writer: IO[str], **filters: Any) -> int:
+    """把节点记录以 JSON Lines 写入 writer（任何带 write 方法的对象），返回行数
+
+    filters 与 iter_cst 的参数相同；默认附带行号。
+    """
+    filters.setdefault("positions", True)
+    count = 0
+    for record in iter_cst(module, **filters):
+        writer.write(json.dumps(record, ensure_ascii=False))
+        writer.write("\n")
+        count += 1
+    return count
+
+
+def cst_histogram(module: cst.Module, **filters: Any) -> Counter:
+    """统计各节点类型的数量；filters 与 iter_cst 的参数相同"""
+    return Counter(record["type"] for record in iter_cst(module, **filters))
+
+
+def print_cst_tree(
+    module: cst.Module,
+    max_depth: Optional[int] = 3,
+    file: Optional[IO[str]] = None,
+    **filters: Any,
+) -> None:
+    """简化打印 CST 结构，默认只展开三层
+
+    filters 与 iter_cst 的参数相同；计算了行号时附在节点名之后。
+    """
+    out = file or sys.stdout
+    for record in iter_cst(module, max_depth=max_depth, **filters):
+        line = f"{'  ' * record['depth']}{record['type']}"
+        if "start_line" in record:
+            line += f"  [{record['start_line']}-{record['end_line']}]"
+        out.write(line + "\n")
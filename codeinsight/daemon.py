@@ -0,0 +1,320 @@
+"""常驻分析守护进程
+
+守护进程保持解释器与已导入模块常驻，并在内存中缓存解析树和最近的分析结果，
+通过 Unix 域套接字以简单的 JSON-RPC 2.0 协议（每行一个 JSON 消息）提供服务。
+客户端在守护进程未运行时自动回退到进程内分析。
+客户端位于只依赖标准库的 `codeinsight.daemon_client`，分析模块在服务中按需导入，
+守护进程运行时 `analyze` 等客户端命令无需加载 libcst。
+
+用法:
+    python -m codeinsight.daemon serve
+    python -m codeinsight.daemon analyze file.py
+"""
+
+import argparse
+import errno
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Optional, Tuple
+
+from .daemon_client import DaemonClient, default_socket_path, request
+from .source_io import read_source
+
+if TYPE_CHECKING:
+    import libcst as cst
+
+    from .analyzer import CodeMetrics
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存"""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AnalysisService:
+    """带缓存的分析服务，守护进程与进程内回退共用同一实现
+
+    缓存键包含文件的 mtime 与大小，文件被修改后旧条目自然失效。
+    每个文件另保留一个 CodeMetrics 实例，文件修改后只重新计算变化的顶层语句。
+    """
+
+    def __init__(self, max_modules: int = 256, max_results: int = 1024):
+        self.modules = LRUCache(max_modules)
+        self.results = LRUCache(max_results)
+        self.metrics = LRUCache(max_modules)
+        self._metrics_lock = threading.Lock()
+
+    def _file_key(self, path: str) -> Tuple[str, int, int]:
+        resolved = Path(path).resolve()
+        stat = resolved.stat()
+        return (str(resolved), stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, path: str) -> Tuple[Tuple[str, int, int], str, "cst.Module"]:
+        key = self._file_key(path)
+        cached = self.modules.get(key)
+        if cached is None:
+            import libcst as cst
+
+            data = read_source(key[0])
+            tree = cst.parse_module(data)
+            cached = (data.decode(tree.encoding), tree)
+            self.modules.put(key, cached)
+        return (key,) + cached
+
+    def _cached(self, method: str, path: str, options: Tuple, compute) -> Any:
+        key, source, tree = self._load(path)
+        result_key = (method, key, options)
+        result = self.results.get(result_key)
+        if result is None:
+            result = compute(source, tree)
+            self.results.put(result_key, result)
+        return result
+
+    def _statement_metrics(self, path: str) -> Tuple[threading.Lock, "CodeMetrics"]:
+        """按路径（不含 mtime）取得带语句缓存的 CodeMetrics 及其锁"""
+        from .analyzer import CodeMetrics
+
+        key = str(Path(path).resolve())
+        with self._metrics_lock:
+            entry = self.metrics.get(key)
+            if entry is None:
+                entry = (threading.Lock(), CodeMetrics())
+                self.metrics.put(key, entry)
+        return entry
+
+    def analyze(self, path: str) -> Dict[str, Any]:
+        from .multi_file_analyzer import ReportExporter
+
+        def compute(source, tree):
+            lock, metrics = self._statement_metrics(path)
+            with lock:
+                result = metrics.analyze_incremental(tree, source)
+            return ReportExporter._make_serializable(result)
+
+        return self._cached("analyze", path, (), compute)
+
+    def check_bugs(self, path: str, disabled: Optional[list] = None) -> list:
+        from libcst.metadata import MetadataWrapper
+
+        from .checker import check_logic_bugs
+
+        def compute(source, tree):
+            wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+            return check_logic_bugs(wrapper, disabled=disabled, source=source)
+
+        return self._cached("check_bugs", path, tuple(disabled or ()), compute)
+
+    def detect_duplicates(self, path: str, mode: str = "block") -> Dict[str, Any]:
+        if mode not in ("block", "function", "token"):
+            raise ValueError(f"未知的重复检测模式: {mode}")
+        from .code_detector import (
+            ASTBasedDuplicateDetector,
+            CodeDuplicateDetector,
+            TokenDuplicateDetector,
+        )
+
+        if mode == "token":
+            # 记号流检测不经过解析缓存，libcst 无法解析的文件也能检测
+            key = self._file_key(path)
+            result_key = ("detect_duplicates", key, (mode,))
+            result = self.results.get(result_key)
+            if result is None:
+                detector = TokenDuplicateDetector(min_block_size=5)
+                result = asdict(detector.detect(read_source(key[0])))
+                self.results.put(result_key, result)
+            return result
+
+        def compute(source, tree):
+            if mode == "block":
+                report = CodeDuplicateDetector(min_block_size=5).detect(source)
+            else:
+                report = ASTBasedDuplicateDetector(min_function_size=5).detect(
+                    tree, source
+                )
+            return asdict(report)
+
+        return self._cached("detect_duplicates", path, (mode,), compute)
+
+    def fix(self, path: str, dry_run: bool = False) -> Dict[str, Any]:
+        from .refactor import fix_file
+
+        return asdict(fix_file(path, dry_run=dry_run))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "modules": len(self.modules),
+            "results": len(self.results),
+            "module_hits": self.modules.hits,
+            "result_hits": self.results.hits,
+        }
+
+    METHODS = ("analyze", "check_bugs", "detect_duplicates", "fix", "stats")
+
+    def dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        if method not in self.METHODS:
+            raise LookupError(f"未知方法: {method}")
+        return getattr(self, method)(**params)
+
+
+# JSON-RPC 2.0 错误码
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.handle_message(line)
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+            self.wfile.flush()
+
+
+class AnalysisDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix 域套接字上的 JSON-RPC 服务"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: Optional[AnalysisService] = None):
+        _remove_stale_socket(socket_path)
+        self.socket_path = socket_path
+        self.service = service or AnalysisService()
+        super().__init__(socket_path, _RequestHandler)
+
+    def handle_message(self, line: bytes) -> Dict[str, Any]:
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, str(e))
+
+        msg_id = message.get("id")
+        method = message.get("method")
+        if method == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"jsonrpc": "2.0", "id": msg_id, "result": True}
+        try:
+            result = self.service.dispatch(method, message.get("params") or {})
+        except LookupError as e:
+            return _error(msg_id, METHOD_NOT_FOUND, str(e))
+        except Exception as e:
+            return _error(msg_id, INTERNAL_ERROR, str(e))
+        return {"jsonrpc": "2.0", "id": msg_id, "result": result}
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """删除残留的套接字文件；已有守护进程在监听时抛出 OSError(EADDRINUSE)"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except FileNotFoundError:
+            return
+        except ConnectionRefusedError:
+            # 上次的守护进程异常退出，套接字文件无人监听
+            os.unlink(socket_path)
+            return
+    raise OSError(errno.EADDRINUSE, f"守护进程已在运行: {socket_path}")
+
+
+def _error(msg_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": code, "message": message}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CodeInsight 常驻分析守护进程")
+    parser.add_argument(
+        "command",
+        choices=[
+            "serve",
+            "stop",
+            "stats",
+            "analyze",
+            "check-bugs",
+            "detect-duplicates",
+            "fix",
+        ],
+    )
+    parser.add_argument("file", nargs="?", help="Python 源文件路径")
+    parser.add_argument("--socket", default=None, help="Unix 域套接字路径")
+    parser.add_argument(
+        "--duplicate-mode", choices=["block", "function", "token"], default="block"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="fix 时只生成 diff")
+    args = parser.parse_args(argv)
+    socket_path = args.socket or default_socket_path()
+
+    if args.command == "serve":
+        try:
+            server = AnalysisDaemon(socket_path)
+        except OSError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"CodeInsight 守护进程已启动: {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+        return
+
+    if args.command == "stop":
+        DaemonClient(socket_path).call("shutdown")
+        return
+
+    params: Dict[str, Any] = {}
+    if args.command != "stats":
+        if not args.file:
+            parser.error("需要提供文件路径")
+        params["path"] = str(Path(args.file).resolve())
+    if args.command == "detect-duplicates":
+        params["mode"] = args.duplicate_mode
+    if args.command == "fix":
+        params["dry_run"] = args.dry_run
+
+    try:
+        result = request(args.command.replace("-", "_"), params, socket_path)
+    except Exception as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
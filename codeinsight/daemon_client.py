@@ -0,0 +1,75 @@
+"""守护进程客户端
+
+只依赖标准库，不导入 libcst 与各分析模块，守护进程运行时客户端可以快速启动；
+守护进程未运行时才在 `request` 中按需导入 `codeinsight.daemon` 进行进程内分析。
+"""
+
+import json
+import os
+import socket
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from .daemon import AnalysisService
+
+
+def default_socket_path() -> str:
+    """默认套接字路径，可通过 CODEINSIGHT_SOCKET 环境变量覆盖"""
+    return os.environ.get(
+        "CODEINSIGHT_SOCKET",
+        os.path.join(tempfile.gettempdir(), f"codeinsight-{os.getuid()}.sock"),
+    )
+
+
+class DaemonClient:
+    """守护进程客户端"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._next_id = 0
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """发送一次请求；连接失败时抛出 OSError"""
+        self._next_id += 1
+        request = {
+            "jsonrpc": "2.0",
+            "id": self._next_id,
+            "method": method,
+            "params": params or {},
+        }
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(request).encode() + b"\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+        if "error" in response:
+            raise RuntimeError(response["error"]["message"])
+        return response["result"]
+
+
+_local_service: Optional["AnalysisService"] = None
+
+
+def request(
+    method: str,
+    params: Optional[Dict[str, Any]] = None,
+    socket_path: Optional[str] = None,
+) -> Any:
+    """优先交给守护进程处理，守护进程未运行时回退到进程内分析"""
+    global _local_service
+    params = params or {}
+    path = socket_path or default_socket_path()
+    if os.path.exists(path):
+        try:
+            return DaemonClient(path).call(method, params)
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+    if _local_service is None:
+        from .daemon import AnalysisService
+
+        _local_service = AnalysisService()
+    return _local_service.dispatch(method, params)
@@ -0,0 +1,350 @@
+"""Python 文件发现
+
+优先使用 git 索引（git ls-files）一次性拿到文件列表；不在 git 工作区内时，
+用 os.scandir 遍历目录，在下降之前就剪掉排除目录和被 .gitignore 忽略的目录，
+避免遍历 .venv、node_modules 等大量无关条目。
+"""
+
+import hashlib
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 排除常见的非源代码文件夹
+EXCLUDED_DIRS = {
+    ".git",
+    "__pycache__",
+    ".venv",
+    "venv",
+    ".idea",
+    "node_modules",
+    ".tox",
+    ".mypy_cache",
+    ".pytest_cache",
+}
+
+
+class IgnoreRule:
+    """单条 .gitignore 规则"""
+
+    def __init__(self, pattern: str):
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # 含有 / 的模式相对于 .gitignore 所在目录锚定，否则匹配任意层级的名字
+        self.anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        self.regex = re.compile(_translate(pattern) + r"\Z")
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        target = rel_path if self.anchored else rel_path.rsplit("/", 1)[-1]
+        return self.regex.match(target) is not None
+
+
+def _translate(pattern: str) -> str:
+    """把 gitignore 通配符转换为正则"""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 1
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_gitignore(path: Path) -> List[IgnoreRule]:
+    """读取 .gitignore 文件；文件不存在时返回空列表"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        rules.append(IgnoreRule(line))
+    return rules
+
+
+# (.gitignore 所在目录相对根目录的路径, 规则列表)
+IgnoreStack = Tuple[Tuple[str, List[IgnoreRule]], ...]
+
+
+def is_ignored(rel_path: str, is_dir: bool, stack: IgnoreStack) -> bool:
+    """按 git 语义判断：越深层、越靠后的规则优先，! 规则可以取消忽略"""
+    ignored = False
+    for base, rules in stack:
+        if base:
+            if not rel_path.startswith(base + "/"):
+                continue
+            sub_path = rel_path[len(base) + 1 :]
+        else:
+            sub_path = rel_path
+        for rule in rules:
+            if rule.matches(sub_path, is_dir):
+                ignored = not rule.negate
+    return ignored
+
+
+def walk_python_files(
+    root: Path,
+    recursive: bool = True,
+    excluded_dirs: Sequence[str] = EXCLUDED_DIRS,
+    respect_gitignore: bool = True,
+) -> Iterator[Path]:
+    """os.scandir 遍历，下降前剪枝排除目录与被忽略的目录"""
+    excluded = set(excluded_dirs)
+    pending: List[Tuple[str, str, IgnoreStack]] = [(str(root), "", ())]
+    while pending:
+        dir_path, rel_dir, stack = pending.pop()
+        if respect_gitignore:
+            rules = parse_gitignore(Path(dir_path) / ".gitignore")
+            if rules:
+                stack = stack + ((rel_dir, rules),)
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not recursive or entry.name in excluded:
+                    continue
+                if respect_gitignore and is_ignored(rel, True, stack):
+                    continue
+                subdirs.append((entry.path, rel, stack))
+            elif entry.name.endswith(".py") and entry.is_file():
+                if respect_gitignore and is_ignored(rel, False, stack):
+                    continue
+                yield Path(entry.path)
+        # 逆序入栈，保持按名字排序的深度优先顺序
+        pending.extend(reversed(subdirs))
+
+
+def git_python_files(
+    root: Path,
+    recursive: bool = True,
+    excluded_dirs: Sequence[str] = EXCLUDED_DIRS,
+) -> Optional[List[Path]]:
+    """通过 git 索引获取文件列表（含未跟踪但未被忽略的文件）
+
+    root 不在 git 工作区内、git 不可用，或 root 本身被 .gitignore 忽略
+    （此时 ls-files 什么也不会列出）时返回 None，由调用方回退到目录遍历。
+    """
+    try:
+        proc = subprocess.run(
+            [
+                "git",
+                "ls-files",
+                "-z",
+                "--cached",
+                "--others",
+                "--exclude-standard",
+                "--",
+                "*.py",
+            ],
+            cwd=str(root),
+            capture_output=True,
+            check=False,
+        )
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+
+    excluded = set(excluded_dirs)
+    files = []
+    for rel in dict.fromkeys(proc.stdout.decode("utf-8", "surrogateescape").split("\0")):
+        if not rel or not _in_scope(rel, recursive, excluded):
+            continue
+        path = root / rel
+        # 已从工作区删除但仍在索引中的文件
+        if path.is_file():
+            files.append(path)
+    if not files and _root_ignored(root):
+        return None
+    return files
+
+
+def _root_ignored(root: Path) -> bool:
+    """root 目录本身（或其某个上级目录）是否被所在仓库的 .gitignore 忽略"""
+    try:
+        proc = subprocess.run(
+            ["git", "check-ignore", "-q", "."],
+            cwd=str(root),
+            capture_output=True,
+            check=False,
+        )
+    except OSError:
+        return False
+    return proc.returncode == 0
+
+
+def _in_scope(rel: str, recursive: bool, excluded: set) -> bool:
+    """git 输出的相对路径是否在分析范围内（递归设置与排除目录）"""
+    parts = rel.split("/")
+    if not recursive and len(parts) > 1:
+        return False
+    return not excluded.intersection(parts[:-1])
+
+
+def _git(root: Path, *args: str) -> bytes:
+    """在 root 下执行 git 命令，失败时抛出 ValueError"""
+    try:
+        proc = subprocess.run(
+            ["git", *args], cwd=str(root), capture_output=True, check=False
+        )
+    except OSError as e:
+        raise ValueError(f"无法执行 git: {e}")
+    if proc.returncode != 0:
+        message = proc.stderr.decode("utf-8", "replace").strip()
+        raise ValueError(f"git {args[0]} 失败: {message}")
+    return proc.stdout
+
+
+@dataclass
+class ChangedFiles:
+    """相对某个基准引用的 Python 文件变更集合"""
+
+    # 新增或修改（含重命名后内容有变化）的文件，需要重新分析
+    changed: List[Path] = field(default_factory=list)
+    # 新路径 -> (旧路径, 相似度百分比)
+    renamed: Dict[Path, Tuple[Path, int]] = field(default_factory=dict)
+    # 已删除的文件（含重命名前的旧路径）
+    deleted: List[Path] = field(default_factory=list)
+
+
+def git_changed_files(
+    root: Path,
+    ref: str,
+    recursive: bool = True,
+    excluded_dirs: Sequence[str] = EXCLUDED_DIRS,
+) -> ChangedFiles:
+    """列出 root 下相对 ref 发生变化的 Python 文件
+
+    比较对象是工作区（含未提交修改），未跟踪但未被忽略的文件视为新增；
+    重命名通过 git 的重命名检测（-M）识别。ref 无效或不在 git 工作区内时
+    抛出 ValueError。
+    """
+    root = Path(root)
+    excluded = set(excluded_dirs)
+    result = ChangedFiles()
+
+    out = _git(
+        root, "diff", "--name-status", "-z", "-M", "--relative", ref, "--", "*.py"
+    )
+    fields = out.decode("utf-8", "surrogateescape").split("\0")
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i]
+        if status[0] in "RC":
+            old, new = fields[i + 1], fields[i + 2]
+            i += 3
+        else:
+            old = new = fields[i + 1]
+            i += 2
+        if status[0] == "D":
+            if _in_scope(old, recursive, excluded):
+                result.deleted.append(root / old)
+            continue
+        if status[0] == "R" and _in_scope(old, recursive, excluded):
+            result.deleted.append(root / old)
+        if not new.endswith(".py") or not _in_scope(new, recursive, excluded):
+            continue
+        if status[0] in "RC":
+            similarity = int(status[1:] or 0)
+            result.renamed[root / new] = (root / old, similarity)
+            if similarity == 100:
+                continue
+        result.changed.append(root / new)
+
+    out = _git(root, "ls-files", "-z", "--others", "--exclude-standard", "--", "*.py")
+    for rel in out.decode("utf-8", "surrogateescape").split("\0"):
+        if rel and _in_scope(rel, recursive, excluded):
+            result.changed.append(root / rel)
+
+    result.changed = sorted(dict.fromkeys(result.changed))
+    return result
+
+
+def iter_python_files(
+    root: Path,
+    recursive: bool = True,
+    excluded_dirs: Sequence[str] = EXCLUDED_DIRS,
+    use_git: bool = True,
+    respect_gitignore: bool = True,
+) -> Iterator[Path]:
+    """发现 root 下的 Python 文件
+
+    Args:
+        root: 根目录
+        recursive: 是否递归子目录
+        excluded_dirs: 按名字排除的目录
+        use_git: 在 git 工作区内时使用 git ls-files 快速路径
+        respect_gitignore: 遍历时是否遵循 .gitignore
+    """
+    root = Path(root)
+    if use_git and respect_gitignore:
+        files = git_python_files(root, recursive, excluded_dirs)
+        if files is not None:
+            yield from files
+            return
+    yield from walk_python_files(root, recursive, excluded_dirs, respect_gitignore)
+
+
+def shard_of(rel_path: str, count: int) -> int:
+    """按相对路径的稳定哈希把文件分到 [0, count) 中的某个分片
+
+    与 hash() 不同，结果不受 PYTHONHASHSEED 影响，不同机器上分片一致。
+    """
+    digest = hashlib.blake2b(
+        rel_path.encode("utf-8", "surrogateescape"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def filter_shard(
+    paths: Iterable[Path], root: Path, index: int, count: int
+) -> Iterator[Path]:
+    """只保留属于第 index 个分片（从 0 开始，共 count 个）的文件"""
+    root = Path(root)
+    for path in paths:
+        if shard_of(Path(path).relative_to(root).as_posix(), count) == index:
+            yield path
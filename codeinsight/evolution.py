@@ -3,14 +3,15 @@ import git
 from pathlib import Path
 from .analyzer import CodeMetrics
 import libcst as cst
-from typing import List, Dict
+from typing import Iterable, List, Dict
 
 
 class EvolutionAnalyzer:
     """分析代码质量随提交历史的演化趋势"""
 
     def __init__(self, repo_path: str):
-        self.repo = git.Repo(repo_path)
+        # repo_path 可以是仓库内的任意子目录
+        self.repo = git.Repo(repo_path, search_parent_directories=True)
         self.metrics_history = []
 
     def analyze_history(self, file_path: str, limit: int = 10) -> List[Dict]:
@@ -23,7 +24,8 @@ class EvolutionAnalyzer:
             try:
                 # 获取该提交时的文件内容
                 blob = commit.tree / file_path
-                content = blob.data_stream.read().decode("utf-8")
+                # 直接解析字节，由 libcst 处理编码声明
+                content = blob.data_stream.read()
 
                 # 执行静态分析
                 tree = cst.parse_module(content)
@@ -34,6 +36,9 @@ class EvolutionAnalyzer:
                     {
                         "commit": commit.hexsha[:7],
                         "date": commit.authored_datetime.strftime("%Y-%m-%d"),
+                        "timestamp": commit.authored_date,
+                        "author": commit.author.name,
+                        "file": file_path,
                         "complexity": result["cyclomatic_complexity"],
                         "score": result["quality_score"],
                     }
@@ -41,3 +46,11 @@ class EvolutionAnalyzer:
             except Exception:
                 continue
         return history
+
+    def analyze_files(self, file_paths: Iterable[str], limit: int = 10) -> List[Dict]:
+        """依次分析多个文件的演化历史，按提交时间排序后合并为一个列表"""
+        history = []
+        for file_path in file_paths:
+            history.extend(self.analyze_history(file_path, limit=limit))
+        history.sort(key=lambda entry: entry["timestamp"])
+        return history
@@ -0,0 +1,151 @@
+"""基于标准库 ast 的快速指标
+
+fast 分析档位使用：ast.parse 比 libcst 解析快一个数量级，且不做作用域分析。
+计数规则与 MetricsVisitor 一致，结果结构与评分与 CodeMetrics.analyze 相同；
+未使用导入按名字是否被读取近似判断，不区分同名局部变量的遮蔽。
+"""
+
+import ast
+from typing import Any, Dict, List, Tuple, Union
+
+from .analyzer import ClassMetrics, CodeMetrics, FunctionMetrics
+
+
+def _has_docstring(body: List[ast.stmt]) -> bool:
+    return (
+        bool(body)
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Constant)
+        and isinstance(body[0].value.value, str)
+    )
+
+
+class _FastMetricsVisitor(ast.NodeVisitor):
+    def __init__(self, metrics: CodeMetrics):
+        self.metrics = metrics
+        # (导入语句 id, 绑定名) -> 绑定名，保持出现顺序
+        self.bindings: Dict[Tuple[int, str], str] = {}
+        self.loaded: set = set()
+        # 与 MetricsVisitor 相同：分支计入最内层函数与所有外层类
+        self.function_stack: List[FunctionMetrics] = []
+        self.class_stack: List[Tuple[ClassMetrics, List[ast.stmt]]] = []
+
+    def _block(self, node: ast.AST) -> None:
+        metrics = self.metrics
+        metrics.current_nesting += 1
+        if metrics.current_nesting > metrics.max_nesting_depth:
+            metrics.max_nesting_depth = metrics.current_nesting
+        self.generic_visit(node)
+        metrics.current_nesting -= 1
+
+    def _branch(self, node: ast.AST) -> None:
+        self.metrics.cyclomatic_complexity += 1
+        if self.function_stack:
+            self.function_stack[-1].complexity += 1
+        for class_metrics, _ in self.class_stack:
+            class_metrics.complexity += 1
+        self._block(node)
+
+    visit_If = visit_For = visit_AsyncFor = visit_While = _branch
+    visit_Try = _block
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        metrics = self.metrics
+        metrics.function_count += 1
+        metrics.total_functions += 1
+
+        has_return_annotation = node.returns is not None
+        if not has_return_annotation:
+            metrics.functions_missing_return_annotation += 1
+        # 与 libcst 的 params.params 对应：普通位置参数
+        params = node.args.args
+        missing_params = sum(
+            1 for p in params if p.annotation is None and p.arg != "self"
+        )
+        if missing_params > 0:
+            metrics.functions_missing_param_annotation += 1
+        has_params = any(p.arg != "self" for p in params)
+        if has_return_annotation and (missing_params == 0 or not has_params):
+            metrics.annotated_functions += 1
+
+        func_metrics = FunctionMetrics(
+            name=node.name,
+            line_start=node.lineno,
+            line_end=node.end_lineno,
+            complexity=1,
+            params_count=len(params),
+            params_without_annotation=missing_params,
+            has_return_annotation=has_return_annotation,
+            has_docstring=_has_docstring(node.body),
+        )
+        metrics.functions_list.append(func_metrics)
+        if self.class_stack and any(s is node for s in self.class_stack[-1][1]):
+            self.class_stack[-1][0].methods_count += 1
+        self.function_stack.append(func_metrics)
+        self._block(node)
+        self.function_stack.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.metrics.class_count += 1
+        class_metrics = ClassMetrics(
+            name=node.name,
+            line_start=node.lineno,
+            line_end=node.end_lineno,
+            methods_count=0,
+            complexity=1,
+            has_docstring=_has_docstring(node.body),
+        )
+        self.metrics.classes_list.append(class_metrics)
+        self.class_stack.append((class_metrics, node.body))
+        self._block(node)
+        self.class_stack.pop()
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            top = alias.name.split(".")[0]
+            self.metrics.imports.add(top)
+            self.bindings[(id(node), alias.asname or top)] = alias.asname or top
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module == "__future__":
+            return
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            self.metrics.imports.add(alias.name)
+            name = alias.asname or alias.name
+            self.bindings[(id(node), name)] = name
+
+    def visit_Name(self, node: ast.Name) -> None:
+        self.metrics.used_names.add(node.id)
+        if not isinstance(node.ctx, ast.Store):
+            self.loaded.add(node.id)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        # 字符串形式的注解（前向引用）中的名字同样视为读取
+        if isinstance(node.value, str) and node.value.isidentifier():
+            self.loaded.add(node.value)
+        elif isinstance(node.value, str) and "[" in node.value:
+            try:
+                expr = ast.parse(node.value, mode="eval")
+            except SyntaxError:
+                return
+            self.loaded.update(
+                n.id for n in ast.walk(expr) if isinstance(n, ast.Name)
+            )
+
+
+def analyze_fast(source: Union[str, bytes]) -> Dict[str, Any]:
+    """用 ast 计算与 CodeMetrics.analyze 结构相同的指标；语法错误时抛出 SyntaxError"""
+    tree = ast.parse(source)
+    metrics = CodeMetrics()
+    visitor = _FastMetricsVisitor(metrics)
+    visitor.visit(tree)
+    if source:
+        metrics._count_lines(source)
+    unused = [
+        name for name in visitor.bindings.values() if name not in visitor.loaded
+    ]
+    return metrics._build_result(list(dict.fromkeys(unused)))
@@ -0,0 +1,341 @@
+"""按内存预算调度的工作进程池
+
+libcst 为大文件构建的语法树可达数百 MB，固定大小的进程池在内存紧张的
+CI 机器上容易被 OOM 终止。MemoryBudgetExecutor 测量每个任务在工作进程中的
+峰值内存，按源码大小估算新任务的需求，只有在
+“各工作进程常驻内存 + 在途任务估算” 不超过预算时才放行下一个任务；
+工作进程处理满 N 个文件或常驻内存超过 M MB 后被替换，以回收碎片化的堆。
+
+峰值测量优先使用 Linux 的 /proc/self/status（VmHWM，每个任务前通过
+clear_refs 重置）；不可用时退回 getrusage 的历史最高值，
+或在 probe="tracemalloc" 时使用 tracemalloc 的 Python 堆峰值。
+"""
+
+import multiprocessing
+import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+_STATUS = "/proc/self/status"
+_CLEAR_REFS = "/proc/self/clear_refs"
+# 尚无观测时每 KB 源码估算的峰值内存（MB），实测 libcst 约为 0.8
+DEFAULT_MB_PER_KB = 1.0
+# 单个任务的最小估算，覆盖解析小文件时的固定开销
+MIN_ESTIMATE_MB = 8.0
+# 小于该大小的文件不参与每 KB 内存的学习，避免固定开销放大比例
+_LEARN_MIN_KB = 8.0
+
+
+@dataclass
+class MemoryLimits:
+    """内存调度参数
+
+    Args:
+        budget_mb: 所有工作进程合计的内存预算，None 表示不限制放行
+        max_tasks_per_worker: 工作进程处理满该数量的文件后被替换
+        max_worker_mb: 工作进程常驻内存超过该值后被替换
+        probe: 峰值测量方式，"rss" 或 "tracemalloc"
+    """
+
+    budget_mb: Optional[float] = None
+    max_tasks_per_worker: Optional[int] = None
+    max_worker_mb: Optional[float] = None
+    probe: str = "rss"
+
+    def __post_init__(self):
+        if self.probe not in ("rss", "tracemalloc"):
+            raise ValueError(f"未知的内存测量方式: {self.probe}")
+
+
+def _status_mb(field: str) -> Optional[float]:
+    try:
+        with open(_STATUS) as f:
+            match = re.search(rf"^{field}:\s+(\d+) kB", f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match.group(1)) / 1024 if match else None
+
+
+def _maxrss_mb() -> float:
+    import resource
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存（MB）；无法读取时返回历史最高值"""
+    rss = _status_mb("VmRSS")
+    return rss if rss is not None else _maxrss_mb()
+
+
+def _reset_peak() -> bool:
+    """重置进程的峰值常驻内存（Linux 4.0+），成功时返回 True"""
+    try:
+        with open(_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    peak = _status_mb("VmHWM")
+    return peak if peak is not None else _maxrss_mb()
+
+
+def _payload_kb(args: Tuple) -> float:
+    """任务参数中源码（str/bytes）的总大小（KB），用于估算内存需求"""
+    return sum(len(a) for a in args if isinstance(a, (str, bytes))) / 1024
+
+
+def _worker_main(conn, probe: str) -> None:
+    """工作进程主循环：接收 (函数, 参数)，返回 (结果, 异常, 内存统计)"""
+    tracing = probe == "tracemalloc"
+    if tracing:
+        import tracemalloc
+
+        tracemalloc.start()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        before = current_rss_mb()
+        _reset_peak()
+        if tracing:
+            tracemalloc.reset_peak()
+        value, error = None, None
+        try:
+            value = fn(*args)
+        except Exception as e:
+            error = e
+        rss = current_rss_mb()
+        if tracing:
+            peak = before + tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        else:
+            peak = max(_peak_rss_mb(), rss)
+        stats = {
+            "peak_mb": round(peak, 1),
+            "delta_mb": round(max(peak - before, 0.0), 1),
+            "rss_mb": round(rss, 1),
+        }
+        conn.send((value, error, stats))
+    conn.close()
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args", "kb", "estimate")
+
+    def __init__(self, future: Future, fn: Callable, args: Tuple):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kb = _payload_kb(args)
+        self.estimate = 0.0
+
+
+class _Worker:
+    """父进程一侧的工作进程句柄"""
+
+    def __init__(self, context, probe: str):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, probe), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def run(self, fn: Callable, args: Tuple) -> Tuple[Any, Any, Dict[str, float]]:
+        self.conn.send((fn, args))
+        return self.conn.recv()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class MemoryBudgetExecutor(Executor):
+    """按内存预算放行任务、按文件数或内存回收工作进程的执行器
+
+    任务按提交顺序放行；没有任务在途时总会放行队首任务，
+    因此单个超出预算的大文件不会造成死锁。完成的 Future 带有 memory 属性，
+    为该任务在工作进程中的内存统计 {"peak_mb", "delta_mb", "rss_mb"}。
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        limits: Optional[MemoryLimits] = None,
+        mp_context=None,
+    ):
+        self.workers = max(1, workers)
+        self.limits = limits or MemoryLimits()
+        self._context = mp_context or multiprocessing.get_context()
+        self._cond = threading.Condition()
+        self._pending: Deque[_Task] = deque()
+        self._running = 0
+        self._in_flight_mb = 0.0
+        self._worker_rss: Dict[int, float] = {}
+        self._mb_per_kb = DEFAULT_MB_PER_KB
+        self._shutdown = False
+        self.recycled = 0
+        self.crashed = 0
+        self.max_peak_mb = 0.0
+        self.max_in_use_mb = 0.0
+        self._slots: List[threading.Thread] = []
+        for slot in range(self.workers):
+            thread = threading.Thread(
+                target=self._slot_loop,
+                args=(slot,),
+                name=f"ci-mem-{slot}",
+                daemon=True,
+            )
+            thread.start()
+            self._slots.append(thread)
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        if kwargs:
+            raise TypeError("MemoryBudgetExecutor 不支持关键字参数")
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("执行器已关闭")
+            self._pending.append(_Task(future, fn, args))
+            self._cond.notify_all()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft().future.cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._slots:
+                thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """调度统计：预算、观测到的最大单文件峰值、回收与异常退出的进程数"""
+        return {
+            "budget_mb": self.limits.budget_mb,
+            "max_peak_mb": round(self.max_peak_mb, 1),
+            "max_in_use_mb": round(self.max_in_use_mb, 1),
+            "mb_per_kb": round(self._mb_per_kb, 3),
+            "recycled_workers": self.recycled,
+            "crashed_workers": self.crashed,
+        }
+
+    def _committed_mb(self) -> float:
+        return sum(self._worker_rss.values()) + self._in_flight_mb
+
+    def _admissible(self, task: _Task) -> bool:
+        budget = self.limits.budget_mb
+        if budget is None or self._running == 0:
+            return True
+        return self._committed_mb() + task.estimate <= budget
+
+    def _next_task(self) -> Optional[_Task]:
+        """等待队首任务可以放行；关闭且队列为空时返回 None"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    task = self._pending[0]
+                    task.estimate = max(MIN_ESTIMATE_MB, task.kb * self._mb_per_kb)
+                    if self._admissible(task):
+                        self._pending.popleft()
+                        self._running += 1
+                        self._in_flight_mb += task.estimate
+                        self.max_in_use_mb = max(
+                            self.max_in_use_mb, self._committed_mb()
+                        )
+                        return task
+                elif self._shutdown:
+                    return None
+                self._cond.wait()
+
+    def _finish(
+        self,
+        slot: int,
+        task: _Task,
+        stats: Optional[Dict[str, float]],
+        alive: bool = True,
+    ) -> None:
+        with self._cond:
+            self._running -= 1
+            self._in_flight_mb -= task.estimate
+            if not alive:
+                self._worker_rss.pop(slot, None)
+            elif stats is not None:
+                self._worker_rss[slot] = stats["rss_mb"]
+                self.max_peak_mb = max(self.max_peak_mb, stats["peak_mb"])
+                if task.kb >= _LEARN_MIN_KB:
+                    # 保守地取观测到的最大比例
+                    self._mb_per_kb = max(self._mb_per_kb, stats["delta_mb"] / task.kb)
+            self._cond.notify_all()
+
+    def _should_recycle(self, worker: _Worker, stats: Dict[str, float]) -> bool:
+        limits = self.limits
+        if limits.max_tasks_per_worker and worker.tasks >= limits.max_tasks_per_worker:
+            return True
+        return bool(limits.max_worker_mb and stats["rss_mb"] >= limits.max_worker_mb)
+
+    def _slot_loop(self, slot: int) -> None:
+        worker: Optional[_Worker] = None
+        while True:
+            task = self._next_task()
+            if task is None:
+                break
+            if not task.future.set_running_or_notify_cancel():
+                self._finish(slot, task, None)
+                continue
+            if worker is None:
+                worker = _Worker(self._context, self.limits.probe)
+            try:
+                value, error, stats = worker.run(task.fn, task.args)
+            except (EOFError, OSError) as e:
+                # 工作进程异常退出（例如被 OOM 终止），换一个新进程继续
+                worker.process.join()
+                code = worker.process.exitcode
+                worker = None
+                with self._cond:
+                    self.crashed += 1
+                self._finish(slot, task, None, alive=False)
+                task.future.set_exception(
+                    RuntimeError(f"工作进程异常退出 (exitcode={code}): {e}")
+                )
+                continue
+
+            worker.tasks += 1
+            self._finish(slot, task, stats)
+            task.future.memory = stats
+            if error is not None:
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(value)
+
+            if self._should_recycle(worker, stats):
+                worker.stop()
+                worker = None
+                with self._cond:
+                    self.recycled += 1
+                    self._worker_rss.pop(slot, None)
+                    self._cond.notify_all()
+        if worker is not None:
+            worker.stop()
+        with self._cond:
+            self._worker_rss.pop(slot, None)
@@ -1,10 +1,114 @@
 """多文件分析和报告导出"""
 
+import gzip
 import json
+import time
 from pathlib import Path
-from typing import List, Dict, Any
-from .analyzer import CodeMetrics
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from .aggregate import ProjectAggregator
+from .analyzer import CodeMetrics, quality_score
+from .checker import check_logic_bugs, scan_source
+from .code_detector import TokenDuplicateDetector
+from .discovery import (
+    EXCLUDED_DIRS,
+    filter_shard,
+    git_changed_files,
+    iter_python_files,
+)
+from .fast_metrics import analyze_fast
+from .memory import MemoryLimits
+from .pipeline import AnalysisPipeline
+from .profiler import PhaseProfiler
+from .profiles import (
+    AnalysisProfile,
+    TimeBudget,
+    budget_for,
+    file_size,
+    get_profile,
+    prioritize_files,
+)
+from .project_index import ProjectIndex, collect_symbols
+from .source_io import read_source
 import libcst as cst
+from libcst.metadata import MetadataWrapper, ScopeProvider
+
+
+def _analyze_file(
+    py_file: Path,
+    check_bugs: bool = False,
+    profile: bool = False,
+    stages: Optional[AnalysisProfile] = None,
+) -> Tuple[str, Dict[str, Any], List[Dict[str, Any]]]:
+    """读取并分析单个文件，返回 (路径, 结果, 计时事件)；可在工作进程中执行"""
+    profiler = PhaseProfiler(enabled=profile)
+    file = str(py_file)
+    try:
+        with profiler.phase("read", file):
+            source = read_source(py_file)
+    except Exception as e:
+        return file, {"error": str(e)}, profiler.events
+    file, result, events = _analyze_source(file, source, check_bugs, profile, stages)
+    return file, result, profiler.events + events
+
+
+def _analyze_source(
+    file: str,
+    source: Union[str, bytes],
+    check_bugs: bool = False,
+    profile: bool = False,
+    stages: Optional[AnalysisProfile] = None,
+) -> Tuple[str, Dict[str, Any], List[Dict[str, Any]]]:
+    """分析已读入的源码，返回 (路径, 结果, 计时事件)；可在工作进程中执行
+
+    source 为原始字节时由 libcst 按 PEP 263 编码声明解码。
+    stages 为分析档位：fast 档位（且未要求 Bug 扫描）改用 ast 计算指标，
+    deep 档位附加记号流重复检测；不需要跨文件索引时不收集符号。
+    """
+    profiler = PhaseProfiler(enabled=profile)
+    try:
+        if stages is not None and stages.fast_parser and not check_bugs:
+            with profiler.phase("metrics", file):
+                result = analyze_fast(source)
+        else:
+            with profiler.phase("parse", file):
+                tree = cst.parse_module(source)
+
+            with profiler.phase("scope", file):
+                wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+                wrapper.resolve(ScopeProvider)
+
+            with profiler.phase("metrics", file):
+                result = CodeMetrics().analyze(tree, source, wrapper)
+                if stages is None or stages.cross_file:
+                    # 供项目索引使用，汇入索引后从结果中移除
+                    result["symbols"] = collect_symbols(tree)
+
+            if check_bugs:
+                with profiler.phase("check_bugs", file):
+                    result["bug_findings"] = check_logic_bugs(wrapper, source=source)
+
+        if stages is not None and stages.duplicates:
+            with profiler.phase("duplicates", file):
+                report = TokenDuplicateDetector(min_block_size=5).detect(source)
+                result["duplicates"] = {
+                    "exact": report.exact_duplicates,
+                    "similar": report.similar_duplicates,
+                    "duplicate_lines": report.duplicate_lines,
+                    "duplicate_percentage": round(report.duplicate_percentage, 1),
+                }
+    except Exception as e:
+        result = {"error": str(e)}
+    return file, result, profiler.events
 
 
 class MultiFileAnalyzer:
@@ -12,15 +116,43 @@ class MultiFileAnalyzer:
 
     def __init__(self):
         self.results: Dict[str, Dict[str, Any]] = {}
+        self.memory_stats: Optional[Dict[str, Any]] = None
+        self.unanalyzed: List[str] = []
 
     def analyze_directory(
-        self, directory: str, recursive: bool = True
+        self,
+        directory: str,
+        recursive: bool = True,
+        check_bugs: bool = False,
+        workers: int = 1,
+        profiler: Optional[PhaseProfiler] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        summary_only: bool = False,
+        index: Optional[ProjectIndex] = None,
+        memory: Optional[MemoryLimits] = None,
+        analysis_profile: Optional[Union[str, AnalysisProfile]] = None,
+        time_budget: Optional[float] = None,
     ) -> Dict[str, Any]:
         """分析目录下的所有Python文件
 
         Args:
             directory: 目录路径
             recursive: 是否递归分析子目录
+            check_bugs: 是否同时执行 Bug 扫描（按触发词跳过不可能命中的规则）
+            workers: 并行工作进程数，1 表示在当前进程内执行
+            profiler: 可选的分阶段计时器，工作进程中的事件会合并到其中
+            shard: (分片序号, 分片总数)，序号从 0 开始；只分析按相对路径哈希
+                落入该分片的文件，各分片报告可用 merge_reports 合并
+            summary_only: 只做流式汇总，不保留各文件结果；报告中的 aggregates
+                为可合并的汇总状态，files 为空
+            index: 项目符号索引，分析过程中顺带更新；None 时使用新建的内存索引。
+                据此排除被重新导出的导入，并检测导入环
+            memory: 内存调度参数；指定时即使 workers 为 1 也在工作进程中分析，
+                各文件结果带有峰值内存，报告的 memory 字段为调度统计
+            analysis_profile: 分析档位 fast / standard / deep（见 profiles 模块）；
+                None 时保持默认行为（libcst 指标 + 跨文件索引）
+            time_budget: 整次运行的时间预算（秒）；文件按风险与新近程度排序，
+                预计无法在截止前完成的文件不再分析，列在报告的 time_budget 中
 
         Returns:
             包含所有文件分析结果的字典
@@ -29,114 +161,618 @@ class MultiFileAnalyzer:
         if not dir_path.is_dir():
             raise ValueError(f"{directory} 不是有效的目录")
 
-        # 查找所有Python文件
-        if recursive:
-            py_files = list(dir_path.rglob("*.py"))
+        profile = profiler is not None and profiler.enabled
+        if profiler is None:
+            profiler = PhaseProfiler(enabled=False)
+
+        stages = (
+            get_profile(analysis_profile) if analysis_profile is not None else None
+        )
+        if stages is not None:
+            check_bugs = check_bugs or stages.check_bugs
+        cross_file = stages is None or stages.cross_file
+        budget = budget_for(time_budget, stages)
+
+        paths: Iterable[Path] = self._iter_python_files(dir_path, recursive)
+        if shard is not None:
+            paths = filter_shard(paths, dir_path, *shard)
+        if budget is not None:
+            with profiler.phase("discovery"):
+                paths = prioritize_files(paths, dir_path, recursive)
+        elif workers <= 1 and memory is None:
+            with profiler.phase("discovery"):
+                paths = sorted(paths)
+
+        if not cross_file:
+            index = None
+        elif index is None:
+            index = ProjectIndex()
+        analyzed: List[str] = []
+        run = dict(memory=memory, stages=stages, budget=budget)
+
+        if summary_only:
+            # 每个文件完成即计入汇总，随后丢弃结果。含未使用导入的文件可能因
+            # 其他模块的重新导出而被修正，需等索引完整后修正再计入
+            aggregator = ProjectAggregator()
+            pending: Dict[str, Dict[str, Any]] = {}
+            correct = index is not None and shard is None
+
+            def add(file: str, result: Dict[str, Any]) -> None:
+                if correct and result.get("unused_imports"):
+                    pending[file] = result
+                else:
+                    aggregator.add(file, result)
+
+            sink = self._index_sink(dir_path, index, analyzed, add)
+            _, total_files = self._analyze_paths(
+                paths, check_bugs, workers, profiler, sink, False, **run
+            )
+            if pending:
+                self._apply_cross_file(dir_path, pending, index)
+                for file, result in sorted(pending.items()):
+                    aggregator.add(file, result)
+            report = self._build_report(
+                dir_path, total_files, {}, profiler, aggregator
+            )
+            report["aggregates"] = aggregator.to_dict()
         else:
-            py_files = list(dir_path.glob("*.py"))
-
-        # 排除常见的非源代码文件夹
-        excluded_dirs = {
-            ".git",
-            "__pycache__",
-            ".venv",
-            "venv",
-            ".idea",
-            "node_modules",
+            sink = self._index_sink(dir_path, index, analyzed)
+            results, total_files = self._analyze_paths(
+                paths, check_bugs, workers, profiler, sink, **run
+            )
+            if shard is None and index is not None:
+                self._apply_cross_file(dir_path, results, index)
+            report = self._build_report(dir_path, total_files, results, profiler)
+
+        if index is not None and shard is None:
+            # 因时间预算未分析的文件仍然存在，保留其索引条目供下次运行使用
+            skipped = [self._relpath(f, dir_path) for f in self.unanalyzed]
+            index.retain(analyzed + skipped)
+            report["import_cycles"] = index.import_cycles()
+        elif index is not None:
+            # 分片只掌握部分模块，跨文件检查在 merge_reports 中基于合并后的索引完成
+            report["shard"] = list(shard)
+            part = ProjectIndex()
+            part.modules = {
+                rel: index.modules[rel] for rel in analyzed if rel in index.modules
+            }
+            report["index"] = part.to_dict()
+        if self.memory_stats is not None:
+            report["memory"] = self.memory_stats
+        if stages is not None:
+            report["profile"] = stages.name
+            if stages.evolution:
+                with profiler.phase("evolution"):
+                    self._add_evolution(report, dir_path, analyzed, budget)
+        if budget is not None:
+            report["time_budget"] = {
+                "seconds": budget.seconds,
+                "elapsed": round(budget.elapsed(), 3),
+                "analyzed": len(analyzed),
+                "unanalyzed": [
+                    self._relpath(f, dir_path) for f in self.unanalyzed
+                ],
+            }
+        return report
+
+    @staticmethod
+    def _add_evolution(
+        report: Dict[str, Any],
+        dir_path: Path,
+        analyzed: List[str],
+        budget: Optional[TimeBudget],
+        limit: int = 5,
+    ) -> None:
+        """deep 档位：为已分析文件附加最近 limit 个版本的演化历史
+
+        缺少 GitPython 或目录不在 git 仓库内时跳过，原因记在 skipped_stages。
+        """
+        try:
+            from .evolution import EvolutionAnalyzer
+
+            analyzer = EvolutionAnalyzer(str(dir_path))
+        except Exception as e:
+            # ImportError（未安装 GitPython）或不在 git 仓库内
+            reason = str(e) or type(e).__name__
+            report.setdefault("skipped_stages", {})["evolution"] = reason
+            return
+        repo_root = Path(analyzer.repo.working_tree_dir).resolve()
+        base = dir_path.resolve().relative_to(repo_root)
+        history: Dict[str, List[Dict[str, Any]]] = {}
+        for rel in sorted(analyzed):
+            if budget is not None and budget.remaining() <= 0:
+                report.setdefault("skipped_stages", {})["evolution"] = "时间预算用尽"
+                break
+            entries = analyzer.analyze_history((base / rel).as_posix(), limit=limit)
+            history[rel] = [
+                {k: e[k] for k in ("commit", "date", "score", "complexity")}
+                for e in entries
+            ]
+        report["evolution"] = history
+
+    @staticmethod
+    def _index_sink(
+        dir_path: Path,
+        index: Optional[ProjectIndex],
+        analyzed: List[str],
+        then: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> Callable[[str, Dict[str, Any]], None]:
+        """返回每个文件完成时的回调：把符号汇入索引并从结果中移除"""
+
+        def sink(file: str, result: Dict[str, Any]) -> None:
+            analyzed.append(Path(file).relative_to(dir_path).as_posix())
+            if index is not None:
+                index.update_from_result(dir_path, file, result)
+            result.pop("symbols", None)
+            if then is not None:
+                then(file, result)
+
+        return sink
+
+    def _apply_cross_file(
+        self,
+        dir_path: Path,
+        results: Dict[str, Dict[str, Any]],
+        index: ProjectIndex,
+    ) -> None:
+        """按项目索引修正各文件的未使用导入：被重新导出的名字不算未使用
+
+        评分由结果中的各项指标与修正后的未使用导入数重新计算。
+        """
+        exported = index.reexported_names()
+        for file, result in results.items():
+            if "unused_imports" not in result:
+                continue
+            rel = self._relpath(file, dir_path)
+            entry = index.modules.get(rel)
+            if entry is None:
+                continue
+            names = exported.get(rel, set())
+            kept = [n for n in entry.unused_imports if n not in names]
+            if kept == result["unused_imports"]:
+                continue
+            result["unused_imports"] = kept
+            result["quality_score"] = quality_score(
+                result["cyclomatic_complexity"],
+                result["max_nesting_depth"],
+                len(kept),
+                result["annotation_coverage"],
+            )
+
+    def merge_reports(self, reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并多个分片（或互不重叠的部分）报告
+
+        文件结果以各自报告目录的相对路径重新挂到第一份报告的目录下，
+        汇总、最佳/最差文件重新计算，结果与单机完整运行一致。
+        带分片信息的报告必须分片总数一致且恰好覆盖每个分片一次。
+        """
+        if not reports:
+            raise ValueError("没有可合并的报告")
+
+        shards = [tuple(r["shard"]) for r in reports if "shard" in r]
+        if shards:
+            count = shards[0][1]
+            if len(shards) != len(reports) or any(c != count for _, c in shards):
+                raise ValueError("分片报告的分片总数不一致")
+            indices = sorted(i for i, _ in shards)
+            if indices != list(range(count)):
+                got = ", ".join(f"{i + 1}/{count}" for i in indices)
+                raise ValueError(f"分片不完整或重复: 共 {count} 片，实际为 {got}")
+
+        dir_path = Path(reports[0]["directory"])
+        results: Dict[str, Dict[str, Any]] = {}
+        total_files = 0
+        slowest: List[Dict[str, Any]] = []
+        # 只含汇总状态的报告合并其草图，其余报告由文件结果重新汇总
+        summarized = ProjectAggregator()
+        for report in reports:
+            if "aggregates" in report:
+                part = ProjectAggregator.from_dict(report["aggregates"])
+                base = Path(report.get("directory", "."))
+                for name in ("best", "worst"):
+                    extreme = getattr(part, name)
+                    if extreme is not None:
+                        rel = self._relpath(extreme[1], base)
+                        setattr(part, name, (extreme[0], str(dir_path / rel)))
+                summarized.merge(part)
+            for rel, result in self._results_by_relpath(report).items():
+                key = str(dir_path / rel)
+                if key in results:
+                    raise ValueError(f"文件在多份报告中重复出现: {key}")
+                results[key] = result
+            total_files += report.get("total_files", 0)
+            slowest.extend(report.get("slowest_files", []))
+
+        index = None
+        if all("index" in r for r in reports):
+            index = ProjectIndex()
+            for report in reports:
+                index.merge(ProjectIndex.from_dict(report["index"]))
+            self._apply_cross_file(dir_path, results, index)
+
+        has_aggregates = any("aggregates" in r for r in reports)
+        aggregator = None
+        if has_aggregates:
+            aggregator = ProjectAggregator()
+            for key, result in sorted(results.items()):
+                aggregator.add(key, result)
+            aggregator.merge(summarized)
+        merged = self._build_report(
+            dir_path, total_files, results, PhaseProfiler(enabled=False), aggregator
+        )
+        if has_aggregates:
+            merged["aggregates"] = aggregator.to_dict()
+        if index is not None:
+            merged["import_cycles"] = index.import_cycles()
+        if slowest:
+            slowest.sort(key=lambda e: e["wall_ms"], reverse=True)
+            merged["slowest_files"] = slowest[:10]
+        return merged
+
+    def analyze_changed(
+        self,
+        directory: str,
+        since: str,
+        baseline: Optional[Dict[str, Any]] = None,
+        recursive: bool = True,
+        check_bugs: bool = False,
+        workers: int = 1,
+        profiler: Optional[PhaseProfiler] = None,
+        index: Optional[ProjectIndex] = None,
+        memory: Optional[MemoryLimits] = None,
+        analysis_profile: Optional[Union[str, AnalysisProfile]] = None,
+        time_budget: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """只分析相对 git 引用 since 发生变化的文件
+
+        未变化文件的结果取自基准报告 baseline（通常是在 since 上生成的完整报告），
+        项目汇总因此仍覆盖整个目录；不提供 baseline 时报告只包含变更文件。
+        纯重命名（相似度 100%）的文件沿用旧路径的基准结果，
+        基准报告中缺失的文件会被补充分析，已删除的文件不再出现在报告中。
+
+        Args:
+            directory: 目录路径（需位于 git 工作区内）
+            since: 作为比较基准的 git 引用，如 origin/main
+            baseline: ReportExporter 导出的基准报告
+            recursive: 是否递归分析子目录
+            check_bugs: 是否同时执行 Bug 扫描
+            workers: 并行工作进程数
+            profiler: 可选的分阶段计时器
+            index: 持久化的项目符号索引，只为变更文件更新；None 时新建内存索引
+                并为未变化的文件补齐。据此执行跨文件检查（重新导出感知的
+                未使用导入、导入环），与 analyze_directory 一致
+            memory: 内存调度参数，同 analyze_directory
+            analysis_profile: 分析档位，同 analyze_directory；不含跨文件阶段的档位忽略 index
+            time_budget: 时间预算（秒），同 analyze_directory
+
+        Returns:
+            与 analyze_directory 结构相同的报告，另含 since 与 reanalyzed_files
+        """
+        dir_path = Path(directory)
+        if not dir_path.is_dir():
+            raise ValueError(f"{directory} 不是有效的目录")
+
+        if profiler is None:
+            profiler = PhaseProfiler(enabled=False)
+        stages = (
+            get_profile(analysis_profile) if analysis_profile is not None else None
+        )
+        if stages is not None:
+            check_bugs = check_bugs or stages.check_bugs
+        if stages is not None and not stages.cross_file:
+            index = None
+        elif index is None:
+            index = ProjectIndex()
+        budget = budget_for(time_budget, stages)
+
+        with profiler.phase("discovery"):
+            changes = git_changed_files(dir_path, since, recursive, EXCLUDED_DIRS)
+            to_analyze = set(changes.changed)
+            carried: Dict[str, Dict[str, Any]] = {}
+            if baseline is not None:
+                previous = self._results_by_relpath(baseline)
+                for path in self._find_python_files(dir_path, recursive):
+                    if path in to_analyze:
+                        continue
+                    source_path = changes.renamed.get(path, (path, 0))[0]
+                    rel = source_path.relative_to(dir_path).as_posix()
+                    if rel in previous:
+                        carried[str(path)] = previous[rel]
+                    else:
+                        to_analyze.add(path)
+
+            if budget is not None:
+                ordered = prioritize_files(to_analyze, dir_path, recursive)
+            else:
+                ordered = sorted(to_analyze)
+
+        sink = self._index_sink(dir_path, index, [])
+        results, _ = self._analyze_paths(
+            ordered,
+            check_bugs,
+            workers,
+            profiler,
+            sink,
+            memory=memory,
+            stages=stages,
+            budget=budget,
+        )
+        reanalyzed = list(results)
+        results.update(carried)
+
+        if index is not None:
+            # 未变化的文件沿用索引中的记录，只补齐缺失或过期的条目
+            with profiler.phase("index"):
+                index.refresh(dir_path, recursive, workers)
+            self._apply_cross_file(dir_path, results, index)
+
+        report = self._build_report(dir_path, len(results), results, profiler)
+        report["since"] = since
+        report["reanalyzed_files"] = reanalyzed
+        if index is not None:
+            report["import_cycles"] = index.import_cycles()
+        if self.memory_stats is not None:
+            report["memory"] = self.memory_stats
+        if stages is not None:
+            report["profile"] = stages.name
+            if stages.evolution:
+                with profiler.phase("evolution"):
+                    changed = [self._relpath(f, dir_path) for f in reanalyzed]
+                    self._add_evolution(report, dir_path, changed, budget)
+        if budget is not None:
+            report["time_budget"] = {
+                "seconds": budget.seconds,
+                "elapsed": round(budget.elapsed(), 3),
+                "analyzed": len(reanalyzed),
+                "unanalyzed": [
+                    self._relpath(f, dir_path) for f in self.unanalyzed
+                ],
+            }
+        return report
+
+    @staticmethod
+    def _relpath(file: str, base: Path) -> str:
+        """文件相对报告目录的 POSIX 路径"""
+        try:
+            return Path(file).relative_to(base).as_posix()
+        except ValueError:
+            return Path(file).as_posix()
+
+    @staticmethod
+    def _results_by_relpath(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """把报告中的文件结果改为以相对报告目录的 POSIX 路径为键"""
+        base = Path(report.get("directory", "."))
+        return {
+            MultiFileAnalyzer._relpath(file, base): result
+            for file, result in report.get("files", {}).items()
         }
-        py_files = [
-            f for f in py_files if not any(part in f.parts for part in excluded_dirs)
-        ]
 
-        results = {}
-        total_score = 0
-        file_count = 0
+    def _analyze_paths(
+        self,
+        paths: Iterable[Path],
+        check_bugs: bool,
+        workers: int,
+        profiler: PhaseProfiler,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        keep_results: bool = True,
+        memory: Optional[MemoryLimits] = None,
+        stages: Optional[AnalysisProfile] = None,
+        budget: Optional[TimeBudget] = None,
+    ) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """分析给定文件，返回 ({路径: 结果}, 文件数)
 
-        for py_file in sorted(py_files):
-            try:
-                with open(py_file, "r", encoding="utf-8") as f:
-                    source = f.read()
+        on_result 在每个文件完成时被调用；keep_results 为 False 时不保留结果。
+        指定 memory 时按内存预算调度，调度统计记在 self.memory_stats；
+        指定 budget 时按顺序放行能在截止前完成的文件，其余记在 self.unanalyzed。
+        """
+        profile = profiler.enabled
+        self.memory_stats = None
+        self.unanalyzed = []
+        if workers > 1 or memory is not None:
+            # 发现、读取与分析在异步流水线中重叠执行
+            pipeline = AnalysisPipeline(
+                workers=workers,
+                check_bugs=check_bugs,
+                profiler=profiler,
+                on_result=on_result,
+                keep_results=keep_results,
+                memory=memory,
+                stages=stages,
+                budget=budget,
+            )
+            results = pipeline.run(paths)
+            self.memory_stats = pipeline.memory_stats
+            self.unanalyzed = sorted(pipeline.skipped)
+            return results, pipeline.discovered
 
-                tree = cst.parse_module(source)
-                metrics = CodeMetrics()
-                result = metrics.analyze(tree, source)
+        results = {}
+        count = 0
+        for py_file in paths:
+            count += 1
+            if budget is not None:
+                size = file_size(py_file)
+                if not budget.admits(size):
+                    self.unanalyzed.append(str(py_file))
+                    continue
+                started = time.monotonic()
+            file, result, events = _analyze_file(py_file, check_bugs, profile, stages)
+            if budget is not None:
+                budget.record(size, time.monotonic() - started)
+            profiler.merge(events)
+            if on_result is not None:
+                on_result(file, result)
+            if keep_results:
+                results[file] = result
+        return results, count
 
-                results[str(py_file)] = result
-                total_score += result["quality_score"]
-                file_count += 1
-            except Exception as e:
-                results[str(py_file)] = {"error": str(e)}
+    def _build_report(
+        self,
+        dir_path: Path,
+        total_files: int,
+        results: Dict[str, Dict[str, Any]],
+        profiler: PhaseProfiler,
+        aggregator: Optional[ProjectAggregator] = None,
+    ) -> Dict[str, Any]:
+        """汇总各文件结果，生成项目级报告
+
+        提供 aggregator 时直接使用其流式汇总，否则由 results 计算。
+        """
+        # 统一按路径排序，顺序（以及并列时的最佳/最差文件）与执行方式无关
+        results = dict(sorted(results.items()))
+        if aggregator is None:
+            aggregator = self._aggregate(results)
+        file_count = aggregator.files
 
         # 计算项目级汇总
-        summary = self._calculate_summary(results, file_count)
+        summary = aggregator.summary()
 
-        return {
+        report = {
             "directory": str(dir_path),
-            "total_files": len(py_files),
+            "total_files": total_files,
             "analyzed_files": file_count,
             "summary": summary,
             "files": results,
         }
+        if profiler.enabled:
+            report["slowest_files"] = profiler.slowest_files()
+        return report
+
+    @staticmethod
+    def _iter_python_files(dir_path: Path, recursive: bool) -> Iterator[Path]:
+        """逐个产出Python文件，排除常见的非源代码文件夹与被 git 忽略的文件"""
+        return iter_python_files(dir_path, recursive, EXCLUDED_DIRS)
+
+    @staticmethod
+    def _find_python_files(dir_path: Path, recursive: bool) -> List[Path]:
+        """查找所有Python文件，排除常见的非源代码文件夹"""
+        return list(MultiFileAnalyzer._iter_python_files(dir_path, recursive))
+
+    def scan_bugs(
+        self,
+        directory: str,
+        recursive: bool = True,
+        disabled: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """只对目录执行 Bug 扫描
+
+        触发词预过滤在解析之前进行，不含任何触发词的文件不会被解析。
+
+        Args:
+            directory: 目录路径
+            recursive: 是否递归扫描子目录
+            disabled: 需要禁用的规则
+        """
+        dir_path = Path(directory)
+        if not dir_path.is_dir():
+            raise ValueError(f"{directory} 不是有效的目录")
+
+        findings = {}
+        for py_file in sorted(self._find_python_files(dir_path, recursive)):
+            try:
+                file_findings = scan_source(py_file.read_bytes(), disabled=disabled)
+            except Exception as e:
+                findings[str(py_file)] = [f"解析失败: {e}"]
+                continue
+            if file_findings:
+                findings[str(py_file)] = file_findings
+        return findings
+
+    @staticmethod
+    def _aggregate(results: Dict[str, Dict[str, Any]]) -> ProjectAggregator:
+        """按路径顺序把各文件结果计入流式汇总"""
+        aggregator = ProjectAggregator()
+        for file, result in sorted(results.items()):
+            aggregator.add(file, result)
+        return aggregator
 
     def _calculate_summary(self, results: Dict, file_count: int) -> Dict[str, Any]:
         """计算项目级汇总指标"""
         if file_count == 0:
             return {}
+        return self._aggregate(results).summary()
 
-        avg_score = 0
-        total_functions = 0
-        total_classes = 0
-        total_lines = 0
-        worst_score = 100
-        worst_file = None
-        best_score = 0
-        best_file = None
-
-        for file_path, result in results.items():
-            if "error" in result:
-                continue
-
-            score = result.get("quality_score", 0)
-            avg_score += score
-            total_functions += result.get("function_count", 0)
-            total_classes += result.get("class_count", 0)
-            total_lines += result.get("line_count", 0)
 
-            if score < worst_score:
-                worst_score = score
-                worst_file = file_path
-            if score > best_score:
-                best_score = score
-                best_file = file_path
+class DataclassEncoder(json.JSONEncoder):
+    """直接序列化 dataclass（如 FunctionMetrics），无需事先深拷贝整棵结果树"""
 
-        return {
-            "average_quality_score": round(avg_score / file_count, 2),
-            "best_file": best_file,
-            "best_file_score": best_score,
-            "worst_file": worst_file,
-            "worst_file_score": worst_score,
-            "total_functions": total_functions,
-            "total_classes": total_classes,
-            "total_lines": total_lines,
-        }
+    def default(self, obj: Any) -> Any:
+        if hasattr(obj, "__dataclass_fields__"):
+            return obj.__dict__
+        return super().default(obj)
 
 
 class ReportExporter:
     """导出分析报告"""
 
     @staticmethod
-    def export_json(result: Dict[str, Any], output_file: str) -> None:
+    def export_json(
+        result: Dict[str, Any],
+        output_file: str,
+        compact: bool = False,
+        compress: Optional[bool] = None,
+    ) -> None:
         """导出为JSON格式
 
+        编码器边生成边写入文件，不再构建完整的中间副本。
+
         Args:
             result: 分析结果字典
             output_file: 输出文件路径
+            compact: 紧凑模式（无缩进、无多余空白）
+            compress: 是否 gzip 压缩；None 时根据 .gz 后缀判断
+        """
+        if compress is None:
+            compress = str(output_file).endswith(".gz")
+
+        encoder = DataclassEncoder(
+            ensure_ascii=False,
+            indent=None if compact else 2,
+            separators=(",", ":") if compact else None,
+        )
+        if compress:
+            f = gzip.open(output_file, "wt", encoding="utf-8")
+        else:
+            f = open(output_file, "w", encoding="utf-8")
+        with f:
+            for chunk in encoder.iterencode(result):
+                f.write(chunk)
+
+    @staticmethod
+    def export_sqlite(result: Dict[str, Any], output_file: str) -> int:
+        """导出到 SQLite 指标库（替换库中已有数据），返回写入的文件数"""
+        from .store import MetricsStore
+
+        with MetricsStore(output_file) as store:
+            return store.write_report(result)
+
+    @staticmethod
+    def export_chunked(
+        result: Dict[str, Any],
+        output_dir: str,
+        chunk_size: int = 500,
+        workers: int = 4,
+    ):
+        """导出为分块报告目录（索引 + 按目录切分的块 + 静态查看器），返回写入统计"""
+        from .chunked_report import export_chunked
+
+        return export_chunked(result, output_dir, chunk_size, workers)
+
+    @staticmethod
+    def load_json(input_file: str) -> Dict[str, Any]:
+        """读取 export_json 导出的报告（以 .gz 结尾时按 gzip 解压）
+
+        input_file 为 export_chunked 导出的目录时还原为完整报告。
         """
-        # 处理不可序列化的对象
-        json_result = ReportExporter._make_serializable(result)
+        if Path(input_file).is_dir():
+            from .chunked_report import ChunkedReport
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(json_result, f, ensure_ascii=False, indent=2)
+            return ChunkedReport(input_file).to_report()
+        if str(input_file).endswith(".gz"):
+            f = gzip.open(input_file, "rt", encoding="utf-8")
+        else:
+            f = open(input_file, "r", encoding="utf-8")
+        with f:
+            return json.load(f)
 
     @staticmethod
     def _make_serializable(obj: Any) -> Any:
@@ -0,0 +1,198 @@
+"""基于 asyncio 的目录分析流水线
+
+文件发现、并发读取与 CPU 密集的分析分为三个重叠执行的阶段：
+
+    发现（线程） -> path_queue -> 读取（线程池，N 个并发） -> source_queue
+        -> 分派（进程池，最多 2×workers 个在途任务）
+
+队列均有上限，分派端用信号量限制在途任务数，形成逐级反压：
+分析跟不上时读取会停下，读取跟不上时发现会停下，内存占用因此有界。
+冷缓存或网络文件系统上，吞吐取决于磁盘与 CPU 中较慢的一方。
+指定内存限制时改用 MemoryBudgetExecutor，按内存预算放行分析任务，
+并在各文件结果中记录其峰值内存。
+指定时间预算时，分派端在提交前按预算估算放行文件，放不下的记入 skipped；
+此时在途任务数限制为 workers，使每个文件的实测耗时不含排队时间。
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .memory import MemoryBudgetExecutor, MemoryLimits
+from .profiler import PhaseProfiler
+from .profiles import AnalysisProfile, TimeBudget
+from .source_io import read_source
+
+_DONE = object()
+
+
+def _read_source(path: str, profile: bool) -> Tuple[Optional[bytes], Any, list]:
+    """在 I/O 线程中读取文件，返回 (源码字节, 错误, 计时事件)"""
+    profiler = PhaseProfiler(enabled=profile)
+    try:
+        with profiler.phase("read", path):
+            return read_source(path), None, profiler.events
+    except Exception as e:
+        return None, str(e), profiler.events
+
+
+class AnalysisPipeline:
+    """有界队列 + 反压的异步分析流水线
+
+    Args:
+        workers: CPU 工作进程数
+        read_concurrency: 并发读取数
+        queue_size: 各阶段之间队列的容量
+        check_bugs: 是否同时执行 Bug 扫描
+        profiler: 可选的分阶段计时器
+        on_result: 每个文件完成时在事件循环线程中回调 (路径, 结果)
+        keep_results: 为 False 时不保留各文件结果（配合 on_result 流式汇总）
+        memory: 内存调度参数；指定时各文件结果带有 memory 字段
+        stages: 分析档位，传给 _analyze_source
+        budget: 时间预算；预计无法在截止前完成的文件不再分析
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        read_concurrency: int = 16,
+        queue_size: int = 64,
+        check_bugs: bool = False,
+        profiler: Optional[PhaseProfiler] = None,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        keep_results: bool = True,
+        memory: Optional[MemoryLimits] = None,
+        stages: Optional[AnalysisProfile] = None,
+        budget: Optional[TimeBudget] = None,
+    ):
+        self.workers = max(1, workers)
+        self.read_concurrency = max(1, read_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.check_bugs = check_bugs
+        self.profiler = profiler or PhaseProfiler(enabled=False)
+        self.on_result = on_result
+        self.keep_results = keep_results
+        self.memory = memory
+        self.memory_stats: Optional[Dict[str, Any]] = None
+        self.stages = stages
+        self.budget = budget
+        self.skipped: List[str] = []
+        self.discovered = 0
+
+    def run(self, paths: Iterable) -> Dict[str, Dict[str, Any]]:
+        """同步入口：分析 paths 中的所有文件，返回 {路径: 结果}"""
+        return asyncio.run(self.run_async(paths))
+
+    async def run_async(self, paths: Iterable) -> Dict[str, Dict[str, Any]]:
+        if self.memory is not None:
+            cpu_pool: Executor = MemoryBudgetExecutor(self.workers, self.memory)
+        else:
+            cpu_pool = ProcessPoolExecutor(max_workers=self.workers)
+        with ThreadPoolExecutor(
+            max_workers=self.read_concurrency + 1, thread_name_prefix="ci-io"
+        ) as io_pool, cpu_pool:
+            results = await self._run(paths, io_pool, cpu_pool)
+        if isinstance(cpu_pool, MemoryBudgetExecutor):
+            self.memory_stats = cpu_pool.stats()
+        return results
+
+    async def _run(
+        self, paths: Iterable, io_pool: Executor, cpu_pool: Executor
+    ) -> Dict[str, Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        path_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        source_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        budget = self.budget
+        in_flight = asyncio.Semaphore(
+            self.workers if budget is not None else self.workers * 2
+        )
+        results: Dict[str, Dict[str, Any]] = {}
+        profile = self.profiler.enabled
+
+        def emit(path: str, result: Dict[str, Any]):
+            if self.on_result is not None:
+                self.on_result(path, result)
+            if self.keep_results:
+                results[path] = result
+
+        def discover():
+            # 在线程中遍历（可能是生成器的）paths，队列满时阻塞形成反压
+            count = 0
+            with self.profiler.phase("discovery"):
+                for path in paths:
+                    count += 1
+                    asyncio.run_coroutine_threadsafe(
+                        path_queue.put(str(path)), loop
+                    ).result()
+            for _ in range(self.read_concurrency):
+                asyncio.run_coroutine_threadsafe(path_queue.put(_DONE), loop).result()
+            return count
+
+        async def reader():
+            while True:
+                path = await path_queue.get()
+                if path is _DONE:
+                    break
+                source, error, events = await loop.run_in_executor(
+                    io_pool, _read_source, path, profile
+                )
+                self.profiler.merge(events)
+                if error is not None:
+                    emit(path, {"error": error})
+                    continue
+                await source_queue.put((path, source))
+
+        async def analyze(path: str, source: bytes):
+            from .multi_file_analyzer import _analyze_source
+
+            started = time.monotonic()
+            try:
+                future = cpu_pool.submit(
+                    _analyze_source,
+                    path,
+                    source,
+                    self.check_bugs,
+                    profile,
+                    self.stages,
+                )
+                try:
+                    file, result, events = await asyncio.wrap_future(future)
+                except RuntimeError as e:
+                    # 内存调度下工作进程被终止（如 OOM）只影响当前文件
+                    if self.memory is None:
+                        raise
+                    file, result, events = path, {"error": str(e)}, []
+                if budget is not None:
+                    budget.record(len(source), time.monotonic() - started)
+                memory = getattr(future, "memory", None)
+                if memory is not None:
+                    result["memory"] = memory
+                self.profiler.merge(events)
+                emit(file, result)
+            finally:
+                in_flight.release()
+
+        async def dispatcher():
+            tasks: List[asyncio.Task] = []
+            while True:
+                item = await source_queue.get()
+                if item is _DONE:
+                    break
+                await in_flight.acquire()
+                if budget is not None and not budget.admits(len(item[1])):
+                    in_flight.release()
+                    self.skipped.append(item[0])
+                    continue
+                tasks.append(asyncio.ensure_future(analyze(*item)))
+            await asyncio.gather(*tasks)
+
+        discovery = loop.run_in_executor(io_pool, discover)
+        readers = [asyncio.ensure_future(reader()) for _ in range(self.read_concurrency)]
+        dispatch = asyncio.ensure_future(dispatcher())
+
+        self.discovered = await discovery
+        await asyncio.gather(*readers)
+        await source_queue.put(_DONE)
+        await dispatch
+        return dict(sorted(results.items()))
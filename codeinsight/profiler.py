@@ -0,0 +1,120 @@
+"""分阶段计时与 Chrome trace 输出"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class PhaseProfiler:
+    """记录每个文件、每个阶段的墙钟时间与 CPU 时间
+
+    事件采用 Chrome trace-event 格式（"X" 完整事件），时间戳取自
+    perf_counter_ns。Linux 上它基于系统级单调时钟，因此各工作进程记录的事件
+    可以直接合并到同一条时间轴上。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.events: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str, file: Optional[str] = None) -> Iterator[None]:
+        """计时一个阶段"""
+        if not self.enabled:
+            yield
+            return
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.thread_time_ns()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter_ns() - wall_start
+            cpu = time.thread_time_ns() - cpu_start
+            args: Dict[str, Any] = {"cpu_us": cpu / 1000}
+            if file is not None:
+                args["file"] = file
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": "file" if file is not None else "run",
+                    "ph": "X",
+                    "ts": wall_start / 1000,
+                    "dur": wall / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def merge(self, events: List[Dict[str, Any]]) -> None:
+        """合并工作进程返回的事件"""
+        if self.enabled:
+            self.events.extend(events)
+
+    def phase_totals(self) -> Dict[str, Dict[str, float]]:
+        """按阶段汇总墙钟与 CPU 时间（毫秒）"""
+        totals: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"wall_ms": 0.0, "cpu_ms": 0.0, "count": 0}
+        )
+        for event in self.events:
+            entry = totals[event["name"]]
+            entry["wall_ms"] += event["dur"] / 1000
+            entry["cpu_ms"] += event["args"]["cpu_us"] / 1000
+            entry["count"] += 1
+        return dict(totals)
+
+    def slowest_files(self, top_n: int = 10) -> List[Dict[str, Any]]:
+        """按总墙钟时间返回最慢的 top_n 个文件及其各阶段耗时"""
+        per_file: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            file = event["args"].get("file")
+            if file is None:
+                continue
+            entry = per_file.setdefault(
+                file, {"file": file, "wall_ms": 0.0, "cpu_ms": 0.0, "phases": {}}
+            )
+            wall_ms = event["dur"] / 1000
+            entry["wall_ms"] += wall_ms
+            entry["cpu_ms"] += event["args"]["cpu_us"] / 1000
+            entry["phases"][event["name"]] = (
+                entry["phases"].get(event["name"], 0.0) + wall_ms
+            )
+        ranked = sorted(per_file.values(), key=lambda e: e["wall_ms"], reverse=True)
+        return ranked[:top_n]
+
+    def write_chrome_trace(self, output_file: str) -> None:
+        """写出可在 chrome://tracing 或 Perfetto 中打开的 trace 文件"""
+        events = list(self.events)
+        for pid in sorted({e["pid"] for e in events}):
+            role = "main" if pid == os.getpid() else "worker"
+            events.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "args": {"name": f"codeinsight {role} ({pid})"},
+                }
+            )
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"},
+                f,
+                ensure_ascii=False,
+            )
+
+
+def format_slowest_files(slowest: List[Dict[str, Any]]) -> str:
+    """格式化最慢文件表"""
+    lines = [f"\n⏱️  耗时最长的 {len(slowest)} 个文件:"]
+    lines.append(f"  {'墙钟(ms)':>10} {'CPU(ms)':>10}  文件 [主要阶段]")
+    for entry in slowest:
+        top_phase = max(entry["phases"].items(), key=lambda kv: kv[1], default=("-", 0))
+        lines.append(
+            f"  {entry['wall_ms']:10.1f} {entry['cpu_ms']:10.1f}  "
+            f"{entry['file']} [{top_phase[0]} {top_phase[1]:.1f}ms]"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,152 @@
+"""分析档位与时间预算
+
+不同调用方需要的分析深度不同：pre-commit 钩子要求亚秒级返回，夜间任务希望
+执行全部检查。AnalysisProfile 决定目录分析执行哪些阶段：
+
+    fast      只计算指标，用标准库 ast 解析（不构建 libcst 语法树）
+    standard  libcst 指标 + checker.py 的 Bug 扫描
+    deep      standard + 记号流重复检测、演化历史与跨文件索引
+
+TimeBudget 为整次运行设定截止时间：文件按风险与新近程度排序后依次放行，
+按已观测的每字节耗时估算下一个文件能否在截止前完成，放不下的文件记为未分析。
+"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from .discovery import EXCLUDED_DIRS, git_changed_files
+
+
+@dataclass(frozen=True)
+class AnalysisProfile:
+    """一个分析档位包含的阶段"""
+
+    name: str
+    fast_parser: bool = False
+    check_bugs: bool = False
+    duplicates: bool = False
+    evolution: bool = False
+    cross_file: bool = False
+    # 尚无观测时估算的每字节分析耗时（秒）
+    seconds_per_byte: float = 3e-5
+
+
+PROFILES: Dict[str, AnalysisProfile] = {
+    "fast": AnalysisProfile("fast", fast_parser=True, seconds_per_byte=2e-6),
+    "standard": AnalysisProfile("standard", check_bugs=True, seconds_per_byte=5e-5),
+    "deep": AnalysisProfile(
+        "deep",
+        check_bugs=True,
+        duplicates=True,
+        evolution=True,
+        cross_file=True,
+        seconds_per_byte=6e-5,
+    ),
+}
+
+
+def get_profile(profile: Union[str, AnalysisProfile]) -> AnalysisProfile:
+    """按名字取得档位；未知名字抛出 ValueError"""
+    if isinstance(profile, AnalysisProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"未知的分析档位: {profile}（可选 {', '.join(PROFILES)}）"
+        ) from None
+
+
+class TimeBudget:
+    """整次运行的时间预算
+
+    admits 按已完成文件的平均每字节耗时估算新文件的耗时，
+    只有预计能在截止时间前完成时才放行；尚无观测时使用档位的默认估算。
+    """
+
+    def __init__(self, seconds: float, seconds_per_byte: float = 3e-5):
+        if seconds <= 0:
+            raise ValueError("时间预算必须大于 0")
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self._default_rate = seconds_per_byte
+        self._bytes = 0
+        self._spent = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def estimate(self, size: int) -> float:
+        rate = self._spent / self._bytes if self._bytes else self._default_rate
+        return max(size, 1) * rate
+
+    def admits(self, size: int) -> bool:
+        return self.estimate(size) <= self.remaining()
+
+    def record(self, size: int, seconds: float) -> None:
+        self._bytes += max(size, 1)
+        self._spent += seconds
+
+
+def prioritize_files(
+    paths: Iterable[Path], root: Path, recursive: bool = True
+) -> List[Path]:
+    """按风险与新近程度排序，时间预算有限时先分析最值得看的文件
+
+    工作区中相对 HEAD 有改动（含未跟踪）的文件排在最前；其余文件按
+    修改时间与文件大小（代码越长风险越高）的百分位均值从高到低排列。
+    """
+    paths = list(paths)
+    changed: set = set()
+    try:
+        changes = git_changed_files(root, "HEAD", recursive, EXCLUDED_DIRS)
+        changed = {p.resolve() for p in changes.changed}
+    except ValueError:
+        pass
+
+    stats = {}
+    for path in paths:
+        try:
+            st = path.stat()
+            stats[path] = (st.st_mtime, st.st_size)
+        except OSError:
+            stats[path] = (0.0, 0)
+
+    def percentiles(index: int) -> Dict[Path, float]:
+        ordered = sorted(paths, key=lambda p: stats[p][index])
+        n = max(len(ordered) - 1, 1)
+        return {p: i / n for i, p in enumerate(ordered)}
+
+    recency = percentiles(0)
+    size = percentiles(1)
+    return sorted(
+        paths,
+        key=lambda p: (
+            p.resolve() not in changed,
+            -(recency[p] + size[p]) / 2,
+            str(p),
+        ),
+    )
+
+
+def file_size(path: Union[str, Path]) -> int:
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return 0
+
+
+def budget_for(
+    seconds: Optional[float], profile: Optional[AnalysisProfile]
+) -> Optional[TimeBudget]:
+    """按档位的默认耗时估算创建时间预算；seconds 为 None 时返回 None"""
+    if seconds is None:
+        return None
+    rate = profile.seconds_per_byte if profile is not None else 3e-5
+    return TimeBudget(seconds, rate)
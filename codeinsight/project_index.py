@@ -0,0 +1,475 @@
+"""项目级符号与导入索引
+
+目录分析时顺带记录每个模块定义的顶层名字、``__all__``、导入语句以及文件内
+未被引用的导入名，据此构建模块导入图。跨文件检查直接基于索引完成，无需重新解析：
+
+* 被其他模块 ``from m import x`` 使用、列在 ``__all__`` 中或以 ``import x as x``
+  形式显式重新导出的名字，不再视为未使用的导入（``--fix`` 也不会删除它们）；
+* 导入环检测。
+
+索引以 JSON 持久化，按 (mtime_ns, size) 判断文件是否变化，只重新解析变化的文件。
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import libcst as cst
+
+INDEX_VERSION = 1
+
+
+@dataclass
+class ModuleSymbols:
+    """单个模块在索引中的记录"""
+
+    path: str  # 相对项目根目录的 POSIX 路径
+    mtime_ns: int = 0
+    size: int = 0
+    defined: List[str] = field(default_factory=list)
+    all_names: Optional[List[str]] = None
+    # {"module": 模块名, "level": 相对导入层级, "names": [[名字, 别名], ...],
+    #  "lazy": 是否位于函数/类内部}；``import a.b`` 的 names 为空列表
+    imports: List[Dict[str, Any]] = field(default_factory=list)
+    explicit_reexports: List[str] = field(default_factory=list)
+    unused_imports: List[str] = field(default_factory=list)
+
+    @property
+    def module(self) -> str:
+        """点分模块名，pkg/__init__.py -> pkg，pkg/mod.py -> pkg.mod"""
+        parts = self.path[: -len(".py")].split("/")
+        if parts[-1] == "__init__":
+            parts.pop()
+        return ".".join(parts)
+
+    @property
+    def is_package(self) -> bool:
+        return self.path.endswith("/__init__.py") or self.path == "__init__.py"
+
+
+def _dotted(node: Optional[cst.BaseExpression]) -> str:
+    if node is None:
+        return ""
+    if isinstance(node, cst.Name):
+        return node.value
+    if isinstance(node, cst.Attribute):
+        return f"{_dotted(node.value)}.{node.attr.value}"
+    return ""
+
+
+def _string_items(node: cst.BaseExpression) -> Optional[List[str]]:
+    """字面量列表/元组中的字符串；含非字面量元素时返回 None"""
+    if not isinstance(node, (cst.List, cst.Tuple)):
+        return None
+    names = []
+    for element in node.elements:
+        value = element.value
+        if not isinstance(value, cst.SimpleString):
+            return None
+        names.append(value.evaluated_value)
+    return names
+
+
+def collect_symbols(tree: cst.Module) -> Dict[str, Any]:
+    """提取模块顶层的定义、``__all__`` 与全部导入语句（只遍历一次语法树）"""
+    defined: List[str] = []
+    all_names: Optional[List[str]] = None
+    imports: List[Dict[str, Any]] = []
+    reexports: List[str] = []
+
+    class _Collector(cst.CSTVisitor):
+        def __init__(self):
+            self.depth = 0
+
+        def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+            if self.depth == 0:
+                defined.append(node.name.value)
+            self.depth += 1
+            return True
+
+        def leave_FunctionDef(self, node: cst.FunctionDef) -> None:
+            self.depth -= 1
+
+        def visit_ClassDef(self, node: cst.ClassDef) -> bool:
+            if self.depth == 0:
+                defined.append(node.name.value)
+            self.depth += 1
+            return True
+
+        def leave_ClassDef(self, node: cst.ClassDef) -> None:
+            self.depth -= 1
+
+        def visit_Assign(self, node: cst.Assign) -> bool:
+            nonlocal all_names
+            if self.depth:
+                return False
+            for target in node.targets:
+                if isinstance(target.target, cst.Name):
+                    name = target.target.value
+                    defined.append(name)
+                    if name == "__all__":
+                        all_names = _string_items(node.value)
+            return False
+
+        def visit_AugAssign(self, node: cst.AugAssign) -> bool:
+            nonlocal all_names
+            # __all__ += [...]
+            if (
+                self.depth == 0
+                and isinstance(node.target, cst.Name)
+                and node.target.value == "__all__"
+                and all_names is not None
+            ):
+                extra = _string_items(node.value)
+                all_names = all_names + extra if extra is not None else None
+            return False
+
+        def visit_AnnAssign(self, node: cst.AnnAssign) -> bool:
+            if self.depth == 0 and isinstance(node.target, cst.Name):
+                defined.append(node.target.value)
+            return False
+
+        def visit_Import(self, node: cst.Import) -> bool:
+            for alias in node.names:
+                module = _dotted(alias.name)
+                imports.append(
+                    {"module": module, "level": 0, "names": [], "lazy": self.depth > 0}
+                )
+                asname = _dotted(alias.asname.name) if alias.asname else None
+                if asname is not None and asname == module:
+                    reexports.append(asname)
+                if self.depth == 0:
+                    defined.append(asname or module.split(".")[0])
+            return False
+
+        def visit_ImportFrom(self, node: cst.ImportFrom) -> bool:
+            names = []
+            if not isinstance(node.names, cst.ImportStar):
+                for alias in node.names:
+                    name = _dotted(alias.name)
+                    asname = _dotted(alias.asname.name) if alias.asname else None
+                    names.append([name, asname])
+                    if asname is not None and asname == name:
+                        reexports.append(asname)
+                    if self.depth == 0:
+                        defined.append(asname or name)
+            else:
+                names.append(["*", None])
+            imports.append(
+                {
+                    "module": _dotted(node.module),
+                    "level": len(node.relative),
+                    "names": names,
+                    "lazy": self.depth > 0,
+                }
+            )
+            return False
+
+    tree.visit(_Collector())
+    return {
+        "defined": list(dict.fromkeys(defined)),
+        "all_names": all_names,
+        "imports": imports,
+        "explicit_reexports": list(dict.fromkeys(reexports)),
+    }
+
+
+def _index_file(path: str) -> Tuple[Dict[str, Any], List[str]]:
+    """解析单个文件，返回 (符号, 文件内未使用的导入名)；可在工作进程中执行"""
+    from libcst.metadata import MetadataWrapper
+
+    from .analyzer import find_unused_imports
+    from .source_io import read_source
+
+    tree = cst.parse_module(read_source(path))
+    wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+    return collect_symbols(tree), find_unused_imports(wrapper)
+
+
+class ProjectIndex:
+    """项目级符号与导入索引，键为相对项目根目录的 POSIX 路径"""
+
+    def __init__(self):
+        self.modules: Dict[str, ModuleSymbols] = {}
+
+    # ---- 维护 ----
+
+    def update(
+        self,
+        rel_path: str,
+        symbols: Dict[str, Any],
+        unused_imports: List[str],
+        stat: Optional[os.stat_result] = None,
+    ) -> None:
+        """写入（或替换）一个模块的记录"""
+        self.modules[rel_path] = ModuleSymbols(
+            path=rel_path,
+            mtime_ns=stat.st_mtime_ns if stat else 0,
+            size=stat.st_size if stat else 0,
+            unused_imports=list(unused_imports),
+            **symbols,
+        )
+
+    def update_from_result(
+        self, root: Path, file: Union[str, Path], result: Dict[str, Any]
+    ) -> None:
+        """用目录分析的单文件结果（含 symbols 字段）更新索引"""
+        symbols = result.get("symbols")
+        rel = Path(file).relative_to(root).as_posix()
+        if symbols is None:
+            self.modules.pop(rel, None)
+            return
+        try:
+            stat = os.stat(file)
+        except OSError:
+            stat = None
+        self.update(rel, symbols, result.get("unused_imports", []), stat)
+
+    def retain(self, rel_paths: Iterable[str]) -> None:
+        """丢弃不在 rel_paths 中的模块（已删除的文件）"""
+        keep = set(rel_paths)
+        for rel in list(self.modules):
+            if rel not in keep:
+                del self.modules[rel]
+
+    def is_fresh(self, rel_path: str, stat: os.stat_result) -> bool:
+        entry = self.modules.get(rel_path)
+        return (
+            entry is not None
+            and entry.mtime_ns == stat.st_mtime_ns
+            and entry.size == stat.st_size
+        )
+
+    def refresh(
+        self, root: Union[str, Path], recursive: bool = True, workers: int = 1
+    ) -> List[str]:
+        """与目录同步：只重新解析新增或变化的文件，返回重新索引的相对路径"""
+        from .multi_file_analyzer import MultiFileAnalyzer
+
+        root = Path(root)
+        stale: List[Tuple[str, Path, os.stat_result]] = []
+        present = []
+        for path in MultiFileAnalyzer._find_python_files(root, recursive):
+            rel = path.relative_to(root).as_posix()
+            present.append(rel)
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if not self.is_fresh(rel, stat):
+                stale.append((rel, path, stat))
+        self.retain(present)
+
+        paths = [str(path) for _, path, _ in stale]
+        if workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                outputs = list(executor.map(_safe_index_file, paths))
+        else:
+            outputs = [_safe_index_file(p) for p in paths]
+
+        for (rel, _, stat), output in zip(stale, outputs):
+            if output is None:
+                # 无法解析的文件不进入索引
+                self.modules.pop(rel, None)
+                continue
+            self.update(rel, output[0], output[1], stat)
+        return [rel for rel, _, _ in stale]
+
+    # ---- 持久化 ----
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "modules": [asdict(m) for _, m in sorted(self.modules.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProjectIndex":
+        """从 to_dict 的结果恢复；版本不符时返回空索引"""
+        index = cls()
+        if data.get("version") != INDEX_VERSION:
+            return index
+        for entry in data.get("modules", []):
+            index.modules[entry["path"]] = ModuleSymbols(**entry)
+        return index
+
+    def merge(self, other: "ProjectIndex") -> None:
+        """合并另一份索引（如其他分片的索引），同一路径以 other 为准"""
+        self.modules.update(other.modules)
+
+    def save(self, path: Union[str, Path]) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ProjectIndex":
+        """读取索引；文件不存在、损坏或版本不符时返回空索引"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        return cls.from_dict(data)
+
+    # ---- 查询 ----
+
+    def _module_table(self) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+        """(完整模块名 -> 路径, 模块名后缀 -> 路径)；后缀不唯一时映射为 None
+
+        后缀表用于 src 布局等项目根目录不是导入根目录的情况。
+        """
+        exact = {m.module: rel for rel, m in self.modules.items()}
+        suffixes: Dict[str, Optional[str]] = {}
+        for name, rel in exact.items():
+            parts = name.split(".")
+            for i in range(1, len(parts)):
+                tail = ".".join(parts[i:])
+                suffixes[tail] = None if tail in suffixes else rel
+        return exact, suffixes
+
+    @staticmethod
+    def _absolute(entry: ModuleSymbols, imp: Dict[str, Any]) -> str:
+        """把相对导入解析为绝对模块名"""
+        if not imp["level"]:
+            return imp["module"]
+        package = entry.module.split(".") if entry.module else []
+        if not entry.is_package:
+            package = package[:-1]
+        if imp["level"] > 1:
+            package = package[: len(package) - (imp["level"] - 1)]
+        return ".".join(part for part in package + [imp["module"]] if part)
+
+    def _lookup(self, name: str, tables) -> Optional[str]:
+        exact, suffixes = tables
+        if name in exact:
+            return exact[name]
+        return suffixes.get(name)
+
+    def _resolved_imports(self, include_lazy: bool = True):
+        """逐条产出 (导入方路径, 被导入模块路径, 导入的名字列表)，只含项目内模块"""
+        tables = self._module_table()
+        for rel, entry in self.modules.items():
+            for imp in entry.imports:
+                if imp.get("lazy") and not include_lazy:
+                    continue
+                module = self._absolute(entry, imp)
+                if not imp["names"]:
+                    # import a.b.c：取项目内最具体的已知前缀
+                    parts = module.split(".")
+                    for i in range(len(parts), 0, -1):
+                        target = self._lookup(".".join(parts[:i]), tables)
+                        if target is not None:
+                            yield rel, target, []
+                            break
+                    continue
+                target = self._lookup(module, tables) if module else None
+                names = []
+                for name, _ in imp["names"]:
+                    # from pkg import sub：sub 是子模块时指向子模块
+                    sub = self._lookup(f"{module}.{name}" if module else name, tables)
+                    if sub is not None:
+                        yield rel, sub, []
+                    else:
+                        names.append(name)
+                if target is not None and names:
+                    yield rel, target, names
+
+    def import_graph(self, include_lazy: bool = False) -> Dict[str, Set[str]]:
+        """模块导入图：{模块名: 它导入的项目内模块名}
+
+        默认不含函数内的延迟导入——它们在导入期不会执行，不会形成导入环。
+        """
+        graph: Dict[str, Set[str]] = {m.module: set() for m in self.modules.values()}
+        for rel, target, _ in self._resolved_imports(include_lazy):
+            graph[self.modules[rel].module].add(self.modules[target].module)
+        return graph
+
+    def import_cycles(self) -> List[List[str]]:
+        """导入环（强连通分量，含自导入），每个环内按名字排序"""
+        graph = self.import_graph()
+        index_of: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        cycles: List[List[str]] = []
+        counter = 0
+
+        # 迭代式 Tarjan，避免大项目上的递归深度问题
+        for start in sorted(graph):
+            if start in index_of:
+                continue
+            work = [(start, iter(sorted(graph[start])))]
+            index_of[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                node, successors = work[-1]
+                advanced = False
+                for succ in successors:
+                    if succ not in index_of:
+                        index_of[succ] = low[succ] = counter
+                        counter += 1
+                        stack.append(succ)
+                        on_stack.add(succ)
+                        work.append((succ, iter(sorted(graph[succ]))))
+                        advanced = True
+                        break
+                    if succ in on_stack:
+                        low[node] = min(low[node], index_of[succ])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph[node]:
+                        cycles.append(sorted(component))
+        return sorted(cycles)
+
+    def reexported_names(self) -> Dict[str, Set[str]]:
+        """各模块中被视为对外导出的导入名：{路径: 名字集合}"""
+        exported: Dict[str, Set[str]] = {}
+        for rel, entry in self.modules.items():
+            names = set(entry.explicit_reexports)
+            if entry.all_names:
+                names.update(entry.all_names)
+            exported[rel] = names
+        for _, target, names in self._resolved_imports():
+            exported[target].update(names)
+            if "*" in names:
+                # from m import *：m 的全部公开名字都可能被使用
+                exported[target].update(
+                    n for n in self.modules[target].defined if not n.startswith("_")
+                )
+        return exported
+
+    def unused_imports(self) -> Dict[str, List[str]]:
+        """考虑跨文件重新导出后真正未使用的导入：{路径: 名字列表}"""
+        exported = self.reexported_names()
+        unused = {}
+        for rel, entry in sorted(self.modules.items()):
+            names = [n for n in entry.unused_imports if n not in exported[rel]]
+            if names:
+                unused[rel] = names
+        return unused
+
+
+def _safe_index_file(path: str) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+    try:
+        return _index_file(path)
+    except Exception:
+        return None
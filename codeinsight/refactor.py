@@ -1,12 +1,59 @@
 # codeinsight/refactor.py
+import difflib
+import os
+import shutil
+import tempfile
+import time
 import libcst as cst
-from typing import Union
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Collection, List, Optional, Set, Union
+
+if TYPE_CHECKING:
+    from .project_index import ProjectIndex
 
 
 class UnusedImportRemover(cst.CSTTransformer):
-    def __init__(self, unused_imports: set):
+    """移除未使用的导入
+
+    Args:
+        unused_imports: 未使用的导入名；未提供 aliases 时按名字匹配
+        aliases: CodeMetrics.unused_import_aliases 给出的 ImportAlias 节点；
+            提供时只删除这些节点（按节点身份），同名但仍被使用的导入不受影响。
+            节点必须来自被变换的同一棵语法树
+    """
+
+    def __init__(
+        self,
+        unused_imports: set,
+        aliases: Optional[Collection[cst.ImportAlias]] = None,
+    ):
         # 确保传入的是集合，并去掉两端空格
         self.unused_imports = {name.strip() for name in unused_imports}
+        # 保留节点引用，保证 id 在变换期间不被复用
+        self.aliases = None if aliases is None else list(aliases)
+        self._alias_ids = None if aliases is None else {id(a) for a in self.aliases}
+        # 实际移除的导入名（按出现顺序），供调用方增量更新指标
+        self.removed: List[str] = []
+
+    def _filter(self, original: cst.ImportAlias, updated: cst.ImportAlias) -> bool:
+        """返回 True 表示保留该导入别名"""
+        if self._alias_ids is None:
+            return not self._should_remove(updated)
+        if id(original) in self._alias_ids:
+            from .analyzer import bound_name
+
+            self.removed.append(bound_name(original))
+            return False
+        return True
+
+    def _kept(self, original_node, updated_node) -> list:
+        return [
+            updated
+            for original, updated in zip(original_node.names, updated_node.names)
+            if self._filter(original, updated)
+        ]
 
     def _should_remove(self, alias: cst.ImportAlias) -> bool:
         """
@@ -23,13 +70,16 @@ class UnusedImportRemover(cst.CSTTransformer):
             # 2. 如果没有别名，检查原始包名
             name_to_check = alias.name.value
 
-        return name_to_check in self.unused_imports
+        if name_to_check in self.unused_imports:
+            self.removed.append(name_to_check)
+            return True
+        return False
 
     def leave_Import(
         self, original_node: cst.Import, updated_node: cst.Import
     ) -> Union[cst.Import, cst.RemovalSentinel]:
         # 过滤掉所有被判定为“未使用”的子节点
-        new_names = [n for n in updated_node.names if not self._should_remove(n)]
+        new_names = self._kept(original_node, updated_node)
 
         # 如果这一行一个名字都不剩了，删除整行
         if not new_names:
@@ -44,7 +94,7 @@ class UnusedImportRemover(cst.CSTTransformer):
         if isinstance(updated_node.names, cst.ImportStar):
             return updated_node
 
-        new_names = [n for n in updated_node.names if not self._should_remove(n)]
+        new_names = self._kept(original_node, updated_node)
 
         if not new_names:
             return cst.RemoveFromParent()
@@ -59,3 +109,184 @@ class UnusedImportRemover(cst.CSTTransformer):
         # 关键：LibCST 的最后一个 ImportAlias 节点的 comma 必须为 None 或默认值
         new_list[-1] = new_list[-1].with_changes(comma=cst.MaybeSentinel.DEFAULT)
         return new_list
+
+
+@dataclass
+class FixResult:
+    """单个文件的修复结果"""
+
+    path: str
+    removed: List[str] = field(default_factory=list)
+    changed: bool = False
+    elapsed: float = 0.0
+    diff: str = ""
+    error: Optional[str] = None
+
+
+def atomic_write(path: Union[str, Path], content: Union[str, bytes]) -> None:
+    """原子写入：先写同目录临时文件，再 rename 覆盖目标，避免中断留下半个文件
+
+    content 为 bytes 时原样写入（保留原文件编码），为 str 时按 UTF-8 写入。
+    """
+    path = Path(path)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(
+        dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        shutil.copymode(str(path), tmp_path)
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def protected_imports(
+    tree: cst.Module, keep: Optional[Collection[str]] = None
+) -> Set[str]:
+    """不能删除的导入名：keep、列在 ``__all__`` 中的名字与 ``import x as x``"""
+    from .project_index import collect_symbols
+
+    protected = set(keep or ())
+    symbols = collect_symbols(tree)
+    protected.update(symbols["all_names"] or ())
+    protected.update(symbols["explicit_reexports"])
+    return protected
+
+
+def fix_file(
+    path: Union[str, Path],
+    dry_run: bool = False,
+    keep: Optional[Collection[str]] = None,
+) -> FixResult:
+    """分析单个文件并移除未使用导入，只有内容变化时才写回
+
+    列在 ``__all__`` 中或以 ``import x as x`` 显式重新导出的名字总会保留。
+
+    Args:
+        path: 文件路径
+        dry_run: 为 True 时不写文件，只生成 unified diff
+        keep: 额外需要保留的导入名（如被其他模块导入的名字）
+    """
+    from .analyzer import CodeMetrics, bound_name
+    from .source_io import read_source
+
+    start = time.perf_counter()
+    result = FixResult(path=str(path))
+    try:
+        data = read_source(path)
+        tree = cst.parse_module(data)
+        metrics = CodeMetrics()
+        unused = metrics.analyze(tree, data)["unused_imports"]
+        aliases = metrics.unused_import_aliases
+        if unused:
+            protected = protected_imports(tree, keep)
+            unused = [name for name in unused if name not in protected]
+            aliases = [a for a in aliases if bound_name(a) not in protected]
+        if unused:
+            fixer = UnusedImportRemover(set(unused), aliases)
+            new_tree = tree.visit(fixer)
+            new_code = new_tree.bytes
+            if new_code != data:
+                result.changed = True
+                result.removed = fixer.removed
+                if dry_run:
+                    result.diff = "".join(
+                        difflib.unified_diff(
+                            data.decode(tree.encoding).splitlines(keepends=True),
+                            new_tree.code.splitlines(keepends=True),
+                            fromfile=f"a/{path}",
+                            tofile=f"b/{path}",
+                        )
+                    )
+                else:
+                    atomic_write(path, new_code)
+    except Exception as e:
+        result.error = str(e)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def fix_directory(
+    directory: Union[str, Path],
+    recursive: bool = True,
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+    index: Optional["ProjectIndex"] = None,
+) -> List[FixResult]:
+    """并行修复目录下所有 Python 文件
+
+    先同步项目符号索引，被其他模块导入（重新导出）的名字不会被删除。
+
+    Args:
+        directory: 目录路径
+        recursive: 是否递归子目录
+        dry_run: 为 True 时不写文件，只生成 diff
+        workers: 工作进程数（None 为 CPU 核数，1 表示在当前进程内执行）
+        index: 项目符号索引（通常从磁盘加载），只重新解析变化的文件；
+            None 时新建
+    """
+    from .multi_file_analyzer import MultiFileAnalyzer
+    from .project_index import ProjectIndex
+
+    dir_path = Path(directory)
+    if not dir_path.is_dir():
+        raise ValueError(f"{directory} 不是有效的目录")
+    py_files = sorted(MultiFileAnalyzer._find_python_files(dir_path, recursive))
+
+    workers = workers or os.cpu_count() or 1
+    if index is None:
+        index = ProjectIndex()
+    index.refresh(dir_path, recursive, workers)
+    exported = index.reexported_names()
+    keeps = [
+        sorted(exported.get(p.relative_to(dir_path).as_posix(), ())) for p in py_files
+    ]
+
+    if workers == 1 or len(py_files) <= 1:
+        return [fix_file(p, dry_run, k) for p, k in zip(py_files, keeps)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(py_files) // (workers * 4))
+        return list(
+            executor.map(
+                fix_file,
+                py_files,
+                [dry_run] * len(py_files),
+                keeps,
+                chunksize=chunksize,
+            )
+        )
+
+
+def format_fix_summary(results: List[FixResult], max_files: int = 10) -> str:
+    """格式化批量修复汇总，包含最慢文件的耗时"""
+    changed = [r for r in results if r.changed]
+    failed = [r for r in results if r.error]
+    lines = []
+    lines.append("\n🛠️  批量修复汇总")
+    lines.append("-" * 40)
+    lines.append(f"  扫描文件数: {len(results)}")
+    lines.append(f"  修改文件数: {len(changed)}")
+    lines.append(f"  移除导入数: {sum(len(r.removed) for r in changed)}")
+    lines.append(f"  失败文件数: {len(failed)}")
+    lines.append(f"  总耗时: {sum(r.elapsed for r in results):.3f}s")
+
+    for r in changed:
+        lines.append(f"\n  ✅ {r.path}: {', '.join(r.removed)}")
+    for r in failed:
+        lines.append(f"\n  ❌ {r.path}: {r.error}")
+
+    slowest = sorted(results, key=lambda r: r.elapsed, reverse=True)[:max_files]
+    if slowest:
+        lines.append(f"\n⏱️  耗时最长的 {len(slowest)} 个文件:")
+        for r in slowest:
+            lines.append(f"  {r.elapsed * 1000:8.1f} ms  {r.path}")
+
+    return "\n".join(lines)
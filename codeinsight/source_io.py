@@ -0,0 +1,35 @@
+"""源码读取：以字节为单位读取文件，交给 libcst 按 PEP 263 编码声明解码"""
+
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Tuple, Union
+
+# 超过该大小的文件通过 mmap 读取
+MMAP_THRESHOLD = 1 << 20
+
+# 注释行：行首（忽略空白）以 # 开头，与 line.strip().startswith("#") 一致
+_COMMENT_LINE = re.compile(rb"^[ \t\f\v\r]*#", re.MULTILINE)
+_COMMENT_LINE_STR = re.compile(r"^[^\S\n]*#", re.MULTILINE)
+
+
+def read_source(path: Union[str, Path]) -> bytes:
+    """以字节读取源文件，不做解码；大文件使用 mmap"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            return f.read()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.read()
+
+
+def count_lines(source: Union[str, bytes]) -> Tuple[int, int]:
+    """统计 (行数, 注释行数)，不切分源码、不复制字符串
+
+    行数与 len(source.split("\\n")) 一致。
+    """
+    if isinstance(source, str):
+        return source.count("\n") + 1, len(_COMMENT_LINE_STR.findall(source))
+    return source.count(b"\n") + 1, len(_COMMENT_LINE.findall(source))
+
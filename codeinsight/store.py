@@ -0,0 +1,275 @@
+"""SQLite 指标库
+
+把目录分析报告（CodeMetrics / FunctionMetrics / ClassMetrics）写入本地 SQLite，
+并为常见问题建立索引，例如“全仓库最复杂的 100 个函数”、
+“某个包下没有文档字符串的类”，无需再加载并扫描整份 JSON 报告。
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    package TEXT NOT NULL,
+    quality_score REAL,
+    cyclomatic_complexity INTEGER,
+    function_count INTEGER,
+    class_count INTEGER,
+    max_nesting_depth INTEGER,
+    annotation_coverage REAL,
+    line_count INTEGER,
+    comment_count INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS functions (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    name TEXT NOT NULL,
+    line_start INTEGER,
+    line_end INTEGER,
+    lines INTEGER,
+    complexity INTEGER,
+    params_count INTEGER,
+    params_without_annotation INTEGER,
+    has_return_annotation INTEGER,
+    has_docstring INTEGER,
+    local_vars_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    name TEXT NOT NULL,
+    line_start INTEGER,
+    line_end INTEGER,
+    lines INTEGER,
+    methods_count INTEGER,
+    complexity INTEGER,
+    has_docstring INTEGER
+);
+CREATE TABLE IF NOT EXISTS unused_imports (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_package ON files(package);
+CREATE INDEX IF NOT EXISTS idx_files_score ON files(quality_score);
+CREATE INDEX IF NOT EXISTS idx_functions_complexity ON functions(complexity DESC);
+CREATE INDEX IF NOT EXISTS idx_functions_lines ON functions(lines DESC);
+CREATE INDEX IF NOT EXISTS idx_functions_file ON functions(file_id);
+CREATE INDEX IF NOT EXISTS idx_classes_docstring ON classes(has_docstring, file_id);
+CREATE INDEX IF NOT EXISTS idx_unused_imports_file ON unused_imports(file_id);
+"""
+
+FILE_COLUMNS = (
+    "quality_score",
+    "cyclomatic_complexity",
+    "function_count",
+    "class_count",
+    "max_nesting_depth",
+    "annotation_coverage",
+    "line_count",
+    "comment_count",
+)
+FUNCTION_COLUMNS = (
+    "name",
+    "line_start",
+    "line_end",
+    "complexity",
+    "params_count",
+    "params_without_annotation",
+    "has_return_annotation",
+    "has_docstring",
+    "local_vars_count",
+)
+CLASS_COLUMNS = (
+    "name",
+    "line_start",
+    "line_end",
+    "methods_count",
+    "complexity",
+    "has_docstring",
+)
+
+
+def _as_dict(obj: Any) -> Dict[str, Any]:
+    """dataclass 对象或从 JSON 读回的字典统一为字典"""
+    if hasattr(obj, "__dataclass_fields__"):
+        return obj.__dict__
+    return obj
+
+
+def package_of(rel_path: str) -> str:
+    """文件所在包的点分名，如 pkg/sub/mod.py -> pkg.sub；顶层文件为空字符串"""
+    parts = rel_path.split("/")[:-1]
+    return ".".join(parts)
+
+
+class MetricsStore:
+    """基于 SQLite 的指标库
+
+    Args:
+        path: 数据库文件路径，不存在时自动创建
+        read_only: 以只读方式打开已有的库，不建表，任何写入语句都会失败
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = str(path)
+        if read_only:
+            uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True)
+        else:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "MetricsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write_report(self, report: Dict[str, Any]) -> int:
+        """用一份目录分析报告替换库中的数据，返回写入的文件数
+
+        所有行在一个事务中通过 executemany 批量插入。
+        """
+        base = Path(report.get("directory", "."))
+        file_rows: List[Tuple] = []
+        function_rows: List[Tuple] = []
+        class_rows: List[Tuple] = []
+        import_rows: List[Tuple] = []
+
+        for file_id, (file, result) in enumerate(
+            sorted(report.get("files", {}).items()), start=1
+        ):
+            try:
+                rel = Path(file).relative_to(base).as_posix()
+            except ValueError:
+                rel = Path(file).as_posix()
+            file_rows.append(
+                (file_id, file, package_of(rel))
+                + tuple(result.get(c) for c in FILE_COLUMNS)
+                + (result.get("error"),)
+            )
+            for func in result.get("functions", []):
+                row = _as_dict(func)
+                function_rows.append(
+                    (file_id,)
+                    + tuple(row.get(c) for c in FUNCTION_COLUMNS)
+                    + (row["line_end"] - row["line_start"] + 1,)
+                )
+            for cls in result.get("classes", []):
+                row = _as_dict(cls)
+                class_rows.append(
+                    (file_id,)
+                    + tuple(row.get(c) for c in CLASS_COLUMNS)
+                    + (row["line_end"] - row["line_start"] + 1,)
+                )
+            for name in result.get("unused_imports", []):
+                import_rows.append((file_id, name))
+
+        with self.conn:
+            for table in ("unused_imports", "classes", "functions", "files"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self._insert(
+                "files",
+                ("id", "path", "package") + FILE_COLUMNS + ("error",),
+                file_rows,
+            )
+            self._insert(
+                "functions",
+                ("file_id",) + FUNCTION_COLUMNS + ("lines",),
+                function_rows,
+            )
+            self._insert(
+                "classes", ("file_id",) + CLASS_COLUMNS + ("lines",), class_rows
+            )
+            self._insert("unused_imports", ("file_id", "name"), import_rows)
+        return len(file_rows)
+
+    def _insert(self, table: str, columns: Tuple[str, ...], rows: Iterable[Tuple]):
+        placeholders = ", ".join("?" * len(columns))
+        self.conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            rows,
+        )
+
+    @staticmethod
+    def _package_filter(package: Optional[str]) -> Tuple[str, Tuple]:
+        """包及其子包的过滤条件；使用范围比较以便命中 package 索引"""
+        if not package:
+            return "1", ()
+        # '/' 是 '.' 之后的下一个字符，[X., X/) 恰好覆盖所有 X.* 子包
+        return (
+            "(f.package = ? OR (f.package >= ? AND f.package < ?))",
+            (package, package + ".", package + "/"),
+        )
+
+    def query(self, sql: str, params: Tuple = ()) -> Tuple[List[str], List[Tuple]]:
+        """执行任意只读 SQL，返回 (列名, 行)"""
+        cursor = self.conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description or ()]
+        return columns, cursor.fetchall()
+
+    def most_complex_functions(
+        self, limit: int = 100, package: Optional[str] = None
+    ) -> Tuple[List[str], List[Tuple]]:
+        """复杂度最高的函数"""
+        where, params = self._package_filter(package)
+        return self.query(
+            "SELECT f.path, fn.name, fn.line_start, fn.complexity, fn.lines "
+            "FROM functions fn JOIN files f ON f.id = fn.file_id "
+            f"WHERE {where} ORDER BY fn.complexity DESC, fn.lines DESC LIMIT ?",
+            params + (limit,),
+        )
+
+    def longest_functions(
+        self, limit: int = 100, package: Optional[str] = None
+    ) -> Tuple[List[str], List[Tuple]]:
+        """行数最多的函数"""
+        where, params = self._package_filter(package)
+        return self.query(
+            "SELECT f.path, fn.name, fn.line_start, fn.lines, fn.complexity "
+            "FROM functions fn JOIN files f ON f.id = fn.file_id "
+            f"WHERE {where} ORDER BY fn.lines DESC, fn.complexity DESC LIMIT ?",
+            params + (limit,),
+        )
+
+    def undocumented_classes(
+        self, limit: int = 100, package: Optional[str] = None
+    ) -> Tuple[List[str], List[Tuple]]:
+        """没有文档字符串的类"""
+        where, params = self._package_filter(package)
+        return self.query(
+            "SELECT f.path, c.name, c.line_start, c.methods_count "
+            "FROM classes c JOIN files f ON f.id = c.file_id "
+            f"WHERE c.has_docstring = 0 AND {where} ORDER BY f.path, c.line_start "
+            "LIMIT ?",
+            params + (limit,),
+        )
+
+    def worst_files(
+        self, limit: int = 100, package: Optional[str] = None
+    ) -> Tuple[List[str], List[Tuple]]:
+        """质量评分最低的文件"""
+        where, params = self._package_filter(package)
+        return self.query(
+            "SELECT f.path, f.quality_score, f.function_count, f.line_count "
+            "FROM files f "
+            f"WHERE f.error IS NULL AND {where} "
+            "ORDER BY f.quality_score, f.path LIMIT ?",
+            params + (limit,),
+        )
+
+
+# query 子命令支持的预置问题
+QUERIES = {
+    "complex-functions": MetricsStore.most_complex_functions,
+    "long-functions": MetricsStore.longest_functions,
+    "undocumented-classes": MetricsStore.undocumented_classes,
+    "worst-files": MetricsStore.worst_files,
+}
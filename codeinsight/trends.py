@@ -0,0 +1,308 @@
+"""演化历史的趋势统计
+
+把 EvolutionAnalyzer 产出的逐提交记录载入 NumPy 数组，以向量化方式计算
+移动平均、评分变点、按作者与按周的聚合以及线性回归斜率，
+结果可导出为紧凑的 JSON（按列存储）或 CSV。
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+# Unix 纪元是周四，偏移 3 天使周桶从周一开始
+_WEEK_OFFSET = 3 * SECONDS_PER_DAY
+
+TABLES = ("series", "authors", "weeks")
+
+
+def _encode(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """把字符串序列编码为 (类别表, int 编码数组)"""
+    labels, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+    return labels.tolist(), codes.astype(np.int64).reshape(-1)
+
+
+@dataclass
+class HistoryArrays:
+    """按提交时间排序的演化历史，每列一个数组"""
+
+    timestamps: np.ndarray  # int64，秒
+    scores: np.ndarray  # float64
+    complexity: np.ndarray  # float64
+    commits: List[str]
+    author_names: List[str]
+    authors: np.ndarray  # author_names 的下标
+    file_names: List[str]
+    files: np.ndarray  # file_names 的下标
+
+    @classmethod
+    def from_history(cls, history: Sequence[Dict[str, Any]]) -> "HistoryArrays":
+        """由 analyze_history / analyze_files 的记录构建；记录缺少时间戳时按日期计算"""
+        timestamps = np.array(
+            [
+                entry["timestamp"]
+                if "timestamp" in entry
+                else int(
+                    datetime.strptime(entry["date"], "%Y-%m-%d")
+                    .replace(tzinfo=timezone.utc)
+                    .timestamp()
+                )
+                for entry in history
+            ],
+            dtype=np.int64,
+        )
+        order = np.argsort(timestamps, kind="stable")
+        ordered = [history[i] for i in order]
+        author_names, authors = _encode([e.get("author", "") for e in ordered])
+        file_names, files = _encode([e.get("file", "") for e in ordered])
+        return cls(
+            timestamps=timestamps[order],
+            scores=np.array([e["score"] for e in ordered], dtype=np.float64),
+            complexity=np.array([e["complexity"] for e in ordered], dtype=np.float64),
+            commits=[e["commit"] for e in ordered],
+            author_names=author_names,
+            authors=authors,
+            file_names=file_names,
+            files=files,
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def score_deltas(self) -> np.ndarray:
+        """每条记录相对同一文件上一版本的评分变化，文件的首个版本记为 0"""
+        n = len(self)
+        deltas = np.zeros(n, dtype=np.float64)
+        if n < 2:
+            return deltas
+        # 先按文件、再按时间排序，相邻且同文件的记录之差即为变化量
+        order = np.lexsort((np.arange(n), self.files))
+        diffs = np.diff(self.scores[order])
+        same_file = self.files[order][1:] == self.files[order][:-1]
+        deltas[order[1:]] = np.where(same_file, diffs, 0.0)
+        return deltas
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """尾随窗口移动平均，前 window-1 个位置取已有数据的平均"""
+    if window < 1:
+        raise ValueError("窗口大小必须大于 0")
+    values = np.asarray(values, dtype=np.float64)
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (cumsum[end] - cumsum[start]) / (end - start)
+
+
+def _best_split(
+    cumsum: np.ndarray, lo: int, hi: int, min_size: int
+) -> Tuple[int, float]:
+    """区间 [lo, hi) 内均值漂移的最佳切分点及其平方误差下降量"""
+    n = hi - lo
+    splits = np.arange(lo + min_size, hi - min_size + 1)
+    if len(splits) == 0:
+        return -1, 0.0
+    total = cumsum[hi] - cumsum[lo]
+    left = cumsum[splits] - cumsum[lo]
+    k = splits - lo
+    gain = left**2 / k + (total - left) ** 2 / (n - k) - total**2 / n
+    best = int(np.argmax(gain))
+    return int(splits[best]), float(gain[best])
+
+
+def change_points(
+    values: np.ndarray, min_size: int = 3, penalty: float = 3.0
+) -> List[int]:
+    """二分切分检测均值变点，返回新分段起点的下标（升序）
+
+    每次切分带来的平方误差下降量须超过 penalty * 方差 * ln(n)，
+    即 BIC 风格的惩罚；各候选切分点的误差下降量由前缀和一次向量化算出。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < 2 * min_size:
+        return []
+    variance = float(np.var(values))
+    if variance == 0.0:
+        return []
+    threshold = penalty * variance * np.log(n)
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+
+    points = []
+    stack = [(0, n)]
+    while stack:
+        lo, hi = stack.pop()
+        split, gain = _best_split(cumsum, lo, hi, min_size)
+        if split < 0 or gain <= threshold:
+            continue
+        points.append(split)
+        stack.append((lo, split))
+        stack.append((split, hi))
+    return sorted(points)
+
+
+def regression_slope(x: np.ndarray, y: np.ndarray) -> float:
+    """最小二乘直线斜率；x 无变化时为 0"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) < 2:
+        return 0.0
+    dx = x - x.mean()
+    denominator = float(np.dot(dx, dx))
+    if denominator == 0.0:
+        return 0.0
+    return float(np.dot(dx, y - y.mean()) / denominator)
+
+
+def group_stats(
+    codes: np.ndarray, values: np.ndarray, groups: int
+) -> Dict[str, np.ndarray]:
+    """按整数编码分组，返回每组的 count / mean / min / max"""
+    count = np.bincount(codes, minlength=groups)
+    total = np.bincount(codes, weights=values, minlength=groups)
+    minimum = np.full(groups, np.inf)
+    maximum = np.full(groups, -np.inf)
+    np.minimum.at(minimum, codes, values)
+    np.maximum.at(maximum, codes, values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    return {"count": count, "mean": mean, "min": minimum, "max": maximum}
+
+
+@dataclass
+class TrendReport:
+    """趋势统计结果，三张按列存储的表加上整体指标"""
+
+    series: Dict[str, list]
+    authors: Dict[str, list]
+    weeks: Dict[str, list]
+    change_points: List[Dict[str, Any]] = field(default_factory=list)
+    slope_per_week: float = 0.0
+    complexity_slope_per_week: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "slope_per_week": self.slope_per_week,
+            "complexity_slope_per_week": self.complexity_slope_per_week,
+            "change_points": self.change_points,
+            "series": self.series,
+            "authors": self.authors,
+            "weeks": self.weeks,
+        }
+
+    def to_json(self, writer: IO[str]) -> None:
+        """写出紧凑 JSON：表按列存储，无缩进"""
+        json.dump(self.to_dict(), writer, ensure_ascii=False, separators=(",", ":"))
+
+    def to_csv(self, writer: IO[str], table: str = "series") -> int:
+        """把一张表写为 CSV，返回数据行数"""
+        if table not in TABLES:
+            raise ValueError(f"未知的表: {table}（可选 {', '.join(TABLES)}）")
+        columns = getattr(self, table)
+        out = csv.writer(writer, lineterminator="\n")
+        out.writerow(list(columns))
+        rows = list(zip(*columns.values()))
+        out.writerows(rows)
+        return len(rows)
+
+
+def _round(values: np.ndarray, digits: int = 3) -> list:
+    return np.round(values, digits).tolist()
+
+
+def analyze_trends(
+    history: Sequence[Dict[str, Any]],
+    window: int = 5,
+    min_segment: int = 3,
+    penalty: float = 3.0,
+) -> TrendReport:
+    """计算演化历史的趋势统计
+
+    Args:
+        history: EvolutionAnalyzer.analyze_history / analyze_files 的记录
+        window: 移动平均窗口（按记录数）
+        min_segment: 变点检测的最小分段长度
+        penalty: 变点检测的惩罚系数，越大检出越少
+    """
+    data = HistoryArrays.from_history(history)
+    deltas = data.score_deltas()
+    weeks_since_epoch = (data.timestamps + _WEEK_OFFSET) // SECONDS_PER_WEEK
+    elapsed_weeks = (data.timestamps - data.timestamps[:1].sum()) / SECONDS_PER_WEEK
+
+    series = {
+        "commit": data.commits,
+        "date": [
+            datetime.fromtimestamp(int(ts), tz=timezone.utc).strftime("%Y-%m-%d")
+            for ts in data.timestamps
+        ],
+        "author": [data.author_names[i] for i in data.authors],
+        "file": [data.file_names[i] for i in data.files],
+        "score": _round(data.scores),
+        "score_delta": _round(deltas),
+        "score_ma": _round(moving_average(data.scores, window)),
+        "complexity": _round(data.complexity),
+        "complexity_ma": _round(moving_average(data.complexity, window)),
+    }
+
+    by_author = group_stats(data.authors, data.scores, len(data.author_names))
+    author_delta = np.bincount(
+        data.authors, weights=deltas, minlength=len(data.author_names)
+    )
+    authors = {
+        "author": data.author_names,
+        "commits": by_author["count"].tolist(),
+        "mean_score": _round(by_author["mean"]),
+        "min_score": _round(by_author["min"]),
+        "max_score": _round(by_author["max"]),
+        "score_delta": _round(author_delta),
+    }
+
+    week_labels, week_codes = np.unique(weeks_since_epoch, return_inverse=True)
+    by_week = group_stats(week_codes, data.scores, len(week_labels))
+    week_complexity = group_stats(week_codes, data.complexity, len(week_labels))
+    weeks = {
+        "week": [
+            datetime.fromtimestamp(
+                int(week) * SECONDS_PER_WEEK - _WEEK_OFFSET, tz=timezone.utc
+            ).strftime("%Y-%m-%d")
+            for week in week_labels
+        ],
+        "commits": by_week["count"].tolist(),
+        "mean_score": _round(by_week["mean"]),
+        "min_score": _round(by_week["min"]),
+        "max_score": _round(by_week["max"]),
+        "mean_complexity": _round(week_complexity["mean"]),
+    }
+
+    points = change_points(data.scores, min_size=min_segment, penalty=penalty)
+    bounds = np.array([0] + points + [len(data)])
+    # 各分段均值同样由前缀和得到
+    cumsum = np.concatenate(([0.0], np.cumsum(data.scores)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        segment_means = np.diff(cumsum[bounds]) / np.diff(bounds)
+    change = [
+        {
+            "index": index,
+            "commit": data.commits[index],
+            "date": series["date"][index],
+            "before": round(float(segment_means[i]), 3),
+            "after": round(float(segment_means[i + 1]), 3),
+        }
+        for i, index in enumerate(points)
+    ]
+
+    return TrendReport(
+        series=series,
+        authors=authors,
+        weeks=weeks,
+        change_points=change,
+        slope_per_week=round(regression_slope(elapsed_weeks, data.scores), 4),
+        complexity_slope_per_week=round(
+            regression_slope(elapsed_weeks, data.complexity), 4
+        ),
+    )
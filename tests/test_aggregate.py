@@ -0,0 +1,102 @@
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from codeinsight.aggregate import KLLSketch, ProjectAggregator
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+
+
+class TestKLLSketch(unittest.TestCase):
+    """测试 KLL 分位数草图"""
+
+    def test_exact_when_small(self):
+        sketch = KLLSketch(k=200)
+        for value in range(1, 101):
+            sketch.add(value)
+        self.assertEqual(sketch.quantile(0.5), 50)
+        self.assertEqual(sketch.quantile(0.99), 99)
+
+    def test_rank_error_bounded_and_memory_sublinear(self):
+        rng = random.Random(7)
+        values = [rng.random() for _ in range(50000)]
+        sketch = KLLSketch(k=200)
+        for value in values:
+            sketch.add(value)
+        self.assertLess(sum(len(level) for level in sketch.levels), 1000)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            rank = ordered.index(sketch.quantile(q)) / len(ordered)
+            self.assertAlmostEqual(rank, q, delta=0.02)
+
+    def test_merge_matches_single_stream(self):
+        rng = random.Random(11)
+        values = [rng.randint(0, 1000) for _ in range(20000)]
+        parts = [KLLSketch() for _ in range(4)]
+        for i, value in enumerate(values):
+            parts[i % 4].add(value)
+        merged = KLLSketch.from_dict(json.loads(json.dumps(parts[0].to_dict())))
+        for part in parts[1:]:
+            merged.merge(part)
+
+        self.assertEqual(merged.count, len(values))
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            expected = ordered[int(q * len(ordered))]
+            self.assertLess(abs(merged.quantile(q) - expected), 30)
+
+
+class TestProjectAggregator(unittest.TestCase):
+    """测试项目级流式汇总"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for i in range(9):
+            body = "".join(f"def f{j}(x):\n    return x\n\n\n" for j in range(i))
+            (self.root / f"m{i}.py").write_text(body, encoding="utf-8")
+        self.analyzer = MultiFileAnalyzer()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_summary_only_matches_full_report(self):
+        full = self.analyzer.analyze_directory(str(self.root))
+        streamed = self.analyzer.analyze_directory(str(self.root), summary_only=True)
+        self.assertEqual(streamed["files"], {})
+        self.assertEqual(streamed["summary"], full["summary"])
+        self.assertEqual(
+            full["summary"]["percentiles"]["file_score"]["p50"],
+            sorted(r["quality_score"] for r in full["files"].values())[4],
+        )
+
+    def test_summary_only_shards_merge(self):
+        full = self.analyzer.analyze_directory(str(self.root))
+        parts = [
+            json.loads(
+                json.dumps(
+                    self.analyzer.analyze_directory(
+                        str(self.root), shard=(i, 2), summary_only=True
+                    )
+                )
+            )
+            for i in range(2)
+        ]
+        merged = self.analyzer.merge_reports(parts)
+        self.assertEqual(merged["summary"], full["summary"])
+        self.assertEqual(merged["total_files"], 9)
+
+    def test_roundtrip_and_error_counting(self):
+        aggregator = ProjectAggregator()
+        aggregator.add("a.py", {"error": "语法错误"})
+        aggregator.add("b.py", {"quality_score": 80, "functions": []})
+        restored = ProjectAggregator.from_dict(
+            json.loads(json.dumps(aggregator.to_dict()))
+        )
+        self.assertEqual(restored.errors, 1)
+        self.assertEqual(restored.summary()["worst_file"], "b.py")
+
+
+if __name__ == "__main__":
+    unittest.main()
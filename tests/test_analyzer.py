@@ -19,6 +19,97 @@ class TestAnalyzer(unittest.TestCase):
         result = metrics.analyze(tree)
         self.assertEqual(result["cyclomatic_complexity"], 2)
 
+    def test_unused_import_hidden_by_local(self):
+        code = "import json\n\ndef f():\n    json = 1\n    return json\n"
+        tree = cst.parse_module(code)
+        result = CodeMetrics().analyze(tree, code)
+        self.assertEqual(result["unused_imports"], ["json"])
+
+    def test_unused_import_alias(self):
+        code = "import os.path\nimport sys as s\nprint(os.path.sep)\n"
+        tree = cst.parse_module(code)
+        result = CodeMetrics().analyze(tree, code)
+        self.assertEqual(result["unused_imports"], ["s"])
+
+    def test_incremental_matches_full_analysis(self):
+        code = (
+            "import os\n"
+            "from typing import List\n"
+            "import json\n"
+            "\n"
+            "def f(x: 'List[int]') -> int:\n"
+            "    import sys\n"
+            "    if x:\n"
+            "        return os.getpid()\n"
+            "    return 0\n"
+            "\n"
+            "class C:\n"
+            "    def g(self):\n"
+            "        for i in range(3):\n"
+            "            pass\n"
+        )
+        tree = cst.parse_module(code)
+        full = CodeMetrics().analyze(tree, code)
+        incremental = CodeMetrics().analyze_incremental(tree, code)
+        self.assertEqual(incremental, full)
+        self.assertEqual(incremental["unused_imports"], ["json", "sys"])
+
+    def test_incremental_recomputes_changed_statements_only(self):
+        metrics = CodeMetrics()
+        code = "import os\n\ndef f():\n    pass\n\ndef g():\n    pass\n"
+        result = metrics.analyze_incremental(cst.parse_module(code), code)
+        self.assertEqual(metrics.reused_statements, 0)
+        self.assertEqual(result["unused_imports"], ["os"])
+
+        # 只改 g：import 与 f 复用缓存，但 os 的使用情况跨语句重新汇总
+        code = code.replace("def g():\n    pass", "def g():\n    return os.sep")
+        tree = cst.parse_module(code)
+        result = metrics.analyze_incremental(tree, code)
+        self.assertEqual(metrics.reused_statements, 2)
+        self.assertEqual(result["unused_imports"], [])
+        self.assertEqual(result, CodeMetrics().analyze(tree, code))
+
+    def test_function_complexity_and_spans(self):
+        code = (
+            "def f(x):\n"
+            "    if x:\n"
+            "        for i in x:\n"
+            "            pass\n"
+            "    return x\n"
+            "\n"
+            "class C:\n"
+            "    @property\n"
+            "    def g(self):\n"
+            "        while self:\n"
+            "            pass\n"
+            "\n"
+            "    def h(self):\n"
+            "        def inner():\n"
+            "            pass\n"
+        )
+        result = CodeMetrics().analyze(cst.parse_module(code), code)
+        spans = {f.name: (f.line_start, f.line_end, f.complexity) for f in result["functions"]}
+        self.assertEqual(spans["f"], (1, 5, 3))
+        self.assertEqual(spans["g"], (9, 11, 2))
+        self.assertEqual(spans["inner"], (14, 15, 1))
+        cls = result["classes"][0]
+        self.assertEqual((cls.line_start, cls.line_end), (7, 15))
+        self.assertEqual((cls.methods_count, cls.complexity), (2, 2))
+
+    def test_incremental_shifts_spans_of_reused_statements(self):
+        metrics = CodeMetrics()
+        code = "import os\n\ndef f():\n    pass\n\ndef g():\n    if os:\n        pass\n"
+        metrics.analyze_incremental(cst.parse_module(code), code)
+
+        # f 之前插入两行：g 被复用，但行号需随位置平移
+        code = code.replace("import os\n", "import os\nimport sys\nsys.exit\n")
+        tree = cst.parse_module(code)
+        result = metrics.analyze_incremental(tree, code)
+        self.assertGreater(metrics.reused_statements, 0)
+        g = [f for f in result["functions"] if f.name == "g"][0]
+        self.assertEqual((g.line_start, g.line_end, g.complexity), (8, 10, 2))
+        self.assertEqual(result, CodeMetrics().analyze(tree, code))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import libcst as cst
+from codeinsight.checker import (
+    BugRule,
+    RuleRegistry,
+    BugPatternScanner,
+    TriggerIndex,
+    check_logic_bugs,
+    scan_source,
+    DEFAULT_REGISTRY,
+)
+
+
+class TestCheckLogicBugs(unittest.TestCase):
+    """测试默认规则集"""
+
+    def test_mutable_default(self):
+        tree = cst.parse_module("def f(a=[]):\n    pass\n")
+        findings = check_logic_bugs(tree)
+        self.assertEqual(len(findings), 1)
+        self.assertIn("'a'", findings[0])
+
+    def test_eval_and_shell(self):
+        code = "eval('1')\nsubprocess.run('ls', shell=True)\n"
+        findings = check_logic_bugs(cst.parse_module(code))
+        self.assertEqual(len(findings), 2)
+
+    def test_disabled_rule(self):
+        tree = cst.parse_module("eval('1')\n")
+        findings = check_logic_bugs(tree, disabled=["dangerous-call"])
+        self.assertEqual(findings, [])
+
+    def test_shadowed_import(self):
+        code = "import json\n\ndef f():\n    json = 1\n    return json\n"
+        findings = check_logic_bugs(cst.parse_module(code))
+        self.assertEqual(len(findings), 1)
+        self.assertIn("json", findings[0])
+
+    def test_shared_wrapper(self):
+        from libcst.metadata import MetadataWrapper, ScopeProvider
+
+        wrapper = MetadataWrapper(cst.parse_module("import os\n"))
+        check_logic_bugs(wrapper)
+        scopes = wrapper.resolve(ScopeProvider)
+        self.assertIs(wrapper.resolve(ScopeProvider), scopes)
+
+    def test_unknown_rule(self):
+        tree = cst.parse_module("x = 1\n")
+        with self.assertRaises(ValueError):
+            check_logic_bugs(tree, enabled=["no-such-rule"])
+
+
+class TestRuleRegistry(unittest.TestCase):
+    """测试规则注册与分派"""
+
+    def test_dispatch_only_declared_nodes(self):
+        registry = RuleRegistry()
+        seen = []
+
+        @registry.register
+        class NameRule(BugRule):
+            name = "name-rule"
+            node_types = (cst.Name,)
+
+            def check(self, node):
+                seen.append(type(node))
+                return []
+
+        tree = cst.parse_module("x = y + 1\n")
+        tree.visit(BugPatternScanner(registry=registry))
+        self.assertEqual(seen, [cst.Name, cst.Name])
+        self.assertIn("name-rule", registry.timing_report())
+
+    def test_duplicate_registration(self):
+        registry = RuleRegistry()
+
+        class Rule(BugRule):
+            name = "dup"
+
+            def check(self, node):
+                return []
+
+        registry.register(Rule)
+        with self.assertRaises(ValueError):
+            registry.register(Rule)
+
+    def test_rule_without_check_rejected(self):
+        class Incomplete(BugRule):
+            name = "incomplete"
+            node_types = (cst.Name,)
+
+        with self.assertRaises(ValueError):
+            RuleRegistry().register(Incomplete)
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_default_rules_registered(self):
+        self.assertIn("mutable-default", DEFAULT_REGISTRY.rules)
+        self.assertIn("subprocess-shell", DEFAULT_REGISTRY.rules)
+
+
+class TestTriggerPrefilter(unittest.TestCase):
+    """测试触发词预过滤"""
+
+    def test_trigger_index_overlapping(self):
+        index = TriggerIndex([b"abc", b"bcd", b"b"])
+        self.assertEqual(index.scan(b"xabcdx"), {b"abc", b"bcd", b"b"})
+        self.assertEqual(index.scan(b"xyz"), set())
+
+    def test_skip_parse_without_triggers(self):
+        # 语法错误的源码在没有任何触发词时不会被解析
+        self.assertEqual(scan_source(b"x = = 1\n"), [])
+
+    def test_scan_source_with_triggers(self):
+        findings = scan_source(b"exec('x')\n")
+        self.assertEqual(len(findings), 1)
+
+    def test_applicable_rules(self):
+        rules = DEFAULT_REGISTRY.select()
+        names = [r.name for r in DEFAULT_REGISTRY.applicable(rules, "eval(x)\n")]
+        self.assertEqual(names, ["dangerous-call"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from codeinsight.chunked_report import ChunkedReport, export_chunked
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer, ReportExporter
+
+
+class TestChunkedReport(unittest.TestCase):
+    """测试分块报告的导出与按需读取"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "src"
+        (self.root / "pkg" / "sub").mkdir(parents=True)
+        for i in range(3):
+            (self.root / "pkg" / f"m{i}.py").write_text(f"import os\nx = {i}\n")
+        (self.root / "pkg" / "sub" / "deep.py").write_text("def f():\n    return 1\n")
+        (self.root / "top.py").write_text("y = 1\n")
+        self.report = MultiFileAnalyzer().analyze_directory(str(self.root))
+        self.out = Path(self.tmp.name) / "report"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        stats = export_chunked(self.report, self.out, chunk_size=2)
+        # pkg 下 3 个文件切成 2 块，pkg/sub 与根目录各 1 块
+        self.assertEqual((stats.chunks, stats.written), (4, 4))
+        self.assertTrue((self.out / "viewer.html").is_file())
+        expected = json.loads(json.dumps(self.report, default=lambda o: o.__dict__))
+        self.assertEqual(ReportExporter.load_json(str(self.out)), expected)
+
+    def test_rollups_and_partial_load(self):
+        export_chunked(self.report, self.out, chunk_size=2)
+        report = ChunkedReport(self.out)
+        pkg = report.directories["pkg"]
+        self.assertEqual(pkg["files"], 3)
+        self.assertEqual(len(pkg["chunks"]), 2)
+        self.assertEqual(pkg["subtree"]["files"], 4)
+        self.assertEqual(report.directories[""]["subtree"]["files"], 5)
+        self.assertNotIn("files", report.index)
+
+        files = report.files_in("pkg/sub")
+        self.assertEqual(list(files), [str(self.root / "pkg" / "sub" / "deep.py")])
+
+    def test_rerun_rewrites_only_changed_chunks(self):
+        export_chunked(self.report, self.out, chunk_size=2)
+        stats = export_chunked(self.report, self.out, chunk_size=2)
+        self.assertEqual((stats.written, stats.unchanged, stats.removed), (0, 4, 0))
+
+        (self.root / "pkg" / "sub" / "deep.py").write_text("import sys\n")
+        report = MultiFileAnalyzer().analyze_directory(str(self.root))
+        stats = export_chunked(report, self.out, chunk_size=2)
+        self.assertEqual((stats.written, stats.unchanged, stats.removed), (1, 3, 1))
+        self.assertEqual(len(list((self.out / "chunks").glob("*.json"))), 4)
+        deep = ChunkedReport(self.out).files_in("pkg/sub")
+        self.assertEqual(list(deep.values())[0]["unused_imports"], ["sys"])
+
+    def test_rejects_other_directories(self):
+        self.out.mkdir()
+        (self.out / "index.json").write_text("{}")
+        with self.assertRaises(ValueError):
+            ChunkedReport(self.out)
+
+
+if __name__ == "__main__":
+    unittest.main()
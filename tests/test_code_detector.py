@@ -2,6 +2,7 @@ import unittest
 import libcst as cst
 from codeinsight.code_detector import (
     CodeDuplicateDetector,
+    TokenDuplicateDetector,
     ASTBasedDuplicateDetector,
     format_duplicate_report,
     CodeBlock,
@@ -205,6 +206,72 @@ def func2():
         self.assertGreater(report.similar_duplicates, 0)
 
 
+class TestTokenDuplicateDetector(unittest.TestCase):
+    """测试基于记号流的重复检测器"""
+
+    CODE = '''def func1():
+    """一行文档字符串"""
+    x = 1  # 行尾注释
+    y = 2
+    z = x + y
+    return z
+
+
+def func2():
+    # 不同的注释
+    x = 1
+    y = 2
+    z = x + y
+    return z
+
+
+def func3():
+    a = 10
+    b = 20
+    c = a + b
+    return c
+'''
+
+    def test_exact_ignores_comments_and_docstrings(self):
+        detector = TokenDuplicateDetector(
+            min_block_size=3, normalize_identifiers=False, normalize_literals=False
+        )
+        report = detector.detect(self.CODE)
+        self.assertEqual(report.exact_duplicates, 1)
+        pair = report.duplicate_pairs[0]
+        self.assertEqual((pair.block1.start_line, pair.block1.end_line), (3, 6))
+        self.assertEqual((pair.block2.start_line, pair.block2.end_line), (11, 14))
+        self.assertEqual(report.similar_duplicates, 0)
+
+    def test_normalized_identifiers_and_literals(self):
+        report = TokenDuplicateDetector(min_block_size=4).detect(self.CODE)
+        starts = {
+            (p.block1.start_line, p.block2.start_line) for p in report.duplicate_pairs
+        }
+        # func3 只改了变量名和常量，归一化后与 func1 相同
+        self.assertIn((1, 17), starts)
+        similar = [p for p in report.duplicate_pairs if p.type == "similar"]
+        self.assertTrue(all(p.similarity < 1 for p in similar))
+
+    def test_one_line_docstring_does_not_hide_code(self):
+        code = 'def f():\n    """doc"""\n    return 1\n'
+        detector = CodeDuplicateDetector(min_block_size=1)
+        self.assertIn("    return 1", detector._remove_comments(code.split("\n")))
+
+    def test_source_libcst_cannot_parse(self):
+        body = 'print "a"\nprint "b"\nexec "c"\n'
+        source = ("# -*- coding: latin-1 -*-\n" + body + "\n" + body).encode("latin-1")
+        with self.assertRaises(Exception):
+            cst.parse_module(source)
+        report = TokenDuplicateDetector(min_block_size=3).detect(source)
+        self.assertEqual(report.exact_duplicates, 1)
+
+    def test_truncated_token_stream(self):
+        source = "x = 1\ny = 2\nz = 3\n" * 2 + 's = """unterminated\n'
+        report = TokenDuplicateDetector(min_block_size=3).detect(source)
+        self.assertEqual(report.exact_duplicates, 1)
+
+
 class TestCodeBlock(unittest.TestCase):
     """测试代码块数据类"""
 
@@ -0,0 +1,70 @@
+import io
+import json
+import sys
+import unittest
+import libcst as cst
+from codeinsight.cst_printer import (
+    cst_histogram,
+    dump_cst_jsonl,
+    iter_cst,
+    print_cst_tree,
+)
+
+SOURCE = '''import os
+
+
+def first(x):
+    return x
+
+
+class Holder:
+    def second(self):
+        return os.getcwd()
+'''
+
+
+class TestCSTPrinter(unittest.TestCase):
+    """测试迭代式 CST 输出"""
+
+    def setUp(self):
+        self.module = cst.parse_module(SOURCE)
+
+    def test_tree_default_depth(self):
+        out = io.StringIO()
+        print_cst_tree(self.module, file=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "Module")
+        self.assertIn("  FunctionDef", lines)
+        self.assertTrue(all(len(l) - len(l.lstrip()) <= 6 for l in lines))
+
+    def test_filter_by_type_and_lines(self):
+        records = list(
+            iter_cst(self.module, node_types={"FunctionDef"}, lines=(8, 10))
+        )
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["start_line"], 9)
+        self.assertEqual(records[0]["depth"], 3)
+
+    def test_jsonl_to_any_writer(self):
+        out = io.StringIO()
+        count = dump_cst_jsonl(self.module, out, node_types=["ClassDef"])
+        self.assertEqual(count, 1)
+        record = json.loads(out.getvalue())
+        self.assertEqual(
+            record, {"type": "ClassDef", "depth": 1, "start_line": 8, "end_line": 10}
+        )
+
+    def test_histogram(self):
+        histogram = cst_histogram(self.module)
+        self.assertEqual(histogram["FunctionDef"], 2)
+        self.assertEqual(histogram["Module"], 1)
+
+    def test_deep_nesting_beyond_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        module = cst.parse_module("x = " + "+".join(["1"] * depth) + "\n")
+        deepest = max(r["depth"] for r in iter_cst(module))
+        self.assertGreater(deepest, depth)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import errno
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from codeinsight.daemon import AnalysisDaemon, AnalysisService, DaemonClient, request
+
+SOURCE = "import os\nimport sys\n\ndef f(a=[]):\n    return os.name\n"
+
+
+class TestAnalysisDaemon(unittest.TestCase):
+    """测试守护进程与客户端"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmp.name) / "mod.py"
+        self.file.write_text(SOURCE, encoding="utf-8")
+        self.socket_path = os.path.join(self.tmp.name, "d.sock")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_and_cache(self):
+        server = AnalysisDaemon(self.socket_path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = DaemonClient(self.socket_path)
+            result = client.call("analyze", {"path": str(self.file)})
+            self.assertEqual(result["unused_imports"], ["sys"])
+            client.call("analyze", {"path": str(self.file)})
+            bugs = client.call("check_bugs", {"path": str(self.file)})
+            self.assertEqual(len(bugs), 1)
+            stats = client.call("stats")
+            self.assertEqual(stats["result_hits"], 1)
+            self.assertEqual(stats["modules"], 1)
+            with self.assertRaises(RuntimeError):
+                client.call("no_such_method")
+            client.call("shutdown")
+            thread.join(timeout=5)
+        finally:
+            server.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_stale_socket_is_replaced(self):
+        # 绑定后不 listen 的套接字文件与异常退出后残留的一样，连接会被拒绝
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        server = AnalysisDaemon(self.socket_path)
+        server.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_running_daemon_is_not_replaced(self):
+        server = AnalysisDaemon(self.socket_path)
+        try:
+            with self.assertRaises(OSError) as ctx:
+                AnalysisDaemon(self.socket_path)
+            self.assertEqual(ctx.exception.errno, errno.EADDRINUSE)
+            self.assertTrue(os.path.exists(self.socket_path))
+        finally:
+            server.server_close()
+
+    def test_fallback_without_daemon(self):
+        result = request("analyze", {"path": str(self.file)}, self.socket_path)
+        self.assertEqual(result["function_count"], 1)
+
+    def test_cache_invalidated_on_change(self):
+        service = AnalysisService()
+        self.assertEqual(service.analyze(str(self.file))["unused_imports"], ["sys"])
+        service.fix(str(self.file))
+        self.assertEqual(service.analyze(str(self.file))["unused_imports"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from codeinsight.discovery import (
+    IgnoreRule,
+    git_python_files,
+    iter_python_files,
+    walk_python_files,
+)
+
+TREE = {
+    "a.py": "",
+    "top_only.py": "",
+    "gen/x_pb2.py": "",
+    "gen/keep_pb2.py": "",
+    "build/out.py": "",
+    ".venv/lib/site.py": "",
+    "node_modules/pkg/n.py": "",
+    "pkg/b.py": "",
+    "pkg/top_only.py": "",
+    "pkg/local/c.py": "",
+    "pkg/notes.txt": "",
+}
+GITIGNORE = "build/\n*_pb2.py\n!keep_pb2.py\n/top_only.py\n"
+EXPECTED = {"a.py", "gen/keep_pb2.py", "pkg/b.py", "pkg/top_only.py"}
+
+
+class TestDiscovery(unittest.TestCase):
+    """测试文件发现"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for rel, content in TREE.items():
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding="utf-8")
+        (self.root / ".gitignore").write_text(GITIGNORE, encoding="utf-8")
+        (self.root / "pkg" / ".gitignore").write_text("local/\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rel(self, paths):
+        return {p.relative_to(self.root).as_posix() for p in paths}
+
+    def test_walk_prunes_and_honours_gitignore(self):
+        self.assertEqual(self._rel(walk_python_files(self.root)), EXPECTED)
+
+    def test_walk_without_gitignore(self):
+        found = self._rel(walk_python_files(self.root, respect_gitignore=False))
+        self.assertIn("build/out.py", found)
+        self.assertNotIn(".venv/lib/site.py", found)
+
+    def test_non_recursive(self):
+        found = self._rel(iter_python_files(self.root, recursive=False))
+        self.assertEqual(found, {"a.py"})
+
+    def test_ignore_rule_patterns(self):
+        self.assertTrue(IgnoreRule("**/gen/*.py").matches("x/gen/a.py", False))
+        self.assertTrue(IgnoreRule("docs/**").matches("docs/a/b.py", False))
+        self.assertFalse(IgnoreRule("build/").matches("build", False))
+        self.assertTrue(IgnoreRule("t?st_[!x].py").matches("a/test_a.py", False))
+
+    @unittest.skipUnless(shutil.which("git"), "需要 git")
+    def test_git_fast_path(self):
+        self.assertIsNone(git_python_files(self.root))
+        subprocess.run(["git", "init", "-q"], cwd=str(self.root), check=True)
+        found = self._rel(git_python_files(self.root))
+        self.assertEqual(found, EXPECTED)
+        self.assertEqual(self._rel(iter_python_files(self.root)), EXPECTED)
+
+    @unittest.skipUnless(shutil.which("git"), "需要 git")
+    def test_ignored_root_falls_back_to_walk(self):
+        subprocess.run(["git", "init", "-q"], cwd=str(self.root), check=True)
+        build = self.root / "build"
+        # 在被忽略的目录内分析时，ls-files 为空，应回退到遍历
+        self.assertIsNone(git_python_files(build))
+        found = {p.relative_to(build).as_posix() for p in iter_python_files(build)}
+        self.assertEqual(found, {"out.py"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 导入 codeinsight.cli 不应触发的重量级模块
+HEAVY_MODULES = ("libcst", "git", "codeinsight.evolution", "codeinsight.code_detector")
+
+# codeinsight.cli 的累计导入耗时上限（微秒），可通过环境变量放宽
+IMPORT_BUDGET_US = int(os.environ.get("CODEINSIGHT_IMPORT_BUDGET_US", "100000"))
+
+
+def _import_times(module: str):
+    """运行 `python -X importtime -c "import <module>"`，返回 {模块名: 累计微秒}"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    """CLI 启动时间基准：防止重量级依赖回到模块级导入"""
+
+    def test_cli_does_not_import_heavy_modules(self):
+        times = _import_times("codeinsight.cli")
+        self.assertIn("codeinsight.cli", times)
+        for heavy in HEAVY_MODULES:
+            self.assertNotIn(heavy, times, f"{heavy} 在导入 CLI 时被加载")
+
+    def test_daemon_client_does_not_import_heavy_modules(self):
+        for module in ("codeinsight.daemon_client", "codeinsight.daemon"):
+            times = _import_times(module)
+            self.assertIn(module, times)
+            for heavy in HEAVY_MODULES:
+                self.assertNotIn(heavy, times, f"{heavy} 在导入 {module} 时被加载")
+
+    def test_cli_import_budget(self):
+        times = _import_times("codeinsight.cli")
+        self.assertLess(times["codeinsight.cli"], IMPORT_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
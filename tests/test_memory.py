@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from codeinsight.memory import MemoryBudgetExecutor, MemoryLimits
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+
+
+def _pid(_source):
+    return os.getpid()
+
+
+def _hold(source):
+    # 占用一段时间，便于观察并发度
+    time.sleep(0.05)
+    return time.monotonic()
+
+
+def _crash(_source):
+    os._exit(9)
+
+
+class TestMemoryBudgetExecutor(unittest.TestCase):
+    """测试按内存预算调度的工作进程池"""
+
+    def test_recycles_after_n_tasks(self):
+        with MemoryBudgetExecutor(1, MemoryLimits(max_tasks_per_worker=2)) as pool:
+            futures = [pool.submit(_pid, "x") for _ in range(5)]
+            pids = [f.result() for f in futures]
+        self.assertEqual(len(set(pids)), 3)
+        self.assertEqual(pool.stats()["recycled_workers"], 2)
+        self.assertIn("peak_mb", futures[0].memory)
+
+    def test_budget_serializes_large_tasks(self):
+        # 每个任务估算远超预算，只能逐个放行
+        source = "x" * (256 * 1024)
+        with MemoryBudgetExecutor(3, MemoryLimits(budget_mb=1)) as pool:
+            futures = [pool.submit(_hold, source) for _ in range(3)]
+            finished = sorted(f.result() for f in futures)
+        gaps = [b - a for a, b in zip(finished, finished[1:])]
+        self.assertTrue(all(gap >= 0.04 for gap in gaps), gaps)
+
+    def test_crashed_worker_fails_only_its_task(self):
+        with MemoryBudgetExecutor(1, MemoryLimits()) as pool:
+            crashed = pool.submit(_crash, "x")
+            after = pool.submit(_pid, "x")
+            with self.assertRaises(RuntimeError):
+                crashed.result()
+            self.assertIsInstance(after.result(), int)
+        self.assertEqual(pool.stats()["crashed_workers"], 1)
+
+    def test_directory_results_report_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(4):
+                Path(tmp, f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n")
+            report = MultiFileAnalyzer().analyze_directory(
+                tmp, memory=MemoryLimits(budget_mb=512, max_tasks_per_worker=2)
+            )
+        self.assertEqual(report["total_files"], 4)
+        self.assertEqual(report["memory"]["recycled_workers"], 2)
+        for result in report["files"].values():
+            self.assertGreater(result["memory"]["peak_mb"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import gzip
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from codeinsight.cli import main
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer, ReportExporter
+
+SOURCE = '''import os
+
+
+class Model:
+    """模型"""
+
+    def run(self, x: int) -> int:
+        if x:
+            return os.getpid()
+        return x
+'''
+
+
+class TestReportExporter(unittest.TestCase):
+    """测试流式 JSON 导出"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "src").mkdir()
+        (self.root / "src" / "m.py").write_text(SOURCE, encoding="utf-8")
+        self.result = MultiFileAnalyzer().analyze_directory(str(self.root / "src"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pretty_output_identical_to_deep_copy(self):
+        output = self.root / "report.json"
+        ReportExporter.export_json(self.result, str(output))
+        expected = json.dumps(
+            ReportExporter._make_serializable(self.result),
+            ensure_ascii=False,
+            indent=2,
+        )
+        self.assertEqual(output.read_text(encoding="utf-8"), expected)
+
+    def test_compact_and_gzip(self):
+        compact = self.root / "report.json"
+        ReportExporter.export_json(self.result, str(compact), compact=True)
+        text = compact.read_text(encoding="utf-8")
+        self.assertNotIn("\n", text)
+
+        zipped = self.root / "report.json.gz"
+        ReportExporter.export_json(self.result, str(zipped), compact=True)
+        with gzip.open(zipped, "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), text)
+        data = json.loads(text)
+        functions = next(iter(data["files"].values()))["functions"]
+        self.assertEqual(functions[0]["name"], "run")
+
+
+class TestShardMerge(unittest.TestCase):
+    """测试分片分析与报告合并"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for i in range(12):
+            sub = self.root / f"pkg{i % 3}"
+            sub.mkdir(exist_ok=True)
+            (sub / f"m{i}.py").write_text(SOURCE * (i % 4 + 1), encoding="utf-8")
+        self.analyzer = MultiFileAnalyzer()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_merged_shards_identical_to_single_run(self):
+        parts = []
+        for i in range(3):
+            output = self.root / f"shard{i}.json"
+            report = self.analyzer.analyze_directory(str(self.root), shard=(i, 3))
+            ReportExporter.export_json(report, str(output))
+            parts.append(ReportExporter.load_json(str(output)))
+        self.assertEqual(sum(len(p["files"]) for p in parts), 12)
+
+        merged = self.analyzer.merge_reports(list(reversed(parts)))
+        full = self.analyzer.analyze_directory(str(self.root))
+        merged_out = self.root / "merged.json"
+        full_out = self.root / "full.json"
+        ReportExporter.export_json(merged, str(merged_out))
+        ReportExporter.export_json(full, str(full_out))
+        self.assertEqual(merged_out.read_text(), full_out.read_text())
+
+    def test_incomplete_shards_rejected(self):
+        part = self.analyzer.analyze_directory(str(self.root), shard=(0, 2))
+        with self.assertRaises(ValueError):
+            self.analyzer.merge_reports([part])
+        with self.assertRaises(ValueError):
+            self.analyzer.merge_reports([part, part])
+
+
+def _git(root: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=str(root),
+        check=True,
+        capture_output=True,
+    )
+
+
+@unittest.skipUnless(shutil.which("git"), "需要 git")
+class TestChangedFilesAnalysis(unittest.TestCase):
+    """测试相对 git 引用的增量分析"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for name in ("keep.py", "edit.py", "gone.py", "old_name.py"):
+            (self.root / name).write_text(SOURCE, encoding="utf-8")
+        _git(self.root, "init", "-q")
+        _git(self.root, "add", ".")
+        _git(self.root, "commit", "-q", "-m", "base")
+        self.analyzer = MultiFileAnalyzer()
+        self.baseline = self.analyzer.analyze_directory(str(self.root))
+
+        (self.root / "edit.py").write_text(SOURCE + "\n\ndef f():\n    pass\n")
+        (self.root / "gone.py").unlink()
+        (self.root / "old_name.py").rename(self.root / "new_name.py")
+        (self.root / "added.py").write_text("x = 1\n", encoding="utf-8")
+        _git(self.root, "add", "-A")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_changed_files_reanalyzed(self):
+        report = self.analyzer.analyze_changed(str(self.root), "HEAD", self.baseline)
+        names = {Path(f).name for f in report["reanalyzed_files"]}
+        self.assertEqual(names, {"edit.py", "added.py"})
+
+        full = self.analyzer.analyze_directory(str(self.root))
+        self.assertEqual(list(report["files"]), list(full["files"]))
+        self.assertEqual(report["summary"], full["summary"])
+        self.assertEqual(report["total_files"], full["total_files"])
+
+    def test_without_baseline(self):
+        report = self.analyzer.analyze_changed(str(self.root), "HEAD")
+        self.assertEqual(
+            {Path(f).name for f in report["files"]}, {"edit.py", "added.py"}
+        )
+
+    def test_reexports_respected_without_index(self):
+        pkg = self.root / "pkg"
+        pkg.mkdir()
+        (pkg / "mod.py").write_text("def helper():\n    pass\n", encoding="utf-8")
+        (self.root / "use.py").write_text("from pkg import helper\n\nhelper()\n")
+        _git(self.root, "add", "-A")
+        _git(self.root, "commit", "-q", "-m", "pkg")
+        (pkg / "__init__.py").write_text("from .mod import helper\n", encoding="utf-8")
+
+        report = self.analyzer.analyze_changed(str(self.root), "HEAD")
+        full = self.analyzer.analyze_directory(str(self.root))
+        init = str(pkg / "__init__.py")
+        self.assertEqual(report["files"][init]["unused_imports"], [])
+        self.assertEqual(report["files"][init], full["files"][init])
+
+    def test_invalid_ref(self):
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_changed(str(self.root), "no-such-ref")
+
+
+class TestScanBugs(unittest.TestCase):
+    """测试目录 Bug 扫描的规则开关"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "a.py").write_text("def f(a=[]):\n    return eval(a)\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_disabled_rules_skipped(self):
+        analyzer = MultiFileAnalyzer()
+        findings = analyzer.scan_bugs(str(self.root))
+        self.assertEqual(len(findings[str(self.root / "a.py")]), 2)
+        findings = analyzer.scan_bugs(str(self.root), disabled=["dangerous-call"])
+        self.assertEqual(len(findings[str(self.root / "a.py")]), 1)
+        findings = analyzer.scan_bugs(
+            str(self.root), disabled=["dangerous-call", "mutable-default"]
+        )
+        self.assertEqual(findings, {})
+
+    def test_cli_passes_disable_rule(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            main(["check", str(self.root), "--disable-rule", "mutable-default"])
+        self.assertIn("eval", out.getvalue())
+        self.assertNotIn("可变默认对象", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+from pathlib import Path
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+from codeinsight.pipeline import AnalysisPipeline
+
+
+class TestAnalysisPipeline(unittest.TestCase):
+    """测试异步分析流水线"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for i in range(8):
+            (self.root / f"m{i}.py").write_text(
+                f"import os\n\ndef f{i}(x):\n    if x:\n        return eval(x)\n",
+                encoding="utf-8",
+            )
+        (self.root / "broken.py").write_text("def (:\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_sequential(self):
+        analyzer = MultiFileAnalyzer()
+        sequential = analyzer.analyze_directory(str(self.root))
+        parallel = analyzer.analyze_directory(str(self.root), workers=2)
+        self.assertEqual(sequential["total_files"], parallel["total_files"])
+        self.assertEqual(sequential["summary"], parallel["summary"])
+        self.assertEqual(list(sequential["files"]), list(parallel["files"]))
+
+    def test_small_queues_and_errors(self):
+        pipeline = AnalysisPipeline(
+            workers=2, read_concurrency=2, queue_size=1, check_bugs=True
+        )
+        paths = sorted(self.root.glob("*.py")) + [self.root / "missing.py"]
+        results = pipeline.run(iter(paths))
+        self.assertEqual(pipeline.discovered, 10)
+        self.assertIn("error", results[str(self.root / "missing.py")])
+        self.assertIn("error", results[str(self.root / "broken.py")])
+        self.assertEqual(len(results[str(self.root / "m0.py")]["bug_findings"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+from codeinsight.profiler import PhaseProfiler, format_slowest_files
+
+
+class TestPhaseProfiler(unittest.TestCase):
+    """测试分阶段计时"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for i in range(3):
+            (self.root / f"m{i}.py").write_text(
+                f"import os\n\ndef f{i}(x):\n    return x\n", encoding="utf-8"
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_directory_phases(self):
+        profiler = PhaseProfiler()
+        result = MultiFileAnalyzer().analyze_directory(
+            str(self.root), profiler=profiler
+        )
+        totals = profiler.phase_totals()
+        for phase in ("discovery", "read", "parse", "scope", "metrics"):
+            self.assertIn(phase, totals)
+        self.assertEqual(totals["parse"]["count"], 3)
+        self.assertEqual(len(result["slowest_files"]), 3)
+        self.assertIn("m0.py", format_slowest_files(result["slowest_files"]))
+
+    def test_worker_events_merged(self):
+        profiler = PhaseProfiler()
+        MultiFileAnalyzer().analyze_directory(
+            str(self.root), workers=2, profiler=profiler
+        )
+        self.assertEqual(profiler.phase_totals()["metrics"]["count"], 3)
+
+        trace = self.root / "trace.json"
+        profiler.write_chrome_trace(str(trace))
+        data = json.loads(trace.read_text(encoding="utf-8"))
+        phases = {e["ph"] for e in data["traceEvents"]}
+        self.assertEqual(phases, {"X", "M"})
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = PhaseProfiler(enabled=False)
+        with profiler.phase("parse", "a.py"):
+            pass
+        self.assertEqual(profiler.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import libcst as cst
+from codeinsight.analyzer import CodeMetrics
+from codeinsight.cli import main
+from codeinsight.fast_metrics import analyze_fast
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+from codeinsight.profiles import TimeBudget, get_profile, prioritize_files
+
+
+SAMPLE = '''"""模块文档"""
+import os
+import sys as system
+from typing import List, Optional
+
+
+class Box:
+    """盒子"""
+
+    def get(self, key: str) -> "Optional[int]":
+        if key:
+            for _ in range(3):
+                pass
+        return None
+
+
+def run(items, limit: int):
+    while items:
+        items.pop()
+    return os.path.join("a", "b")
+'''
+
+
+class TestFastMetrics(unittest.TestCase):
+    """测试基于 ast 的快速指标"""
+
+    def test_matches_libcst_metrics(self):
+        expected = CodeMetrics().analyze(cst.parse_module(SAMPLE), SAMPLE)
+        self.assertEqual(analyze_fast(SAMPLE), expected)
+        self.assertEqual(expected["unused_imports"], ["system", "List"])
+        get, run = expected["functions"]
+        self.assertEqual((get.line_start, get.line_end, get.complexity), (10, 14, 3))
+        self.assertEqual((run.line_start, run.line_end, run.complexity), (17, 20, 2))
+
+    def test_syntax_error(self):
+        with self.assertRaises(SyntaxError):
+            analyze_fast("def (:\n")
+
+
+class TestTimeBudget(unittest.TestCase):
+    """测试时间预算"""
+
+    def test_admits_by_observed_rate(self):
+        budget = TimeBudget(10, seconds_per_byte=1e-6)
+        self.assertTrue(budget.admits(1000))
+        budget.record(100, 5.0)
+        # 实测 0.05 秒/字节，1000 字节预计 50 秒
+        self.assertFalse(budget.admits(1000))
+        self.assertTrue(budget.admits(10))
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            get_profile("turbo")
+
+
+class TestProfiles(unittest.TestCase):
+    """测试目录分析的档位与时间预算"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        body = "x = 1\ny = 2\nz = x + y\nw = z * 2\nv = w - 1\n"
+        for i in range(4):
+            (self.root / f"m{i}.py").write_text(SAMPLE + "\n" + body * 2)
+        (self.root / "bug.py").write_text("def f(x=[]):\n    return x\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fast_and_standard_metrics_agree(self):
+        fast = MultiFileAnalyzer().analyze_directory(
+            str(self.root), analysis_profile="fast"
+        )
+        standard = MultiFileAnalyzer().analyze_directory(
+            str(self.root), analysis_profile="standard"
+        )
+        self.assertEqual(fast["profile"], "fast")
+        self.assertEqual(fast["summary"], standard["summary"])
+        self.assertNotIn("import_cycles", fast)
+        bug = standard["files"][str(self.root / "bug.py")]
+        self.assertTrue(bug["bug_findings"])
+        self.assertNotIn("bug_findings", fast["files"][str(self.root / "bug.py")])
+
+    def test_deep_adds_duplicates_and_cross_file(self):
+        report = MultiFileAnalyzer().analyze_directory(
+            str(self.root), analysis_profile="deep"
+        )
+        self.assertIn("import_cycles", report)
+        duplicates = report["files"][str(self.root / "m0.py")]["duplicates"]
+        self.assertEqual(duplicates["exact"], 1)
+        # 临时目录不在 git 仓库中，演化阶段被跳过并注明原因
+        self.assertIn("evolution", report.get("skipped_stages", {}))
+
+    def test_deep_single_file_outside_git_skips_evolution(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            main(["analyze", str(self.root / "bug.py"), "--analysis-profile", "deep"])
+        self.assertIn("跳过演化分析", out.getvalue())
+        self.assertIn("代码质量评分", out.getvalue())
+
+    def test_time_budget_reports_unanalyzed_files(self):
+        analyzer = MultiFileAnalyzer()
+        report = analyzer.analyze_directory(
+            str(self.root), analysis_profile="standard", time_budget=1e-6
+        )
+        budget = report["time_budget"]
+        self.assertEqual(budget["analyzed"], 0)
+        self.assertEqual(
+            sorted(budget["unanalyzed"]),
+            ["bug.py", "m0.py", "m1.py", "m2.py", "m3.py"],
+        )
+        self.assertEqual(report["analyzed_files"], 0)
+
+        report = analyzer.analyze_directory(
+            str(self.root), analysis_profile="fast", time_budget=60
+        )
+        self.assertEqual(report["time_budget"]["unanalyzed"], [])
+        self.assertEqual(report["analyzed_files"], 5)
+
+    def test_prioritize_recent_and_large_first(self):
+        old = time.time() - 3600
+        os.utime(self.root / "bug.py", (old, old))
+        for i in range(4):
+            os.utime(self.root / f"m{i}.py", (old + i, old + i))
+        ordered = prioritize_files(sorted(self.root.glob("*.py")), self.root)
+        self.assertEqual(ordered[0].name, "m3.py")
+        self.assertEqual(ordered[-1].name, "bug.py")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from codeinsight.analyzer import quality_score
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+from codeinsight.project_index import ProjectIndex
+from codeinsight.refactor import fix_directory
+
+TREE = {
+    "pkg/__init__.py": "from .core import Helper\n",
+    "pkg/core.py": "class Helper:\n    pass\n\n\ndef util():\n    pass\n",
+    "pkg/api.py": (
+        "import os\n"
+        "from json import dumps\n"
+        "from .core import util as util\n"
+        "\n"
+        '__all__ = ["dumps"]\n'
+    ),
+    "pkg/a.py": "from . import b\n\nx = 1\n",
+    "pkg/b.py": "from .a import x\n\n\ndef lazy():\n    from pkg import api\n",
+    "app.py": "from pkg import Helper\n\nHelper()\n",
+}
+
+
+class TestProjectIndex(unittest.TestCase):
+    """测试项目级符号与导入索引"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for rel, source in TREE.items():
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(source, encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _unused(self, report, rel):
+        return report["files"][str(self.root / rel)]["unused_imports"]
+
+    def test_reexport_aware_unused_imports(self):
+        report = MultiFileAnalyzer().analyze_directory(str(self.root))
+        self.assertEqual(self._unused(report, "pkg/__init__.py"), [])
+        self.assertEqual(self._unused(report, "pkg/api.py"), ["os"])
+        self.assertNotIn("symbols", report["files"][str(self.root / "app.py")])
+
+    def test_cross_file_score_recomputed_from_metrics(self):
+        analyzer = MultiFileAnalyzer()
+        report = analyzer.analyze_directory(str(self.root))
+        results = report["files"]
+        for result in results.values():
+            expected = quality_score(
+                result["cyclomatic_complexity"],
+                result["max_nesting_depth"],
+                len(result["unused_imports"]),
+                result["annotation_coverage"],
+            )
+            self.assertEqual(result["quality_score"], expected)
+
+        # 再次修正（如 --since 沿用已修正的基准结果）不会重复加分
+        init = results[str(self.root / "pkg/__init__.py")]
+        init["unused_imports"] = ["Helper"]
+        before = init["quality_score"]
+        index = ProjectIndex()
+        index.refresh(self.root)
+        analyzer._apply_cross_file(self.root, results, index)
+        self.assertEqual(init["quality_score"], before)
+
+    def test_summary_only_applies_cross_file_correction(self):
+        analyzer = MultiFileAnalyzer()
+        full = analyzer.analyze_directory(str(self.root))
+        self.assertEqual(self._unused(full, "pkg/__init__.py"), [])
+        streamed = analyzer.analyze_directory(str(self.root), summary_only=True)
+        self.assertEqual(streamed["summary"], full["summary"])
+
+    def test_import_cycles_ignore_lazy_imports(self):
+        index = ProjectIndex()
+        report = MultiFileAnalyzer().analyze_directory(str(self.root), index=index)
+        self.assertEqual(report["import_cycles"], [["pkg.a", "pkg.b"]])
+        self.assertIn("pkg.api", index.import_graph(include_lazy=True)["pkg.b"])
+
+    def test_persisted_and_refreshed_incrementally(self):
+        index_file = self.root / "index.json"
+        index = ProjectIndex()
+        MultiFileAnalyzer().analyze_directory(str(self.root), index=index)
+        index.save(index_file)
+
+        index = ProjectIndex.load(index_file)
+        self.assertEqual(index.refresh(self.root), [])
+
+        api = self.root / "pkg" / "api.py"
+        api.write_text("import os\n\nos.getcwd()\n", encoding="utf-8")
+        os.utime(api, ns=(0, 0))
+        (self.root / "app.py").unlink()
+        self.assertEqual(index.refresh(self.root), ["pkg/api.py"])
+        self.assertNotIn("app.py", index.modules)
+        # app.py 删除后，__init__ 中的 Helper 不再被任何模块使用
+        unused = index.unused_imports()
+        self.assertEqual(unused["pkg/__init__.py"], ["Helper"])
+        self.assertNotIn("pkg/api.py", unused)
+
+    def test_time_budget_keeps_entries_of_skipped_files(self):
+        index = ProjectIndex()
+        MultiFileAnalyzer().analyze_directory(str(self.root), index=index)
+        indexed = set(index.modules)
+
+        report = MultiFileAnalyzer().analyze_directory(
+            str(self.root), index=index, time_budget=1e-6
+        )
+        self.assertTrue(report["time_budget"]["unanalyzed"])
+        self.assertEqual(set(index.modules), indexed)
+
+    def test_fix_keeps_reexported_names(self):
+        results = fix_directory(self.root, workers=1)
+        removed = {Path(r.path).name: r.removed for r in results if r.changed}
+        self.assertEqual(removed["api.py"], ["os"])
+        self.assertNotIn("__init__.py", removed)
+        self.assertIn("Helper", (self.root / "pkg" / "__init__.py").read_text())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import libcst as cst
+from codeinsight.analyzer import CodeMetrics
+from codeinsight.cli import main
+from codeinsight.refactor import (
+    UnusedImportRemover,
+    atomic_write,
+    fix_directory,
+    fix_file,
+    format_fix_summary,
+)
+
+SOURCE = "import os\nimport sys\n\nprint(os.name)\n"
+
+
+class TestFixDirectory(unittest.TestCase):
+    """测试目录批量修复"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "pkg").mkdir()
+        (self.root / "pkg" / "a.py").write_text(SOURCE, encoding="utf-8")
+        (self.root / "clean.py").write_text("import os\nos.name\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dry_run_emits_diff(self):
+        results = fix_directory(self.root, dry_run=True, workers=1)
+        changed = [r for r in results if r.changed]
+        self.assertEqual(len(changed), 1)
+        self.assertIn("-import sys", changed[0].diff)
+        self.assertEqual((self.root / "pkg" / "a.py").read_text(), SOURCE)
+
+    def test_fix_rewrites_only_changed(self):
+        clean = self.root / "clean.py"
+        mtime = clean.stat().st_mtime_ns
+        results = fix_directory(self.root, workers=2)
+        self.assertEqual(
+            (self.root / "pkg" / "a.py").read_text(), "import os\n\nprint(os.name)\n"
+        )
+        self.assertEqual(clean.stat().st_mtime_ns, mtime)
+        self.assertIn("修改文件数: 1", format_fix_summary(results))
+
+    def test_atomic_write_keeps_mode(self):
+        target = self.root / "clean.py"
+        os.chmod(target, 0o640)
+        atomic_write(target, "x = 1\n")
+        self.assertEqual(target.read_text(), "x = 1\n")
+        self.assertEqual(target.stat().st_mode & 0o777, 0o640)
+        self.assertEqual(
+            sorted(p.name for p in self.root.iterdir()), ["clean.py", "pkg"]
+        )
+
+
+class TestShadowedImports(unittest.TestCase):
+    """测试同名导入只删除真正未使用的绑定"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "script.py"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_used_module_import_survives_unused_local_one(self):
+        self.path.write_text(
+            "import os\n\n\ndef f():\n    import os\n    return 1\n\n\n"
+            "print(os.name, f())\n",
+            encoding="utf-8",
+        )
+        result = fix_file(self.path)
+        self.assertEqual(result.removed, ["os"])
+        fixed = self.path.read_text()
+        self.assertEqual(
+            fixed, "import os\n\n\ndef f():\n    return 1\n\n\nprint(os.name, f())\n"
+        )
+        exec(compile(fixed, str(self.path), "exec"), {})
+
+    def test_duplicate_import_in_function_kept_when_used(self):
+        code = "import sys\n\n\ndef f():\n    import sys\n    return sys.argv\n"
+        tree = cst.parse_module(code)
+        metrics = CodeMetrics()
+        metrics.analyze(tree, code)
+        fixer = UnusedImportRemover({"sys"}, metrics.unused_import_aliases)
+        new_code = tree.visit(fixer).code
+        self.assertEqual(fixer.removed, ["sys"])
+        self.assertEqual(
+            new_code, "\n\ndef f():\n    import sys\n    return sys.argv\n"
+        )
+
+
+class TestAnalyzeFixProtections(unittest.TestCase):
+    """测试 analyze --fix 与 fix 子命令保留同样的导入"""
+
+    def test_keeps_reexports(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "b.py"
+            path.write_text(
+                'import os as os\nimport sys\nfrom json import dumps\n'
+                '__all__ = ["dumps"]\n'
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(["analyze", str(path), "--fix"])
+            self.assertEqual(
+                path.read_text(),
+                'import os as os\nfrom json import dumps\n__all__ = ["dumps"]\n',
+            )
+
+
+class TestImportRemovalDelta(unittest.TestCase):
+    """测试修复后增量更新指标"""
+
+    def test_delta_matches_full_analysis(self):
+        code = (
+            "# header\nimport os\nimport sys as s\nfrom a import b, c\n\n"
+            "def f(x):\n    if x:\n        return os.name, b\n"
+        )
+        tree = cst.parse_module(code)
+        metrics = CodeMetrics()
+        result = metrics.analyze(tree, code)
+        fixer = UnusedImportRemover(set(result["unused_imports"]))
+        new_tree = tree.visit(fixer)
+        self.assertEqual(fixer.removed, ["s", "c"])
+
+        delta = metrics.apply_import_removal(result, fixer.removed, new_tree.code)
+        full = CodeMetrics().analyze(new_tree, new_tree.code)
+        for key in ("unused_imports", "line_count", "comment_count", "quality_score"):
+            self.assertEqual(delta[key], full[key], key)
+        self.assertEqual(delta["cyclomatic_complexity"], full["cyclomatic_complexity"])
+
+    def test_reanalyze_does_not_accumulate(self):
+        tree = cst.parse_module("def f():\n    if x:\n        pass\n")
+        metrics = CodeMetrics()
+        first = metrics.analyze(tree)
+        second = metrics.analyze(tree)
+        self.assertEqual(first["function_count"], second["function_count"])
+        self.assertEqual(first["cyclomatic_complexity"], second["cyclomatic_complexity"])
+
+
+if __name__ == "__main__":
+    unittest.main()
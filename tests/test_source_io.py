@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+from pathlib import Path
+from codeinsight import source_io
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer
+from codeinsight.refactor import fix_file
+from codeinsight.source_io import count_lines, read_source
+
+LATIN1 = '# -*- coding: latin-1 -*-\nimport os\nimport sys\n\nname = "café"\nprint(os.name)\n'
+
+
+class TestSourceIO(unittest.TestCase):
+    """测试字节级源码读取"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.latin = self.root / "latin.py"
+        self.latin.write_bytes(LATIN1.encode("latin-1"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_count_lines_matches_split(self):
+        for text in ["", "x = 1", "# a\n  # b\nx = 1  # c\n\n", "a\r\n  #b\r\n"]:
+            lines = text.split("\n")
+            expected = (len(lines), sum(1 for l in lines if l.strip().startswith("#")))
+            self.assertEqual(count_lines(text), expected, text)
+            self.assertEqual(count_lines(text.encode()), expected, text)
+
+    def test_non_utf8_file_analyzed(self):
+        result = MultiFileAnalyzer().analyze_directory(str(self.root))
+        file_result = result["files"][str(self.latin)]
+        self.assertNotIn("error", file_result)
+        self.assertEqual(file_result["unused_imports"], ["sys"])
+        self.assertEqual(file_result["comment_count"], 1)
+
+    def test_fix_preserves_encoding(self):
+        fix_file(self.latin)
+        data = self.latin.read_bytes()
+        self.assertIn("café".encode("latin-1"), data)
+        self.assertNotIn(b"import sys", data)
+
+    def test_mmap_read(self):
+        original = source_io.MMAP_THRESHOLD
+        source_io.MMAP_THRESHOLD = 1
+        try:
+            self.assertEqual(read_source(self.latin), LATIN1.encode("latin-1"))
+        finally:
+            source_io.MMAP_THRESHOLD = original
+
+
+if __name__ == "__main__":
+    unittest.main()
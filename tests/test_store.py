@@ -0,0 +1,122 @@
+import io
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+from codeinsight.cli import main
+from codeinsight.multi_file_analyzer import MultiFileAnalyzer, ReportExporter
+from codeinsight.store import MetricsStore, package_of
+
+DOCUMENTED = '''class Documented:
+    """有文档"""
+
+    def run(self):
+        return 1
+'''
+UNDOCUMENTED = '''import os
+
+
+class Bare:
+    def run(self):
+        return 1
+
+
+def helper(x):
+    return x
+'''
+
+
+class TestMetricsStore(unittest.TestCase):
+    """测试 SQLite 指标库"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for rel, source in {
+            "src/pkg/a.py": DOCUMENTED,
+            "src/pkg/sub/b.py": UNDOCUMENTED,
+            "src/other/c.py": UNDOCUMENTED,
+            "src/pkgx/d.py": UNDOCUMENTED,
+        }.items():
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(source, encoding="utf-8")
+        self.report = MultiFileAnalyzer().analyze_directory(str(self.root / "src"))
+        self.db = str(self.root / "metrics.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_package_of(self):
+        self.assertEqual(package_of("pkg/sub/mod.py"), "pkg.sub")
+        self.assertEqual(package_of("mod.py"), "")
+
+    def test_export_and_query(self):
+        self.assertEqual(ReportExporter.export_sqlite(self.report, self.db), 4)
+        with MetricsStore(self.db) as store:
+            _, rows = store.undocumented_classes(package="pkg")
+            self.assertEqual([(Path(r[0]).name, r[1]) for r in rows], [("b.py", "Bare")])
+
+            _, rows = store.undocumented_classes()
+            self.assertEqual(len(rows), 3)
+
+            columns, rows = store.most_complex_functions(limit=2)
+            self.assertEqual(columns[:2], ["path", "name"])
+            self.assertEqual(len(rows), 2)
+
+            _, rows = store.query("SELECT name FROM unused_imports")
+            self.assertEqual(rows, [("os",)] * 3)
+
+    def test_reexport_replaces_rows(self):
+        ReportExporter.export_sqlite(self.report, self.db)
+        ReportExporter.export_sqlite(self.report, self.db)
+        with MetricsStore(self.db) as store:
+            _, rows = store.query("SELECT COUNT(*) FROM functions")
+        self.assertEqual(rows, [(7,)])
+
+    def test_function_rows_carry_real_spans(self):
+        ReportExporter.export_sqlite(self.report, self.db)
+        with MetricsStore(self.db, read_only=True) as store:
+            _, rows = store.longest_functions(limit=1, package="pkg")
+        # Bare.run 与 helper 都是 2 行，按复杂度并列时取其一
+        self.assertEqual(rows[0][3:], (2, 1))
+        self.assertIn(rows[0][1], ("run", "helper"))
+
+    def test_read_only_store_rejects_writes(self):
+        ReportExporter.export_sqlite(self.report, self.db)
+        with MetricsStore(self.db, read_only=True) as store:
+            with self.assertRaises(sqlite3.OperationalError):
+                store.query("DELETE FROM functions")
+
+    def test_single_file_rejects_directory_options(self):
+        path = str(self.root / "src" / "pkg" / "a.py")
+        err = io.StringIO()
+        with redirect_stderr(err), self.assertRaises(SystemExit) as ctx:
+            main(["analyze", path, "--sqlite", self.db, "--time-budget", "0"])
+        self.assertEqual(ctx.exception.code, 2)
+        self.assertIn("--sqlite, --time-budget", err.getvalue())
+        self.assertFalse(Path(self.db).exists())
+
+    def test_query_command_does_not_modify_database(self):
+        other = self.root / "other.db"
+        conn = sqlite3.connect(other)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.close()
+
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err), self.assertRaises(SystemExit):
+            main(["query", str(other), "--sql", "DROP TABLE t"])
+        self.assertIn("查询失败", err.getvalue())
+
+        conn = sqlite3.connect(other)
+        tables = conn.execute("SELECT name FROM sqlite_master").fetchall()
+        conn.close()
+        # 既没有执行 DROP，也没有写入指标库的表结构
+        self.assertEqual(tables, [("t",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
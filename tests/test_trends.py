@@ -0,0 +1,129 @@
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+from codeinsight.cli import main
+
+try:
+    import numpy as np
+    from codeinsight.trends import (
+        analyze_trends,
+        change_points,
+        moving_average,
+        regression_slope,
+    )
+except ImportError:  # numpy 为可选依赖
+    np = None
+
+DAY = 86400
+
+
+def _history(scores, authors=("alice", "bob"), files=("a.py",)):
+    return [
+        {
+            "commit": f"c{i:03d}",
+            "timestamp": 1_704_067_200 + i * DAY,  # 2024-01-01（周一）起每天一次
+            "author": authors[i % len(authors)],
+            "file": files[i % len(files)],
+            "complexity": 10 + i,
+            "score": score,
+        }
+        for i, score in enumerate(scores)
+    ]
+
+
+@unittest.skipIf(np is None, "需要 numpy")
+class TestTrends(unittest.TestCase):
+    """测试演化历史的趋势统计"""
+
+    def test_moving_average(self):
+        result = moving_average(np.array([1.0, 2.0, 3.0, 4.0]), 2)
+        self.assertEqual(result.tolist(), [1.0, 1.5, 2.5, 3.5])
+
+    def test_change_point_detects_mean_shift(self):
+        values = np.array([70.0, 71, 69, 70, 72, 70, 85, 86, 84, 85, 86, 85])
+        self.assertEqual(change_points(values), [6])
+        self.assertEqual(change_points(np.full(12, 70.0)), [])
+
+    def test_regression_slope(self):
+        x = np.arange(5, dtype=float)
+        self.assertAlmostEqual(regression_slope(x, 2 * x + 1), 2.0)
+        self.assertEqual(regression_slope(np.ones(3), x[:3]), 0.0)
+
+    def test_author_and_week_aggregation(self):
+        report = analyze_trends(_history([50, 60, 70, 60, 80, 90, 90, 100]))
+        self.assertEqual(report.authors["author"], ["alice", "bob"])
+        self.assertEqual(report.authors["commits"], [4, 4])
+        # 每个版本相对上一版本的评分变化记在该版本作者名下
+        self.assertEqual(report.authors["score_delta"], [30.0, 20.0])
+        self.assertEqual(report.weeks["week"], ["2024-01-01", "2024-01-08"])
+        self.assertEqual(report.weeks["commits"], [7, 1])
+        self.assertAlmostEqual(report.slope_per_week, 48.333, places=3)
+
+    def test_score_delta_is_per_file(self):
+        report = analyze_trends(_history([50, 80, 60, 90], files=("a.py", "b.py")))
+        self.assertEqual(report.series["score_delta"], [0.0, 0.0, 10.0, 10.0])
+
+    def test_export(self):
+        report = analyze_trends(_history([50, 60, 70]))
+        out = io.StringIO()
+        self.assertEqual(report.to_csv(out, "authors"), 2)
+        self.assertEqual(
+            out.getvalue().splitlines()[0],
+            "author,commits,mean_score,min_score,max_score,score_delta",
+        )
+        out = io.StringIO()
+        report.to_json(out)
+        self.assertNotIn("\n", out.getvalue())
+        self.assertEqual(json.loads(out.getvalue())["series"]["score"], [50, 60, 70])
+        with self.assertRaises(ValueError):
+            report.to_csv(io.StringIO(), "files")
+
+
+@unittest.skipIf(np is None, "需要 numpy")
+@unittest.skipUnless(shutil.which("git"), "需要 git")
+class TestTrendCommand(unittest.TestCase):
+    """测试 evolution --trend 按目标路径定位仓库"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            main(["evolution", *argv])
+        return out.getvalue(), err.getvalue()
+
+    def test_repo_of_target_not_working_directory(self):
+        repo = self.root / "repo"
+        repo.mkdir()
+        (repo / "use.py").write_text("import os\nos.sep\n", encoding="utf-8")
+        for args in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "a"]):
+            subprocess.run(
+                ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                cwd=str(repo),
+                check=True,
+                capture_output=True,
+            )
+        out, _ = self._run(str(repo / "use.py"), "--trend")
+        self.assertIn("1 个文件, 1 个版本", out)
+
+    def test_outside_repo_reports_error(self):
+        path = self.root / "solo.py"
+        path.write_text("x = 1\n", encoding="utf-8")
+        with redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+            main(["evolution", str(path), "--trend"])
+        self.assertIn("不在 git 仓库内", err.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()